@@ -0,0 +1,81 @@
+import logging
+import queue
+import signal
+import threading
+import time
+
+from alarm_engine import API_PORT, API_SOCKET, AlarmEngine
+
+log = logging.getLogger(__name__)
+
+# With nobody to press dismiss, a ringing alarm stops by itself after this long
+RING_SECONDS = 120
+
+
+class EventLoop:
+    """Run callbacks handed over from other threads on one thread, like Tk's after(0, ...)"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def call_soon(self, callback, *args):
+        self._queue.put((callback, args))
+
+    def call_later(self, seconds, callback, *args):
+        timer = threading.Timer(seconds, self.call_soon, (callback,) + args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def stop(self):
+        self._queue.put((None, ()))
+
+    def run(self):
+        while True:
+            try:
+                callback, args = self._queue.get()
+            except KeyboardInterrupt:
+                return
+            if callback is None:
+                return
+            try:
+                callback(*args)
+            except Exception:
+                log.exception("Event loop error")
+
+
+def run_daemon(listen=True, ring_seconds=RING_SECONDS):
+    """Run the alarm clock without a GUI until interrupted
+
+    Status goes to stdout, commands come from the microphone and fired
+    alarms ring and are announced until they time out.
+    """
+    started = time.perf_counter()
+    loop = EventLoop()
+    engine = AlarmEngine(loop.call_soon)
+    engine.on("status", lambda text: print(f"Status: {text}"))
+    engine.on("alarm_fired", lambda alarm: loop.call_later(ring_seconds, engine.dismiss_alarm, alarm))
+    engine.start()
+    engine.warm_up()
+    control_api = None
+    if API_PORT or API_SOCKET:
+        from control_api import ControlServer
+        control_api = ControlServer(engine, port=API_PORT, path=API_SOCKET)
+        control_api.start()
+    if listen:
+        engine.start_listening()
+    print(f"Alarm daemon ready in {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{len(engine.alarms)} alarms")
+    signal.signal(signal.SIGTERM, lambda signum, frame: loop.stop())
+    try:
+        loop.run()
+    finally:
+        if control_api:
+            control_api.stop()
+        engine.stop()
+
+
+if __name__ == "__main__":
+    # The engine's diagnostics go to the console, as they do under the GUI
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_daemon()
@@ -0,0 +1,765 @@
+import datetime
+import logging
+import os
+import threading
+import time
+
+import metrics
+from alarm_journal import AlarmJournal
+from alarm_store import Alarm, AlarmStore
+from clock import SYSTEM_CLOCK
+from command_parser import (
+    DELETE_ALL, INVALID_TIME, LIST_ALARMS, NO_TIME, SET_ALARM, TELL_TIME, UNKNOWN,
+    best_alternative, parse_command,
+)
+from recurrence import compile_rule, describe_rule, make_rule, next_fire
+from scheduler import AlarmScheduler, next_fire_time, parse_clock
+from speech_queue import PRIORITY_ALARM, PRIORITY_NORMAL, SpeechQueue
+
+log = logging.getLogger(__name__)
+
+# pygame, pyttsx3 and speech_recognition are slow to import on small boards,
+# so they (and the modules built on them) are only imported on first use
+
+ALARMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alarms.journal")
+# An offline Vosk model here switches recognition to the on-device streaming engine
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model"))
+# Commands must start with this phrase when the offline engine is available; empty disables gating
+WAKE_PHRASE = os.environ.get("WAKE_PHRASE", "hey clock")
+# Rooms to listen in as "name=device_index,...", e.g. "kitchen=1,bedroom=3" (indexes as
+# listed by sr.Microphone.list_microphone_names()); unset means the default microphone
+ROOMS = os.environ.get("ALARM_ROOMS", "")
+DEFAULT_ROOM = "default"
+# Pre-rendered audio for fixed phrases so they play without synthesis
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+CACHED_PHRASES = [
+    "All alarms deleted",
+    "You have no active alarms",
+    "Alarm set for",
+    "Alarm!",
+    "Your alarms are:",
+    "The current time is",
+    "Sorry, I didn't understand that command",
+]
+# Latency metrics: a Prometheus text file rewritten periodically, a localhost
+# /metrics endpoint and a JSON-lines log of every observation; each is off when unset
+METRICS_FILE = os.environ.get("ALARM_METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("ALARM_METRICS_PORT", "0"))
+METRICS_LOG = os.environ.get("ALARM_METRICS_LOG", "")
+# Local control API (see control_api.py): a TCP port on 127.0.0.1 and/or a Unix socket path
+API_PORT = int(os.environ.get("ALARM_API_PORT", "0"))
+API_SOCKET = os.environ.get("ALARM_API_SOCKET", "")
+# Imports are journalled this many alarms at a time
+IMPORT_BATCH_SIZE = 1000
+# Background imports apply smaller batches, each short enough not to stall the UI
+QUEUED_IMPORT_BATCH_SIZE = 200
+# Default snooze length for the notifier and the control API
+SNOOZE_SECONDS = 5 * 60
+# Alarms missed by less than this while the device was off still fire on startup
+MISSED_ALARM_GRACE = 300
+
+# Per-alarm list events held back while apply_changes() runs
+LIST_EVENTS = ("alarm_added", "alarm_changed", "alarm_removed", "alarms_cleared")
+
+# Events a front end can subscribe to with AlarmEngine.on(), and their arguments
+EVENTS = {
+    "status": "text",
+    "listening": "is_listening",
+    "command": "command, room",
+    "alarms_loaded": "alarms",
+    "alarm_added": "alarm",
+    "alarm_changed": "alarm",
+    "alarm_removed": "alarm_id",
+    "alarms_cleared": "",
+    # Many alarms changed at once (apply_changes); redraw the whole list
+    "alarms_reset": "alarms",
+    "alarm_fired": "alarm",
+    "alarm_stopped": "alarm_id",
+}
+
+
+def parse_rooms(text):
+    """{room: microphone device index} from an ALARM_ROOMS string"""
+    rooms = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        name, _, device = entry.partition("=")
+        rooms[name.strip()] = int(device) if device.strip() else None
+    return rooms or {DEFAULT_ROOM: None}
+
+
+class AlarmEngine:
+    """The alarm clock without a GUI: storage, scheduling, commands and speech
+
+    Work arriving on other threads (the scheduler, the microphone, the
+    recognizer pool) is handed to call_soon, which must run it on the one
+    thread that owns the engine - Tk's after(0, ...) for the GUI, an
+    EventLoop for the headless daemon. Front ends learn about changes by
+    subscribing to the events in EVENTS; handlers run on that same thread.
+    Each room in rooms ({name: microphone device index}) is captured on its
+    own thread with its own noise floor and wake-word state, all feeding
+    one recognizer pool; commands carry the room they were heard in.
+    All time comes from clock, so a SimulatedClock can fast-forward it;
+    components holds ready-made subsystems by name (e.g. silent stand-ins
+    for "alarm_sound" and "speech") that are then never initialised.
+    Wake-word gating needs a "wake_spotter": the Vosk model provides one,
+    or one can be passed in, and it then gates the batch recognizer too.
+    """
+
+    def __init__(self, call_soon, alarms_file=ALARMS_FILE, clock=SYSTEM_CLOCK, components=None, rooms=None):
+        self.call_soon = call_soon
+        self.rooms = rooms if rooms is not None else parse_rooms(ROOMS)
+        self.clock = clock
+        self.handlers = {name: [] for name in EVENTS}
+        # Milliseconds each subsystem took to import and initialise
+        self.timings = {}
+        self._components = dict(components or {})
+        self._component_locks = {}
+        # Subsystems that failed to start, so they are not retried on every use
+        self._component_failures = {}
+
+        # Alarm storage
+        started = time.perf_counter()
+        self.alarms = AlarmStore(AlarmJournal(alarms_file))
+        self.timings["alarms"] = (time.perf_counter() - started) * 1000
+        self.scheduler = AlarmScheduler(self.on_alarm_due, clock)
+        self.ringing = {}
+        self.listening = False
+        self.captures = {}
+        # Per-room stop flags, set before capture threads have registered their captures
+        self._stop_events = {}
+        self._listen_threads = []
+        self.microphones = {}
+        self.recognizer = None
+        # The offline engine when its model is installed; rooms then stream to it
+        self.vosk_backend = None
+        self.listeners = {}
+        self.wake_gates = {}
+        self._batching = False
+
+    def _component(self, name, create):
+        """Create a subsystem on first use, once, whichever thread gets there first
+
+        If create raises, later uses raise the same error without trying again.
+        """
+        component = self._components.get(name)
+        if component is not None:
+            return component
+        with self._component_locks.setdefault(name, threading.Lock()):
+            component = self._components.get(name)
+            if component is None:
+                failure = self._component_failures.get(name)
+                if failure is not None:
+                    raise failure.with_traceback(None)
+                started = time.perf_counter()
+                try:
+                    component = create()
+                except Exception as e:
+                    self._component_failures[name] = e
+                    raise
+                self.timings[name] = (time.perf_counter() - started) * 1000
+                self._components[name] = component
+        return component
+
+    @property
+    def mixer(self):
+        return self._component("mixer", self._init_mixer)
+
+    @property
+    def alarm_sound(self):
+        return self._component("alarm_sound", self._create_alarm_sound)
+
+    @property
+    def tts_engine(self):
+        return self._component("tts", self._create_tts)
+
+    @property
+    def speech(self):
+        return self._component("speech", self._create_speech)
+
+    @property
+    def wake_spotter(self):
+        return self._component("wake_spotter", self._create_wake_spotter)
+
+    @property
+    def recognition(self):
+        return self._component("recognition", self._create_recognition)
+
+    def _init_mixer(self):
+        import pygame
+        # Initialize pygame for alarm sound
+        pygame.mixer.init()
+        return pygame.mixer
+
+    def _create_alarm_sound(self):
+        # Tones are built for the mixer's format, so it must be up first
+        self.mixer
+        from alarm_sound import AlarmSoundPlayer
+        return AlarmSoundPlayer()
+
+    def _create_tts(self):
+        import pyttsx3
+        engine = pyttsx3.init()
+        self.setup_tts(engine)
+        return engine
+
+    def _create_speech(self):
+        # The speech worker owns the TTS engine from here on
+        tts_engine = self.tts_engine
+        try:
+            load_sound = self.mixer.Sound
+        except Exception as e:
+            # No cached phrases without the mixer, but everything can still be synthesized
+            log.warning("Mixer unavailable, speaking without the phrase cache: %s", e)
+            load_sound = None
+        speech = SpeechQueue(tts_engine, CACHED_PHRASES, TTS_CACHE_DIR, load_sound)
+        speech.start()
+        return speech
+
+    def _create_recognition(self):
+        """Set up the recognizers; returns the batch pipeline"""
+        import speech_recognition as sr
+        from recognition_pipeline import RecognitionPipeline
+        from recognizers import GoogleBackend, VoskBackend
+        self.recognizer = sr.Recognizer()
+        if os.path.isdir(VOSK_MODEL_PATH):
+            # Offline engine: transcribe while capturing and act on partial results
+            self.vosk_backend = VoskBackend(VOSK_MODEL_PATH)
+        return RecognitionPipeline(GoogleBackend(self.recognizer), self.on_recognition_result)
+
+    def _create_wake_spotter(self):
+        """A keyword spotter for WAKE_PHRASE, or None without the offline model"""
+        if not WAKE_PHRASE or self.vosk_backend is None:
+            return None
+        from wake_word import VoskSpotter
+        return VoskSpotter(self.vosk_backend, WAKE_PHRASE)
+
+    def _room_listener(self, room):
+        """The capture listener for one room: its own streaming and wake-word state"""
+        listener = None
+        if self.vosk_backend is not None:
+            from recognition_pipeline import StreamingRecognition
+            listener = StreamingRecognition(self.vosk_backend, self.on_recognition_result, self.command_is_complete, room=room)
+        spotter = self.wake_spotter if WAKE_PHRASE else None
+        if spotter is not None:
+            from wake_word import WakeWordGate
+            # Spot the wake phrase locally before any full recognition runs
+            listener = self.wake_gates[room] = WakeWordGate(
+                spotter, WAKE_PHRASE, inner=listener,
+                on_wake=lambda: self.call_soon(self._emit, "status", self._in_room("Listening for your command...", room))
+            )
+        return listener
+
+    def _in_room(self, text, room):
+        return f"{room}: {text}" if room is not None and len(self.rooms) > 1 else text
+
+    def warm_up(self):
+        """Initialise every subsystem on a background thread; returns the thread"""
+        def run():
+            started = time.perf_counter()
+            # Alarm sound first: it is the one that must never be late
+            for name in ("alarm_sound", "speech", "recognition"):
+                try:
+                    getattr(self, name)
+                except Exception as e:
+                    log.warning("Could not initialise %s: %s", name, e)
+            self.timings["warm_up"] = (time.perf_counter() - started) * 1000
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def setup_tts(self, engine):
+        """Configure text-to-speech settings"""
+        voices = engine.getProperty('voices')
+        if voices:
+            engine.setProperty('voice', voices[0].id)
+        engine.setProperty('rate', 150)
+        engine.setProperty('volume', 0.8)
+
+    def on(self, event, handler):
+        """Call handler with the event's arguments whenever it happens"""
+        self.handlers[event].append(handler)
+
+    def _emit(self, event, *args):
+        if self._batching and event in LIST_EVENTS:
+            return
+        for handler in self.handlers[event]:
+            try:
+                handler(*args)
+            except Exception:
+                log.exception("Error in %s handler", event)
+
+    def start(self):
+        """Schedule the saved alarms; other subsystems start on first use or warm_up()"""
+        self.restore_alarms()
+        self.scheduler.start()
+        self.start_metrics()
+
+    def start_metrics(self):
+        """Start whichever metrics exports are configured"""
+        if METRICS_LOG:
+            metrics.METRICS.open_log(METRICS_LOG)
+        if METRICS_FILE:
+            metrics.METRICS.start_file_export(METRICS_FILE)
+        if METRICS_PORT:
+            try:
+                metrics.METRICS.serve(METRICS_PORT)
+            except OSError as e:
+                log.warning("Could not serve metrics on port %s: %s", METRICS_PORT, e)
+
+    def stop(self):
+        self.stop_listening()
+        self.scheduler.stop()
+        if "speech" in self._components:
+            self._components["speech"].stop()
+        if "alarm_sound" in self._components:
+            self._components["alarm_sound"].stop_all()
+        self.alarms.journal.close()
+        if METRICS_FILE:
+            metrics.METRICS.write_prometheus(METRICS_FILE)
+        metrics.METRICS.close()
+
+    def speak(self, text, priority=PRIORITY_NORMAL, key=None):
+        """Queue text for the speech worker; without working speech, only report it"""
+        try:
+            self.speech.speak(text, priority, key)
+        except Exception as e:
+            log.warning("Speech unavailable, not saying %r: %s", text, e)
+
+    def start_listening(self):
+        """Start listening for voice commands"""
+        if self.listening:
+            return
+        recognition = self.recognition
+        self.listening = True
+        self._emit("listening", True)
+        if WAKE_PHRASE and self.wake_spotter is not None:
+            self._emit("status", f"Listening... Say '{WAKE_PHRASE}' then your command")
+        else:
+            self._emit("status", "Listening... Speak your command")
+
+        if self.vosk_backend is None:
+            recognition.start()
+        # A stopped capture finishes its current frame, then closes its microphone
+        for thread in self._listen_threads:
+            thread.join(2.0)
+        self._listen_threads = []
+        for room, device in self.rooms.items():
+            self._stop_events[room] = threading.Event()
+            thread = threading.Thread(target=self._listen_room, args=(room, device), daemon=True)
+            self._listen_threads.append(thread)
+            thread.start()
+
+    def _listen_room(self, room, device):
+        try:
+            import speech_recognition as sr
+            if room not in self.microphones:
+                self.microphones[room] = sr.Microphone(device_index=device)
+            # Keep one stream open; the capture tracks the noise floor as it goes
+            with self.microphones[room] as source:
+                self.capture_room(room, source)
+        except Exception as e:
+            self.call_soon(self._emit, "status", self._in_room(f"Error: {e}", room))
+
+    def capture_room(self, room, source):
+        """Capture commands from an open audio source until stop_listening()"""
+        from audio_capture import ContinuousCapture
+        if room not in self.listeners:
+            self.listeners[room] = self._room_listener(room)
+        capture = ContinuousCapture(source, phrase_time_limit=5, listener=self.listeners[room])
+        self.captures[room] = capture
+        stop_event = self._stop_events.get(room)
+        if stop_event is not None and stop_event.is_set():
+            # stop_listening() ran before this capture existed
+            capture.stop()
+        wake_gate = self.wake_gates.get(room)
+        try:
+            for audio in capture.utterances():
+                # Streaming results were already delivered; otherwise hand
+                # off to the recognizer pool and keep capturing
+                if self.vosk_backend:
+                    continue
+                if wake_gate is None or wake_gate.passed:
+                    self.recognition.submit(audio, room)
+        finally:
+            if self.captures.get(room) is capture:
+                del self.captures[room]
+
+    def stop_listening(self):
+        """Stop listening for voice commands"""
+        if not self.listening:
+            return
+        self.listening = False
+        for stop_event in self._stop_events.values():
+            stop_event.set()
+        for capture in list(self.captures.values()):
+            capture.stop()
+        if "recognition" in self._components:
+            self._components["recognition"].stop()
+        self._emit("listening", False)
+
+    def on_recognition_result(self, result):
+        """Called in spoken order from the recognizer workers"""
+        import speech_recognition as sr
+        if result.dropped:
+            return
+        if result.error is None:
+            alternatives = result.alternatives or [result.text]
+            wake_gate = self.wake_gates.get(result.room)
+            if wake_gate:
+                alternatives = [wake_gate.strip(text) for text in alternatives]
+            # Take the first n-best transcript that makes a usable command
+            started = time.perf_counter()
+            command, parsed = best_alternative(alternatives, self.clock.now().hour)
+            metrics.observe("parse", time.perf_counter() - started, seq=result.seq, alternatives=len(alternatives))
+            if not command:
+                # Only the wake phrase was said; wait for the command itself
+                return
+            log.info("Recognized command (%s): %s", result.room, command)
+            self.call_soon(self._dispatch, command, parsed, time.perf_counter(), result.room)
+        elif isinstance(result.error, sr.UnknownValueError):
+            self.call_soon(self._emit, "status", self._in_room("Could not understand audio", result.room))
+        elif isinstance(result.error, sr.RequestError):
+            self.call_soon(self._emit, "status", f"Speech recognition error: {result.error}")
+        else:
+            self.call_soon(self._emit, "status", f"Error: {result.error}")
+
+    def _dispatch(self, command, parsed, queued, room=None):
+        started = time.perf_counter()
+        metrics.observe("dispatch", started - queued, room=room)
+        self.process_command(command, parsed, room)
+        metrics.observe("command", time.perf_counter() - started, intent=parsed.intent, command=command, room=room)
+
+    def command_is_complete(self, text):
+        """Whether a partial transcript is already an unambiguous command"""
+        parsed = parse_command(text, 0)
+        if parsed.intent == SET_ALARM:
+            # A guessed AM/PM changes with the hour of day, so more words may follow
+            return parsed.error is None and parse_command(text, 23) == parsed
+        return parsed.intent != UNKNOWN
+
+    def process_command(self, command, parsed=None, room=None):
+        """Process voice commands; room is where it was heard, if anywhere"""
+        log.info("Processing command: %s", command)
+        self._emit("command", command, room)
+        if parsed is None:
+            parsed = parse_command(command, self.clock.now().hour)
+
+        if parsed.intent == SET_ALARM:
+            self.process_alarm_command(parsed)
+        elif parsed.intent == TELL_TIME:
+            current_time = self.clock.now().strftime("%I:%M %p")
+            self.speak(f"The current time is {current_time}", key="time")
+            log.info("Speaking: The current time is %s", current_time)
+        elif parsed.intent == LIST_ALARMS:
+            if self.alarms:
+                alarm_list = ", ".join([f"{alarm.time} {alarm.label}" for alarm in self.alarms])
+                self.speak(f"Your alarms are: {alarm_list}")
+            else:
+                self.speak("You have no active alarms")
+        elif parsed.intent == DELETE_ALL:
+            self.clear_alarms()
+            self.speak("All alarms deleted")
+        else:
+            self.speak("Sorry, I didn't understand that command")
+
+    def process_alarm_command(self, parsed):
+        """Set an alarm from a parsed set_alarm command"""
+        log.info("Processing alarm command: %s", parsed)
+
+        if parsed.error == NO_TIME:
+            self.speak("I couldn't understand the time. Please try again with a format like '4:30 PM' or '4 PM'.")
+            return
+        if parsed.error == INVALID_TIME:
+            self.speak("Invalid time format. Please try again.")
+            return
+
+        try:
+            label = parsed.label
+            if parsed.delay_minutes is not None:
+                # "in 20 minutes": an exact moment rather than a clock minute
+                fire_at = self.clock.now() + datetime.timedelta(minutes=parsed.delay_minutes)
+                alarm_time = fire_at.strftime("%I:%M %p")
+                self.add_alarm(alarm_time, label, fire_at=fire_at.timestamp())
+            else:
+                alarm_time = f"{parsed.hour:02d}:{parsed.minute:02d} {parsed.ampm}"
+                self.add_alarm(alarm_time, label, repeat=parsed.repeat)
+            if parsed.repeat and parsed.delay_minutes is None:
+                alarm_time = f"{alarm_time} {describe_rule(make_rule(0, 0, parsed.repeat))}"
+            if label != "Alarm":
+                self.speak(f"Alarm set for {alarm_time} with label {label}")
+            else:
+                self.speak(f"Alarm set for {alarm_time}")
+
+        except Exception:
+            log.exception("Error in alarm processing")
+            self.speak("Sorry, there was an error setting the alarm.")
+
+    def add_alarm(self, time_str, label, fire_at=None, repeat=None):
+        """Add an alarm; repeat is a cron day-of-week field for a recurring alarm"""
+        rule = None
+        if repeat:
+            rule = make_rule(*parse_clock(time_str), repeat)
+            # Like a one-shot alarm, one set for the current minute still fires
+            fire_at = next_fire(rule, self.clock.time() - 60)
+        elif fire_at is None:
+            fire_at = next_fire_time(time_str, self.clock.time())
+        alarm = self.alarms.add(fire_at, label, rule=rule)
+        self.scheduler.schedule(alarm.id, alarm.fire_at)
+        self._emit("alarm_added", alarm)
+        log.info("Added alarm: %s", alarm)
+        return alarm
+
+    def remove_alarm(self, alarm_id):
+        """Delete an alarm; returns it, or None if unknown"""
+        alarm = self.alarms.remove(alarm_id)
+        if alarm is None:
+            return None
+        self.scheduler.cancel(alarm_id)
+        # Its tone may already be playing: on_alarm_due starts it before fire_alarm runs
+        self._silence(alarm_id)
+        self._emit("alarm_removed", alarm_id)
+        return alarm
+
+    def apply_change(self, change):
+        """Apply one change dict (see _check_change); returns the alarm it touched"""
+        method, args = self._check_change("change", change, set())
+        return method(*args)
+
+    def apply_changes(self, changes):
+        """Apply a list of changes all-or-nothing, in one journal flush and one redraw
+
+        Every change is checked before any is applied; the first bad one
+        raises ValueError (malformed) or KeyError (unknown or not ringing
+        alarm) naming its index. Returns the alarm each change touched.
+        """
+        seen = set()
+        checked = [self._check_change(f"change {index}", change, seen) for index, change in enumerate(changes)]
+        results = self._apply_checked(checked)
+        self._emit("alarms_reset", self.alarms)
+        return results
+
+    def import_changes(self, changes, batch_size=IMPORT_BATCH_SIZE):
+        """Add alarms from an iterable of add changes (see alarm_io), batch_size at a time
+
+        Unlike apply_changes() the input is streamed: bad rows are skipped
+        and reported, each batch is one journal flush and the list is
+        redrawn once at the end. A change may carry the "line" it came from
+        for the error messages. Returns (imported, errors).
+        """
+        imported = 0
+        errors = []
+        try:
+            for checked in self._checked_batches(changes, batch_size, errors):
+                imported += len(self._apply_checked(checked))
+        finally:
+            # Whatever was stored before a failure still has to be listed
+            self._emit("alarms_reset", self.alarms)
+        return imported, errors
+
+    def queue_import(self, changes, on_done, batch_size=QUEUED_IMPORT_BATCH_SIZE, errors=None):
+        """import_changes() for a worker thread, so a large import never blocks the engine
+
+        Changes are read and checked on the calling thread and each batch is
+        applied on the engine's thread. on_done(imported, errors, failure)
+        runs there after the one alarms_reset, however the import ends;
+        failure is the exception that cut it short (a bad file raises
+        OSError, ValueError or csv.Error), or None. Skipped rows are added
+        to errors, which may be shared with the reader.
+        """
+        errors = errors if errors is not None else []
+        imported = [0]
+        # At most two batches wait on the engine's thread, so its other work is never stuck behind the import
+        in_flight = threading.Semaphore(2)
+
+        def apply(checked):
+            try:
+                imported[0] += len(self._apply_checked(checked))
+            finally:
+                in_flight.release()
+
+        def finish(failure):
+            self._emit("alarms_reset", self.alarms)
+            on_done(imported[0], errors, failure)
+
+        failure = None
+        try:
+            for checked in self._checked_batches(changes, batch_size, errors):
+                in_flight.acquire()
+                self.call_soon(apply, checked)
+        except Exception as e:
+            # Reported through on_done; the reader thread just ends
+            failure = e
+        finally:
+            self.call_soon(finish, failure)
+
+    def _checked_batches(self, changes, batch_size, errors):
+        """Yield lists of (method, args) for the importable changes; the rest go to errors"""
+        checked = []
+        now = self.clock.time()
+        for index, change in enumerate(changes):
+            where = f"line {change.get('line', index)}" if isinstance(change, dict) else f"change {index}"
+            try:
+                method, args = self._check_change(where, change, None)
+                if method != self.add_alarm:
+                    raise ValueError(f"{where}: only new alarms can be imported")
+                time_str, _, fire_at, repeat = args
+                if not repeat and fire_at is not None and fire_at < now:
+                    raise ValueError(f"{where}: {time_str} on that date has already passed")
+            except (KeyError, ValueError) as e:
+                errors.append(e.args[0])
+                continue
+            checked.append((method, args))
+            if len(checked) >= batch_size:
+                yield checked
+                checked = []
+        if checked:
+            yield checked
+
+    def _apply_checked(self, checked):
+        results = []
+        self._batching = True
+        try:
+            with self.alarms.batch():
+                for method, args in checked:
+                    results.append(method(*args))
+        finally:
+            self._batching = False
+        return results
+
+    def _check_change(self, where, change, seen):
+        """Validate {"op": "add"|"delete"|"snooze", ...}; returns the method and arguments to apply it"""
+        if not isinstance(change, dict):
+            raise ValueError(f"{where}: expected an object")
+        op = change.get("op", "add")
+        if op == "add":
+            label = str(change.get("label") or "Alarm")
+            repeat = change.get("repeat")
+            fire_at = change.get("fire_at")
+            time_str = change.get("time")
+            try:
+                if repeat:
+                    compile_rule(make_rule(0, 0, repeat))
+                    parse_clock(time_str)
+                elif fire_at is not None:
+                    fire_at = float(fire_at)
+                    time_str = datetime.datetime.fromtimestamp(fire_at).strftime("%I:%M %p")
+                else:
+                    parse_clock(time_str)
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                raise ValueError(f"{where}: bad time or repeat: {e}")
+            return self.add_alarm, (time_str, label, fire_at, repeat)
+        if op not in ("delete", "snooze"):
+            raise ValueError(f"{where}: unknown op {op!r}")
+        alarm_id = change.get("id")
+        if seen is not None:
+            if alarm_id in seen:
+                raise ValueError(f"{where}: alarm {alarm_id} changed twice")
+            seen.add(alarm_id)
+        if op == "delete":
+            if alarm_id not in self.alarms:
+                raise KeyError(f"{where}: no alarm {alarm_id}")
+            return self.remove_alarm, (alarm_id,)
+        alarm = self.ringing.get(alarm_id)
+        if alarm is None:
+            raise KeyError(f"{where}: alarm {alarm_id} is not ringing")
+        try:
+            if "until" in change:
+                until = float(change["until"])
+            else:
+                until = self.clock.time() + float(change.get("seconds", SNOOZE_SECONDS))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{where}: bad snooze time: {e}")
+        return self.snooze_alarm, (alarm, until)
+
+    def clear_alarms(self):
+        """Delete every alarm and silence any that are ringing"""
+        self.alarms.clear()
+        self.scheduler.clear()
+        if "alarm_sound" in self._components:
+            self._components["alarm_sound"].stop_all()
+        self.ringing.clear()
+        self._emit("alarms_cleared")
+
+    def restore_alarms(self):
+        """Schedule the alarms loaded from the journal, dropping finished one-shots"""
+        now = self.clock.time()
+        cutoff = now - MISSED_ALARM_GRACE
+        with self.alarms.batch():
+            for alarm in self.alarms:
+                if alarm.rule and alarm.active:
+                    if alarm.fire_at < cutoff:
+                        # Skip the occurrences missed while the app was closed
+                        self.alarms.advance(alarm.id, next_fire(alarm.rule, now))
+                    self.scheduler.schedule(alarm.id, alarm.fire_at)
+                elif not alarm.active or alarm.fire_at < cutoff:
+                    self.alarms.remove(alarm.id)
+                else:
+                    self.scheduler.schedule(alarm.id, alarm.fire_at)
+        self._emit("alarms_loaded", self.alarms)
+
+    def on_alarm_due(self, alarm_id, fire_at):
+        """Called from the scheduler thread when an alarm is due"""
+        metrics.observe("alarm_fire_lag", max(0.0, self.clock.time() - fire_at), alarm_id=alarm_id)
+        alarm = self.alarms.get(alarm_id)
+        if alarm and alarm.active:
+            # Start the tone right here rather than waiting for the engine's thread
+            try:
+                self.alarm_sound.start(alarm_id)
+                metrics.observe("alarm_sound_start", max(0.0, self.clock.time() - fire_at), alarm_id=alarm_id)
+            except Exception as e:
+                # Still announce and show it; a silent alarm beats a lost one
+                log.warning("Could not play alarm sound: %s", e)
+        self.call_soon(self.fire_alarm, alarm_id)
+
+    def fire_alarm(self, alarm_id):
+        """Move a due alarm on (recurring) or evict it (one-shot), then announce it"""
+        alarm = self.alarms.get(alarm_id)
+        if alarm is None or not alarm.active:
+            if alarm_id not in self.ringing:
+                # Removed after on_alarm_due started the tone; nothing else would stop it
+                self._stop_sound(alarm_id)
+            return
+        if alarm.rule:
+            # Only this rule is evaluated, once per firing
+            fired = Alarm(alarm.id, alarm.fire_at, alarm.label, False)
+            self.alarms.advance(alarm.id, next_fire(alarm.rule, alarm.fire_at))
+            self.scheduler.schedule(alarm.id, alarm.fire_at)
+            self._emit("alarm_changed", alarm)
+        else:
+            fired = alarm
+            self.alarms.remove(alarm_id)
+            self._emit("alarm_removed", alarm_id)
+        self.ringing[alarm_id] = fired
+        self._emit("alarm_fired", fired)
+        # Alarms firing together replace each other's queued announcement
+        if len(self.ringing) == 1:
+            self.speak(f"Alarm! {fired.label}. Time is {fired.time}", PRIORITY_ALARM, key="alarm")
+        else:
+            self.speak(f"Alarm! {len(self.ringing)} alarms are ringing", PRIORITY_ALARM, key="alarm")
+
+    def snooze_alarm(self, alarm, until):
+        """Silence a ringing alarm and set a new one for the exact snooze time"""
+        self.dismiss_alarm(alarm)
+        label = alarm.label if alarm.label.endswith("(Snoozed)") else f"{alarm.label} (Snoozed)"
+        snooze_time_str = datetime.datetime.fromtimestamp(until).strftime("%I:%M %p")
+        return self.add_alarm(snooze_time_str, label, fire_at=until)
+
+    def dismiss_alarm(self, alarm):
+        """Silence a ringing alarm"""
+        self._silence(alarm.id)
+
+    def _silence(self, alarm_id):
+        self._stop_sound(alarm_id)
+        if self.ringing.pop(alarm_id, None) is not None:
+            self._emit("alarm_stopped", alarm_id)
+
+    def _stop_sound(self, alarm_id):
+        # A player that was never created has nothing to stop; don't start the mixer for it
+        if "alarm_sound" not in self._components:
+            return
+        try:
+            self._components["alarm_sound"].stop(alarm_id)
+        except Exception as e:
+            log.warning("Could not stop alarm sound: %s", e)
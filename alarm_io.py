@@ -0,0 +1,277 @@
+import csv
+import datetime
+import os
+import re
+import sys
+import threading
+
+from recurrence import compile_rule
+
+CSV_FIELDS = ["date", "time", "label", "repeat"]
+# iCalendar and cron day names, indexed by Python weekday (Monday = 0)
+ICAL_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+CRON_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+ICAL_ESCAPE = re.compile(r"\\(.)")
+TIME_PATTERN = re.compile(r"\s*(\d{1,2})(?::(\d{2}))?\s*([ap]m)?\s*$", re.IGNORECASE)
+
+
+def parse_time(text):
+    """(hour, minute) of '7:30 am', '07:30 PM', '19:30' or '7 pm'"""
+    match = TIME_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"unrecognised time {text.strip()!r}")
+    hour, minute, ampm = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if ampm:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"unrecognised time {text.strip()!r}")
+        hour = hour % 12 + (12 if ampm.lower() == "pm" else 0)
+    elif match.group(2) is None or hour > 23:
+        raise ValueError(f"unrecognised time {text.strip()!r}")
+    if minute > 59:
+        raise ValueError(f"unrecognised time {text.strip()!r}")
+    return hour, minute
+
+
+def read_csv(f, errors):
+    """Yield an add change per row of a CSV with a header naming date, time, label, repeat
+
+    Only time is required. date (YYYY-MM-DD) pins a one-shot alarm to a
+    day; repeat is a cron day-of-week field or daily/weekdays/weekends.
+    Rows that do not parse are skipped and reported in errors.
+    """
+    reader = csv.reader(f)
+    header = [name.strip().lower() for name in next(reader, [])]
+    if "time" not in header:
+        raise ValueError("CSV needs a header row with a 'time' column")
+    columns = {name: header.index(name) for name in CSV_FIELDS if name in header}
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        line = reader.line_num
+        fields = {name: row[index].strip() if index < len(row) else "" for name, index in columns.items()}
+        try:
+            hour, minute = parse_time(fields["time"])
+            change = {"op": "add", "line": line, "label": fields.get("label") or "Alarm"}
+            if fields.get("date") and not fields.get("repeat"):
+                day = datetime.date.fromisoformat(fields["date"])
+                change["fire_at"] = datetime.datetime(day.year, day.month, day.day, hour, minute).timestamp()
+            else:
+                change["time"] = f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+                if fields.get("repeat"):
+                    change["repeat"] = fields["repeat"]
+        except ValueError as e:
+            errors.append(f"line {line}: {e}")
+            continue
+        yield change
+
+
+def write_csv(alarms, f):
+    """Write alarms as CSV that read_csv() reads back; returns the row count"""
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for alarm in alarms:
+        day = datetime.datetime.fromtimestamp(alarm.fire_at).date().isoformat()
+        writer.writerow([day, alarm.time, alarm.label, alarm.rule.split()[4] if alarm.rule else ""])
+        count += 1
+    return count
+
+
+def _ical_lines(f):
+    """Yield (line number, unfolded content line)"""
+    pending = None
+    start = 0
+    for number, raw in enumerate(f, 1):
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t") and pending is not None:
+            pending += raw[1:]
+            continue
+        if pending is not None:
+            yield start, pending
+        pending, start = raw, number
+    if pending is not None:
+        yield start, pending
+
+
+def _ical_time(value, params):
+    """Epoch time of a DATE-TIME; floating and TZID times are taken as local"""
+    utc = value.endswith("Z")
+    moment = datetime.datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if utc:
+        return moment.replace(tzinfo=datetime.timezone.utc).timestamp()
+    if "TZID" in params:
+        try:
+            import zoneinfo
+            return moment.replace(tzinfo=zoneinfo.ZoneInfo(params["TZID"])).timestamp()
+        except (ImportError, KeyError, ValueError):
+            pass
+    return moment.timestamp()
+
+
+def _repeat_days(rrule, start):
+    """Cron day-of-week field for a DAILY or WEEKLY RRULE"""
+    parts = dict(part.split("=", 1) for part in rrule.upper().split(";") if "=" in part)
+    if parts.get("INTERVAL", "1") != "1" or "COUNT" in parts or "UNTIL" in parts:
+        raise ValueError(f"unsupported RRULE {rrule!r}")
+    if parts.get("FREQ") == "DAILY" and "BYDAY" not in parts:
+        return "*"
+    if parts.get("FREQ") in ("DAILY", "WEEKLY"):
+        days = parts.get("BYDAY", ICAL_DAYS[start.weekday()]).split(",")
+        try:
+            return ",".join(CRON_DAYS[ICAL_DAYS.index(day[-2:])] for day in days)
+        except ValueError:
+            raise ValueError(f"unsupported RRULE {rrule!r}")
+    raise ValueError(f"unsupported RRULE {rrule!r}")
+
+
+def read_ical(f, errors):
+    """Yield an add change per VEVENT: DTSTART, SUMMARY and a DAILY/WEEKLY RRULE
+
+    Events that do not fit an alarm are skipped and reported in errors.
+    """
+    event = None
+    for line, content in _ical_lines(f):
+        name, _, value = content.partition(":")
+        name, *param_list = name.split(";")
+        name = name.upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {"line": line}
+        elif event is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            try:
+                if "DTSTART" not in event:
+                    raise ValueError("event has no DTSTART")
+                value, params = event["DTSTART"]
+                if "T" not in value:
+                    raise ValueError("all-day events have no alarm time")
+                fire_at = _ical_time(value, params)
+                start = datetime.datetime.fromtimestamp(fire_at)
+                change = {"op": "add", "line": event["line"], "label": event.get("SUMMARY") or "Alarm"}
+                if "RRULE" in event:
+                    change.update(time=start.strftime("%I:%M %p"), repeat=_repeat_days(event["RRULE"], start))
+                else:
+                    change["fire_at"] = fire_at
+            except ValueError as e:
+                errors.append(f"line {event['line']}: {e}")
+            else:
+                yield change
+            event = None
+        elif name == "DTSTART":
+            params = dict(param.split("=", 1) for param in param_list if "=" in param)
+            event["DTSTART"] = (value.strip(), params)
+        elif name == "SUMMARY":
+            event["SUMMARY"] = ICAL_ESCAPE.sub(lambda match: " " if match.group(1) in "nN" else match.group(1), value)
+        elif name == "RRULE":
+            event["RRULE"] = value
+
+
+def _ical_text(text):
+    return text.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+
+def _fold(line):
+    """Fold a content line at 75 characters, as RFC 5545 asks"""
+    if len(line) <= 75:
+        return line + "\r\n"
+    parts = [line[:75]] + [line[start:start + 74] for start in range(75, len(line), 74)]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def write_ical(alarms, f):
+    """Write alarms as an iCalendar file of VEVENTs; returns the event count"""
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Voice Alarm Clock//EN\r\n")
+    count = 0
+    for alarm in alarms:
+        start = datetime.datetime.fromtimestamp(alarm.fire_at).strftime("%Y%m%dT%H%M%S")
+        f.write(f"BEGIN:VEVENT\r\nUID:alarm-{alarm.id}-{alarm.fire_at}@voice-alarm-clock\r\nDTSTAMP:{stamp}\r\n"
+                f"DTSTART:{start}\r\n" + _fold(f"SUMMARY:{_ical_text(alarm.label)}"))
+        if alarm.rule:
+            rule = compile_rule(alarm.rule)
+            if rule.any_date:
+                f.write("RRULE:FREQ=DAILY\r\n")
+            elif rule.weekdays is not None:
+                f.write(f"RRULE:FREQ=WEEKLY;BYDAY={','.join(ICAL_DAYS[day] for day in sorted(rule.weekdays))}\r\n")
+        f.write("END:VEVENT\r\n")
+        count += 1
+    f.write("END:VCALENDAR\r\n")
+    return count
+
+
+# File extension: (reader, writer)
+FORMATS = {
+    ".csv": (read_csv, write_csv),
+    ".ics": (read_ical, write_ical),
+    ".ical": (read_ical, write_ical),
+}
+
+
+def _format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown alarm file type {extension!r}; use .csv or .ics")
+    return FORMATS[extension]
+
+
+def import_file(engine, path):
+    """Stream a CSV or iCalendar file into the engine; returns (imported, errors)"""
+    read, _ = _format(path)
+    errors = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        imported, rejected = engine.import_changes(read(f, errors))
+    return imported, errors + rejected
+
+
+def import_file_in_background(engine, path, on_done):
+    """import_file() on a worker thread; on_done(imported, errors, failure) runs on the engine's thread
+
+    An unknown file type raises ValueError straight away.
+    """
+    read, _ = _format(path)
+
+    def run():
+        errors = []
+        try:
+            f = open(path, 'r', encoding='utf-8', newline='')
+        except OSError as e:
+            engine.call_soon(on_done, 0, errors, e)
+            return
+        with f:
+            # Reports any failure, csv.Error included, through on_done
+            engine.queue_import(read(f, errors), on_done, errors=errors)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def export_file(alarms, path):
+    """Write alarms to a CSV or iCalendar file; returns how many were written"""
+    _, write = _format(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        return write(alarms, f)
+
+
+def main(args):
+    """python alarm_io.py import|export FILE - works on the saved alarms while the app is closed"""
+    if len(args) != 2 or args[0] not in ("import", "export"):
+        print("Usage: python alarm_io.py import|export FILE.csv|FILE.ics")
+        return 2
+    from alarm_engine import AlarmEngine
+    engine = AlarmEngine(lambda callback, *callback_args: callback(*callback_args))
+    try:
+        if args[0] == "import":
+            imported, errors = import_file(engine, args[1])
+            for error in errors:
+                print(f"Skipped {error}")
+            print(f"Imported {imported} alarms from {args[1]}")
+        else:
+            print(f"Exported {export_file(engine.alarms, args[1])} alarms to {args[1]}")
+    finally:
+        engine.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+import contextlib
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+
+class AlarmJournal:
+    """Append-only journal of alarm mutations with periodic compaction
+
+    Each line is a compact JSON list:
+        ["add", id, fire_at, active, label]
+        ["add", id, fire_at, active, label, rule]   (recurring)
+        ["next", id, fire_at]                      (recurring alarm moved on)
+        ["del", id]
+        ["off", id]
+        ["clear"]
+    """
+
+    def __init__(self, path, fsync=True, compact_min=1000):
+        self.path = path
+        self.fsync = fsync
+        self.compact_min = compact_min
+        self.records = 0
+        self._file = None
+        self._batch_depth = 0
+
+    def load(self):
+        """Replay the journal; returns {id: (fire_at, active, label, rule)}"""
+        alarms = {}
+        self.records = 0
+        if not os.path.exists(self.path):
+            return alarms
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = f.read()
+        if data and not data.endswith("\n"):
+            # A write torn by a crash; cut it off so the next append starts a fresh line
+            intact = data[:data.rfind("\n") + 1]
+            log.warning("Dropping torn journal record: %r", data[len(intact):])
+            os.truncate(self.path, len(intact.encode('utf-8')))
+            data = intact
+        for record in self._parse(data):
+            self.records += 1
+            op = record[0]
+            if op == "add":
+                alarms[record[1]] = (record[2], bool(record[3]), record[4], record[5] if len(record) > 5 else None)
+            elif op == "next":
+                if record[1] in alarms:
+                    _, active, label, rule = alarms[record[1]]
+                    alarms[record[1]] = (record[2], active, label, rule)
+            elif op == "del":
+                alarms.pop(record[1], None)
+            elif op == "off":
+                if record[1] in alarms:
+                    fire_at, _, label, rule = alarms[record[1]]
+                    alarms[record[1]] = (fire_at, False, label, rule)
+            elif op == "clear":
+                alarms.clear()
+        return alarms
+
+    @staticmethod
+    def _parse(data):
+        """Decode all records in one pass, falling back to per-line on damage"""
+        try:
+            return json.loads("[" + data.rstrip("\n").replace("\n", ",") + "]")
+        except ValueError:
+            pass
+        records = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A torn write from a crash; everything else is intact
+                log.warning("Skipping corrupt journal line: %r", line)
+        return records
+
+    def append(self, record):
+        """Write one mutation record"""
+        f = self._open()
+        f.write(json.dumps(record, separators=(',', ':')) + "\n")
+        self.records += 1
+        if not self._batch_depth:
+            self._sync()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group many mutations into a single flush"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._file:
+                self._sync()
+
+    def needs_compaction(self, live_count):
+        return self.records > self.compact_min and self.records > 2 * live_count
+
+    def compact(self, alarms):
+        """Rewrite the journal as one add record per live alarm"""
+        self.close()
+        tmp_path = self.path + ".tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for alarm in alarms:
+                record = ["add", alarm.id, alarm.fire_at, int(alarm.active), alarm.label]
+                if alarm.rule:
+                    record.append(alarm.rule)
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.records = count
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
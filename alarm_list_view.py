@@ -0,0 +1,139 @@
+import bisect
+import tkinter as tk
+import tkinter.font as tkfont
+
+from recurrence import describe_rule
+
+
+def format_alarm_row(alarm):
+    status = "✓" if alarm.active else "✗"
+    repeat = f" ({describe_rule(alarm.rule)})" if alarm.rule else ""
+    return f"{status} {alarm.time}{repeat} - {alarm.label}"
+
+
+class AlarmListView:
+    """Virtual, incremental view of the alarms in a Tk Listbox
+
+    The listbox only ever holds the rows in the visible window; the
+    scrollbar scrolls over the whole list. Changes are applied per alarm
+    and rendered once when Tk is next idle, rewriting only the rows whose
+    text changed. Rows are kept in alarm id order (the store's insertion
+    order), so a row maps back to its alarm by position and the selection
+    follows the alarm, not the row number.
+    """
+
+    def __init__(self, listbox, scrollbar=None, format_row=format_alarm_row):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.ids = []
+        self.texts = {}
+        self.top = 0
+        self.rows = int(listbox.cget('height')) or 10
+        self.selected = None
+        self.renders = 0
+        self._rendered = []
+        self._pending = None
+        self._line_height = None
+        if scrollbar is not None:
+            scrollbar.config(command=self.on_scroll)
+        listbox.bind('<<ListboxSelect>>', self.on_select)
+        listbox.bind('<Configure>', self.on_resize)
+        listbox.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1, "units"))
+        listbox.bind('<Button-4>', lambda e: self.scroll_by(-1, "units"))
+        listbox.bind('<Button-5>', lambda e: self.scroll_by(1, "units"))
+
+    def reset(self, alarms):
+        """Replace the whole list"""
+        self.texts = {alarm.id: self.format_row(alarm) for alarm in alarms}
+        self.ids = sorted(self.texts)
+        self._schedule()
+
+    def set(self, alarm):
+        """Add an alarm, or update its row if it is already listed"""
+        if alarm.id not in self.texts:
+            if not self.ids or alarm.id > self.ids[-1]:
+                self.ids.append(alarm.id)
+            else:
+                bisect.insort(self.ids, alarm.id)
+        self.texts[alarm.id] = self.format_row(alarm)
+        self._schedule()
+
+    def remove(self, alarm_id):
+        if self.texts.pop(alarm_id, None) is None:
+            return
+        del self.ids[bisect.bisect_left(self.ids, alarm_id)]
+        if self.selected == alarm_id:
+            self.selected = None
+        self._schedule()
+
+    def clear(self):
+        self.ids = []
+        self.texts = {}
+        self.selected = None
+        self._schedule()
+
+    def selected_id(self):
+        """The id of the selected alarm, or None"""
+        return self.selected
+
+    def on_select(self, event=None):
+        selection = self.listbox.curselection()
+        if selection and self.top + selection[0] < len(self.ids):
+            self.selected = self.ids[self.top + selection[0]]
+
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")"""
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.ids))
+            self.render()
+        else:
+            self.scroll_by(int(amount), unit)
+
+    def scroll_by(self, amount, unit="units"):
+        self.top += amount * (self.rows if unit == "pages" else 1)
+        self.render()
+
+    def on_resize(self, event):
+        if self._line_height is None:
+            self._line_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        rows = max(1, event.height // self._line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def render(self):
+        """Bring the listbox in line with the visible window of the list"""
+        if self._pending is not None:
+            self.listbox.after_cancel(self._pending)
+            self._pending = None
+        self.renders += 1
+        total = len(self.ids)
+        self.top = max(0, min(self.top, total - self.rows))
+        window = [self.texts[alarm_id] for alarm_id in self.ids[self.top:self.top + self.rows]]
+        rendered = self._rendered
+        for index, text in enumerate(window):
+            if index >= len(rendered):
+                self.listbox.insert(tk.END, text)
+            elif rendered[index] != text:
+                self.listbox.delete(index)
+                self.listbox.insert(index, text)
+        if len(rendered) > len(window):
+            self.listbox.delete(len(window), tk.END)
+        self._rendered = window
+
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected is not None:
+            index = bisect.bisect_left(self.ids, self.selected) - self.top
+            if 0 <= index < len(window) and self.ids[self.top + index] == self.selected:
+                self.listbox.selection_set(index)
+        if self.scrollbar is not None:
+            if total:
+                self.scrollbar.set(self.top / total, min(1.0, (self.top + self.rows) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def _schedule(self):
+        # Coalesce a burst of changes into one render
+        if self._pending is None:
+            self._pending = self.listbox.after_idle(self.render)
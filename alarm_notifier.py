@@ -0,0 +1,122 @@
+import tkinter as tk
+
+from alarm_engine import SNOOZE_SECONDS
+from clock import SYSTEM_CLOCK
+
+
+class AlarmNotifier:
+    """Non-modal panel listing the alarms that are ringing
+
+    Alarms that fire while the panel is open join it instead of opening
+    another window, so a burst of alarms in the same minute shows as one
+    group. Nothing here grabs input or runs a nested event loop: notify()
+    only records the alarm and the panel is redrawn once when Tk is next
+    idle. Snooze and dismiss call straight back into the app, with the
+    snooze given as an absolute epoch time.
+    """
+
+    def __init__(self, root, on_snooze, on_dismiss, snooze_seconds=SNOOZE_SECONDS, clock=SYSTEM_CLOCK):
+        self.root = root
+        self.clock = clock
+        self.on_snooze = on_snooze
+        self.on_dismiss = on_dismiss
+        self.snooze_seconds = snooze_seconds
+        self.ringing = {}
+        self.window = None
+        self.listbox = None
+        self.title_label = None
+        self.renders = 0
+        self._rows = []
+        self._pending = None
+
+    def notify(self, alarm):
+        """Add a fired alarm to the panel"""
+        self.ringing[alarm.id] = alarm
+        if self._pending is None:
+            self._pending = self.root.after_idle(self.render)
+
+    def withdraw(self, alarm_id):
+        """Take an alarm silenced elsewhere (e.g. over the control API) off the panel"""
+        self._take([alarm_id])
+
+    def snooze(self, alarm_ids=None):
+        """Snooze the given (default: selected) alarms until an exact time from now"""
+        until = self.clock.time() + self.snooze_seconds
+        for alarm in self._take(alarm_ids):
+            self.on_snooze(alarm, until)
+
+    def dismiss(self, alarm_ids=None):
+        """Stop the given (default: selected) alarms"""
+        for alarm in self._take(alarm_ids):
+            self.on_dismiss(alarm)
+
+    def snooze_all(self):
+        self.snooze(list(self.ringing))
+
+    def dismiss_all(self):
+        self.dismiss(list(self.ringing))
+
+    def selected_ids(self):
+        if self.listbox is None:
+            return []
+        return [self._rows[index] for index in self.listbox.curselection() if index < len(self._rows)]
+
+    def render(self):
+        self._pending = None
+        self.renders += 1
+        if not self.ringing:
+            self._close()
+            return
+        if self.window is None:
+            self._open()
+        selected = set(self.selected_ids())
+        self._rows = list(self.ringing)
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *(f"{alarm.time} - {alarm.label}" for alarm in self.ringing.values()))
+        count = len(self._rows)
+        self.title_label.config(text="🔔 ALARM! 🔔" if count == 1 else f"🔔 {count} ALARMS 🔔")
+        if count == 1:
+            self.listbox.selection_set(0)
+        for index, alarm_id in enumerate(self._rows):
+            if alarm_id in selected:
+                self.listbox.selection_set(index)
+
+    def _take(self, alarm_ids):
+        if alarm_ids is None:
+            alarm_ids = self.selected_ids()
+        taken = [self.ringing.pop(alarm_id) for alarm_id in alarm_ids if alarm_id in self.ringing]
+        if taken and self._pending is None:
+            self._pending = self.root.after_idle(self.render)
+        return taken
+
+    def _open(self):
+        self.window = tk.Toplevel(self.root, bg='#2c3e50')
+        self.window.title("Alarm!")
+        self.window.attributes('-topmost', True)
+        # Closing the window is the same as dismissing everything in it
+        self.window.protocol("WM_DELETE_WINDOW", self.dismiss_all)
+        self.title_label = tk.Label(self.window, font=("Arial", 16, "bold"), bg='#2c3e50', fg='#e74c3c')
+        self.title_label.pack(pady=10)
+        self.listbox = tk.Listbox(
+            self.window, height=8, width=40, selectmode=tk.EXTENDED, exportselection=False,
+            bg='#34495e', fg='#ecf0f1', selectbackground='#e74c3c'
+        )
+        self.listbox.pack(fill='both', expand=True, padx=10)
+        buttons = tk.Frame(self.window, bg='#2c3e50')
+        buttons.pack(pady=10)
+        minutes = self.snooze_seconds // 60
+        for text, command, colour in [
+            (f"Snooze {minutes} min", self.snooze, '#e67e22'),
+            ("Dismiss", self.dismiss, '#27ae60'),
+            ("Snooze all", self.snooze_all, '#d35400'),
+            ("Dismiss all", self.dismiss_all, '#16a085'),
+        ]:
+            tk.Button(buttons, text=text, command=command, bg=colour, fg='white').pack(side=tk.LEFT, padx=5)
+
+    def _close(self):
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+            self.listbox = None
+            self.title_label = None
+            self._rows = []
@@ -0,0 +1,115 @@
+import array
+import logging
+import math
+import threading
+import time
+
+import pygame
+
+log = logging.getLogger(__name__)
+
+
+def make_tone(frequency=880, beeps=4, beep_seconds=0.1, gap_seconds=0.1, rest_seconds=0.4, amplitude=0.6):
+    """Build an alarm beep pattern as a pygame Sound for the current mixer format"""
+    rate, size, channels = pygame.mixer.get_init()
+    if size != -16:
+        raise ValueError(f"Unsupported mixer sample format: {size}")
+    samples = array.array('h')
+    peak = int(32767 * amplitude)
+    beep = [int(peak * math.sin(2 * math.pi * frequency * i / rate)) for i in range(int(rate * beep_seconds))]
+    gap = [0] * int(rate * gap_seconds)
+    for _ in range(beeps):
+        samples.extend(beep)
+        samples.extend(gap)
+    samples.extend([0] * int(rate * rest_seconds))
+    if channels > 1:
+        # Interleave the mono pattern across every output channel
+        samples = array.array('h', (value for value in samples for _ in range(channels)))
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+class AlarmSoundPlayer:
+    """Play alarm tones on reserved mixer channels with a volume ramp
+
+    Tones are decoded (or synthesized) into memory up front, so start()
+    only hands an in-memory buffer to a reserved channel: no disk I/O or
+    decoding happens when an alarm fires. Each ringing alarm gets its own
+    channel; once all reserved channels are busy, further alarms share the
+    one that has been ringing longest instead of stacking more copies of
+    the same tone.
+    """
+
+    def __init__(self, channels=4, ramp_seconds=10.0, start_volume=0.2, max_seconds=600, tone_files=None):
+        self.ramp_seconds = ramp_seconds
+        self.start_volume = start_volume
+        self.max_seconds = max_seconds
+        self.tones = {'default': make_tone()}
+        for name, path in (tone_files or {}).items():
+            try:
+                self.tones[name] = pygame.mixer.Sound(path)
+            except pygame.error as e:
+                log.warning("Could not load alarm tone %s: %s", path, e)
+        if pygame.mixer.get_num_channels() < channels + 2:
+            pygame.mixer.set_num_channels(channels + 2)
+        # Reserved channels are never picked by pygame for other sounds (e.g. cached speech)
+        pygame.mixer.set_reserved(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.ringing = {}
+        self._lock = threading.Lock()
+        self._ramp_thread = None
+
+    def start(self, alarm_id, tone='default'):
+        """Start ringing for an alarm; safe to call from the scheduler thread"""
+        sound = self.tones.get(tone, self.tones['default'])
+        with self._lock:
+            self._drop_finished()
+            if alarm_id in self.ringing:
+                return
+            channel = next((c for c in self.channels if not c.get_busy()), None)
+            if channel is None and self.ringing:
+                # Mix down: share the channel that has been ringing longest
+                self.ringing[alarm_id] = min(self.ringing.values(), key=lambda entry: entry[1])
+                return
+            channel = channel or self.channels[0]
+            channel.set_volume(self.start_volume)
+            channel.play(sound, loops=-1, maxtime=int(self.max_seconds * 1000))
+            self.ringing[alarm_id] = (channel, time.monotonic())
+            if self._ramp_thread is None:
+                self._ramp_thread = threading.Thread(target=self._ramp, daemon=True)
+                self._ramp_thread.start()
+
+    def stop(self, alarm_id):
+        """Stop an alarm's tone, unless other alarms still share its channel"""
+        with self._lock:
+            entry = self.ringing.pop(alarm_id, None)
+            if entry is None:
+                return
+            channel = entry[0]
+            if not any(other[0] is channel for other in self.ringing.values()):
+                channel.fadeout(200)
+
+    def stop_all(self):
+        with self._lock:
+            self.ringing.clear()
+            for channel in self.channels:
+                channel.stop()
+
+    def _drop_finished(self):
+        # A channel stops by itself after max_seconds; its alarms must not claim it once it is reused
+        for alarm_id, (channel, _) in list(self.ringing.items()):
+            if not channel.get_busy():
+                del self.ringing[alarm_id]
+
+    def _ramp(self):
+        """Raise each ringing channel's volume from start_volume to full"""
+        while True:
+            with self._lock:
+                self._drop_finished()
+                if not self.ringing:
+                    self._ramp_thread = None
+                    return
+                now = time.monotonic()
+                for channel, since in self.ringing.values():
+                    progress = min(1.0, (now - since) / self.ramp_seconds) if self.ramp_seconds else 1.0
+                    channel.set_volume(self.start_volume + (1.0 - self.start_volume) * progress)
+            time.sleep(0.1)
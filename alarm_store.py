@@ -0,0 +1,209 @@
+import contextlib
+import datetime
+import heapq
+import itertools
+
+# Rebuild the next-alarm heap once this many entries are dead and they outnumber the live ones
+HEAP_COMPACT_MIN = 1024
+
+
+class Alarm:
+    """A single alarm with an integer fire time and a stable id
+
+    A recurring alarm carries its cron-style rule (see recurrence.py) and
+    fire_at is always its next occurrence.
+    """
+
+    __slots__ = ('id', 'fire_at', 'label', 'active', 'rule', '_time')
+
+    def __init__(self, alarm_id, fire_at, label, active=True, rule=None):
+        self.id = alarm_id
+        self.fire_at = int(fire_at)
+        self.label = label
+        self.active = active
+        self.rule = rule
+        self._time = None
+
+    @property
+    def time(self):
+        # Formatted on first use and cached, so listings never re-run strftime
+        if self._time is None:
+            self._time = datetime.datetime.fromtimestamp(self.fire_at).strftime("%I:%M %p")
+        return self._time
+
+    @property
+    def fire_minute(self):
+        return self.fire_at // 60
+
+    def __repr__(self):
+        rule = f", rule={self.rule!r}" if self.rule else ""
+        return f"Alarm(id={self.id}, time={self.time!r}, label={self.label!r}, active={self.active}{rule})"
+
+
+class AlarmStore:
+    """Alarms keyed by id, with indexes by fire minute and label
+
+    The secondary indexes are built on first query and maintained from then
+    on, so loading a large journal at startup does not pay for them. If a
+    journal is given, existing alarms are loaded from it and every mutation
+    is appended to it.
+    """
+
+    def __init__(self, journal=None):
+        self._alarms = {}
+        self._by_minute = None
+        self._by_label = None
+        self._heap = []
+        # Heap entries left behind by removed, fired or moved alarms
+        self._stale = 0
+        self.journal = journal
+        if journal is not None:
+            self._alarms = {
+                alarm_id: Alarm(alarm_id, fire_at, label, active, rule)
+                for alarm_id, (fire_at, active, label, rule) in journal.load().items()
+            }
+            self._heap = [(alarm.fire_at, alarm.id) for alarm in self._alarms.values() if alarm.active]
+            heapq.heapify(self._heap)
+        self._ids = itertools.count(max(self._alarms, default=0) + 1)
+
+    def add(self, fire_at, label, active=True, rule=None):
+        """Create an alarm and index it"""
+        alarm = Alarm(next(self._ids), fire_at, label, active, rule)
+        self._alarms[alarm.id] = alarm
+        if self._by_minute is not None:
+            self._by_minute.setdefault(alarm.fire_minute, set()).add(alarm.id)
+        if self._by_label is not None:
+            self._by_label.setdefault(alarm.label.lower(), set()).add(alarm.id)
+        if active:
+            heapq.heappush(self._heap, (alarm.fire_at, alarm.id))
+        record = ["add", alarm.id, alarm.fire_at, int(alarm.active), alarm.label]
+        if rule:
+            record.append(rule)
+        self._log(record)
+        return alarm
+
+    def advance(self, alarm_id, fire_at):
+        """Move a recurring alarm on to its next occurrence; returns it, or None if unknown"""
+        alarm = self._alarms.get(alarm_id)
+        if alarm is None:
+            return None
+        self._unindex(self._by_minute, alarm.fire_minute, alarm.id)
+        alarm.fire_at = int(fire_at)
+        alarm._time = None
+        if self._by_minute is not None:
+            self._by_minute.setdefault(alarm.fire_minute, set()).add(alarm.id)
+        if alarm.active:
+            heapq.heappush(self._heap, (alarm.fire_at, alarm.id))
+            self._heap_entry_dropped()
+        self._log(["next", alarm_id, alarm.fire_at])
+        return alarm
+
+    def remove(self, alarm_id):
+        """Remove an alarm by id; returns it, or None if unknown"""
+        alarm = self._alarms.pop(alarm_id, None)
+        if alarm is None:
+            return None
+        self._unindex(self._by_minute, alarm.fire_minute, alarm.id)
+        self._unindex(self._by_label, alarm.label.lower(), alarm.id)
+        if alarm.active:
+            self._heap_entry_dropped()
+        self._log(["del", alarm_id])
+        return alarm
+
+    def deactivate(self, alarm_id):
+        """Mark an alarm as fired; returns it, or None if unknown or inactive"""
+        alarm = self._alarms.get(alarm_id)
+        if alarm is None or not alarm.active:
+            return None
+        alarm.active = False
+        self._heap_entry_dropped()
+        self._log(["off", alarm_id])
+        return alarm
+
+    def clear(self):
+        """Remove every alarm"""
+        self._alarms.clear()
+        self._by_minute = None
+        self._by_label = None
+        self._heap.clear()
+        self._stale = 0
+        self._log(["clear"])
+
+    def batch(self):
+        """Context manager grouping many mutations into one journal flush"""
+        if self.journal is None:
+            return contextlib.nullcontext()
+        return self.journal.batch()
+
+    def get(self, alarm_id):
+        return self._alarms.get(alarm_id)
+
+    def by_minute(self, fire_minute):
+        """Return the alarms due in the given absolute minute"""
+        if self._by_minute is None:
+            self._by_minute = {}
+            for alarm in self._alarms.values():
+                self._by_minute.setdefault(alarm.fire_minute, set()).add(alarm.id)
+        return [self._alarms[i] for i in self._by_minute.get(fire_minute, ())]
+
+    def by_label(self, label):
+        """Return the alarms with the given label (case-insensitive)"""
+        if self._by_label is None:
+            self._by_label = {}
+            for alarm in self._alarms.values():
+                self._by_label.setdefault(alarm.label.lower(), set()).add(alarm.id)
+        return [self._alarms[i] for i in self._by_label.get(label.lower(), ())]
+
+    def next_alarm(self):
+        """Return the earliest active alarm, or None"""
+        heap = self._heap
+        while heap:
+            fire_at, alarm_id = heap[0]
+            alarm = self._alarms.get(alarm_id)
+            if alarm is not None and alarm.active and alarm.fire_at == fire_at:
+                return alarm
+            # Stale entry: removed or already fired
+            heapq.heappop(heap)
+            self._stale -= 1
+        return None
+
+    def active(self):
+        """Return the active alarms in insertion order"""
+        return [alarm for alarm in self._alarms.values() if alarm.active]
+
+    def __contains__(self, alarm_id):
+        return alarm_id in self._alarms
+
+    def __iter__(self):
+        return iter(list(self._alarms.values()))
+
+    def __len__(self):
+        return len(self._alarms)
+
+    def __bool__(self):
+        return bool(self._alarms)
+
+    def _heap_entry_dropped(self):
+        self._stale += 1
+        # Compact once dead entries dominate, as the scheduler does
+        if self._stale > HEAP_COMPACT_MIN and self._stale * 2 > len(self._heap):
+            self._heap = [(alarm.fire_at, alarm.id) for alarm in self._alarms.values() if alarm.active]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _log(self, record):
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.journal.needs_compaction(len(self._alarms)):
+            self.journal.compact(self._alarms.values())
+
+    @staticmethod
+    def _unindex(index, key, alarm_id):
+        if index is None:
+            return
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(alarm_id)
+            if not ids:
+                del index[key]
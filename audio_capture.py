@@ -0,0 +1,122 @@
+import audioop
+import collections
+import threading
+import time
+
+import speech_recognition as sr
+
+import metrics
+
+
+class ContinuousCapture:
+    """Read one open audio source continuously and cut utterances out of it
+
+    Frames flow through a ring buffer so the audio just before speech onset
+    is kept, an energy-based voice-activity detector decides where each
+    utterance starts and ends, and the noise floor is tracked from the
+    non-speech frames instead of being re-calibrated for every command.
+
+    An optional listener (see recognition_pipeline.StreamingRecognition)
+    sees each utterance's frames as they arrive and can end it early.
+    """
+
+    def __init__(self, source, frame_seconds=0.03, pre_roll_seconds=0.3,
+                 pause_seconds=0.8, phrase_time_limit=5, min_speech_seconds=0.15,
+                 threshold_ratio=3.0, min_energy=100, noise_adapt=0.05, listener=None):
+        self.source = source
+        self.listener = listener
+        self.sample_rate = source.SAMPLE_RATE
+        self.sample_width = source.SAMPLE_WIDTH
+        self.frame_samples = max(1, int(self.sample_rate * frame_seconds))
+        self.frame_seconds = self.frame_samples / self.sample_rate
+        self.pre_roll = collections.deque(maxlen=max(1, int(pre_roll_seconds / self.frame_seconds)))
+        self.pause_frames = max(1, int(pause_seconds / self.frame_seconds))
+        self.max_frames = int(phrase_time_limit / self.frame_seconds) if phrase_time_limit else None
+        self.min_speech_frames = max(1, int(min_speech_seconds / self.frame_seconds))
+        self.start_frames = 2
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.noise_adapt = noise_adapt
+        self.noise_floor = None
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def threshold(self):
+        """Energy above which a frame counts as speech"""
+        floor = self.noise_floor if self.noise_floor is not None else 0
+        return max(self.min_energy, floor * self.threshold_ratio)
+
+    def stop(self):
+        """Stop capturing after the current frame"""
+        self._running.clear()
+
+    def frames(self):
+        """Yield raw frames from the source until it ends or capture stops"""
+        frame_bytes = self.frame_samples * self.sample_width
+        while self._running.is_set():
+            frame = self.source.stream.read(self.frame_samples)
+            if not frame:
+                return
+            yield frame
+            if len(frame) < frame_bytes:
+                return
+
+    def update_noise_floor(self, energy):
+        """Fold a non-speech frame's energy into the running noise estimate"""
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        else:
+            self.noise_floor += (energy - self.noise_floor) * self.noise_adapt
+
+    def utterances(self):
+        """Yield an sr.AudioData for each utterance detected in the stream"""
+        speech = None
+        loud_run = 0
+        silent_run = 0
+        voiced = 0
+        for frame in self.frames():
+            energy = audioop.rms(frame, self.sample_width)
+            is_loud = energy > self.threshold
+
+            if speech is None:
+                if is_loud:
+                    loud_run += 1
+                else:
+                    loud_run = 0
+                    self.update_noise_floor(energy)
+                self.pre_roll.append(frame)
+                if loud_run >= self.start_frames:
+                    # Onset: keep the buffered lead-in so the first word is not clipped
+                    speech = list(self.pre_roll)
+                    onset = time.perf_counter()
+                    self.pre_roll.clear()
+                    voiced = loud_run
+                    silent_run = 0
+                    loud_run = 0
+                    if self.listener:
+                        self.listener.speech_started(self.sample_rate, self.frame_seconds)
+                        for buffered in speech:
+                            self.listener.speech_frame(buffered)
+                continue
+
+            speech.append(frame)
+            if is_loud:
+                voiced += 1
+                silent_run = 0
+            else:
+                silent_run += 1
+            cut = self.listener.speech_frame(frame) if self.listener else False
+            if cut or silent_run >= self.pause_frames or (self.max_frames and len(speech) >= self.max_frames):
+                if cut or voiced >= self.min_speech_frames:
+                    yield self._end(speech, onset)
+                speech = None
+
+        if speech is not None and voiced >= self.min_speech_frames:
+            yield self._end(speech, onset)
+
+    def _end(self, frames, onset):
+        metrics.observe("capture", time.perf_counter() - onset, audio_seconds=round(len(frames) * self.frame_seconds, 2))
+        if self.listener:
+            self.listener.speech_ended()
+        return sr.AudioData(b"".join(frames), self.sample_rate, self.sample_width)
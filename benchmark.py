@@ -0,0 +1,1027 @@
+import asyncio
+import audioop
+import datetime
+import glob
+import heapq
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import speech_recognition as sr
+
+from alarm_daemon import EventLoop
+from alarm_engine import AlarmEngine
+from alarm_io import import_file, read_csv, write_csv
+from alarm_journal import AlarmJournal
+from alarm_sound import AlarmSoundPlayer
+from alarm_store import AlarmStore
+from audio_capture import ContinuousCapture
+from clock import SimulatedClock
+from command_parser import parse_command
+from control_api import ControlServer
+from fixtures import PacedStream, legacy_parse, make_corpus, room_segments, write_test_wav
+from metrics import Metrics
+from recognition_pipeline import BLOCK, DROP_OLDEST, RecognitionPipeline, StreamingRecognition
+from recognizers import FakeBackend, GoogleBackend, VoskBackend
+from recurrence import make_rule, next_fire
+from scheduler import AlarmScheduler
+from simulation import RecordingSpeech, SilentSound, simulate_week
+from speech_queue import PRIORITY_ALARM, SpeechQueue
+from wake_word import FakeSpotter, WakeWordGate
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def best_time(action, repeats):
+    """Fastest of repeats runs of action, in seconds; the least disturbed by other load"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_scheduler(count=100000, spread=2.0):
+    """Per-fire cost, fire jitter and idle CPU of the heap scheduler"""
+    lateness = []
+    done = threading.Event()
+
+    def on_fire(key, fire_at):
+        lateness.append(time.time() - fire_at)
+        if len(lateness) == count:
+            done.set()
+
+    scheduler = AlarmScheduler(on_fire)
+    start = time.time() + 0.5
+    schedule_start = time.perf_counter()
+    for i in range(count):
+        scheduler.schedule(i, start + spread * i / count)
+    schedule_cost = (time.perf_counter() - schedule_start) / count
+
+    cpu_start = time.process_time()
+    scheduler.start()
+    done.wait(spread + 30)
+    fire_cpu = time.process_time() - cpu_start
+
+    # Idle: a full heap of far-future alarms should cost no CPU while waiting
+    for i in range(count):
+        scheduler.schedule(("idle", i), time.time() + 3600 + i)
+    idle_start = time.process_time()
+    time.sleep(1.0)
+    idle_cpu = time.process_time() - idle_start
+    scheduler.stop()
+
+    return {
+        "alarms": count,
+        "fired": len(lateness),
+        "schedule_us_per_alarm": schedule_cost * 1e6,
+        "fire_cpu_us_per_alarm": fire_cpu / max(1, len(lateness)) * 1e6,
+        "jitter_p50_ms": percentile(lateness, 50) * 1000,
+        "jitter_p99_ms": percentile(lateness, 99) * 1000,
+        "jitter_max_ms": max(lateness) * 1000 if lateness else 0.0,
+        "idle_cpu_ms_per_s": idle_cpu * 1000,
+    }
+
+
+def bench_scheduler_scaling(counts=(10, 1000, 100000), checks=10000, repeats=5):
+    """Cost of one "is anything due?" check against how many alarms are set
+
+    The old monitor thread scanned every alarm on each check; the heap
+    scheduler looks at its head, so the check should not grow with the count.
+    """
+    now = time.time()
+    results = {}
+    for count in counts:
+        scheduler = AlarmScheduler(lambda key, fire_at: None, clock=SimulatedClock(now))
+        fire_times = [now + 3600 + i for i in range(count)]
+        for i, fire_at in enumerate(fire_times):
+            scheduler.schedule(i, fire_at)
+
+        def check():
+            for _ in range(checks):
+                scheduler.next_fire_time()
+                scheduler.fire_due()
+        results[f"check_us_{count}"] = best_time(check, repeats) / checks * 1e6
+
+        def reschedule():
+            for i in range(checks):
+                scheduler.schedule(("extra", i), now + 1800 + i)
+                scheduler.cancel(("extra", i))
+        results[f"reschedule_us_{count}"] = best_time(reschedule, repeats) / checks * 1e6
+
+        scans = max(1, checks * 10 // count)
+        start = time.perf_counter()
+        for _ in range(scans):
+            [fire_at for fire_at in fire_times if fire_at <= now]
+        results[f"legacy_scan_us_{count}"] = (time.perf_counter() - start) / scans * 1e6
+    return results
+
+
+def bench_alarm_store(count=100000, lookups=10000):
+    """Memory per alarm and lookup latency of the indexed alarm store"""
+    base = int(time.time())
+    labels = [f"label {i}" for i in range(100)]
+
+    tracemalloc.start()
+    store = AlarmStore()
+    for i in range(count):
+        store.add(base + i * 7, labels[i % len(labels)])
+    # Build the lazy secondary indexes so they are included in the figure
+    store.by_minute(0)
+    store.by_label("")
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(42)
+    ids = [rng.randint(1, count) for _ in range(lookups)]
+
+    def timed(func):
+        start = time.perf_counter()
+        for alarm_id in ids:
+            func(alarm_id)
+        return (time.perf_counter() - start) / lookups * 1e6
+
+    get_us = timed(store.get)
+    minute_us = timed(lambda i: store.by_minute((base + i * 7) // 60))
+    label_start = time.perf_counter()
+    for i in range(100):
+        store.by_label(labels[i])
+    label_us = (time.perf_counter() - label_start) / 100 * 1e6
+    next_us = timed(lambda i: store.next_alarm())
+    remove_us = timed(store.remove)
+
+    return {
+        "alarms": count,
+        "bytes_per_alarm": memory / count,
+        "get_us": get_us,
+        "by_minute_us": minute_us,
+        "by_label_us": label_us,
+        "next_alarm_us": next_us,
+        "remove_us": remove_us,
+    }
+
+
+def bench_journal(count=100000, single_writes=1000):
+    """Startup load time and per-mutation write cost of the alarm journal"""
+    base = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.journal")
+        store = AlarmStore(AlarmJournal(path))
+        with store.batch():
+            for i in range(count):
+                store.add(base + i * 7, f"label {i % 100}")
+
+        # Unbatched mutations: one small append (and fsync) each
+        size_before = os.path.getsize(path)
+        write_start = time.perf_counter()
+        for i in range(single_writes):
+            store.add(base + i, "single")
+        write_us = (time.perf_counter() - write_start) / single_writes * 1e6
+        bytes_per_write = (os.path.getsize(path) - size_before) / single_writes
+        store.journal.close()
+
+        load_start = time.perf_counter()
+        loaded = AlarmStore(AlarmJournal(path))
+        load_ms = (time.perf_counter() - load_start) * 1000
+        loaded.journal.close()
+
+    return {
+        "alarms": len(loaded),
+        "load_ms": load_ms,
+        "write_us": write_us,
+        "bytes_per_write": bytes_per_write,
+    }
+
+
+def run_pipeline(workers, utterances, delay, max_pending, drop_policy):
+    results = []
+    done = threading.Event()
+
+    def on_result(result):
+        results.append(result)
+        if len(results) == utterances:
+            done.set()
+
+    backend = FakeBackend(text_for=lambda audio: audio, delay=delay)
+    pipeline = RecognitionPipeline(backend, on_result, workers=workers,
+                                   max_pending=max_pending, drop_policy=drop_policy)
+    pipeline.start()
+    start = time.perf_counter()
+    for i in range(utterances):
+        pipeline.submit(f"utterance {i}")
+    done.wait(utterances * delay + 10)
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    in_order = [r.seq for r in results] == list(range(utterances))
+    return elapsed, pipeline.dropped, in_order
+
+
+def bench_pipeline(utterances=32, delay=0.05):
+    """Throughput and ordering of the recognition pipeline with a fake backend"""
+    result = {"utterances": utterances, "backend_delay_ms": delay * 1000}
+    for workers in (1, 2, 4, 8):
+        elapsed, dropped, in_order = run_pipeline(workers, utterances, delay, utterances, BLOCK)
+        result[f"workers_{workers}_utt_per_s"] = utterances / elapsed
+        result[f"workers_{workers}_in_order"] = in_order
+    # A burst larger than the queue with drop-oldest: capture never blocks
+    _, dropped, in_order = run_pipeline(2, utterances, delay, 4, DROP_OLDEST)
+    result["burst_dropped"] = dropped
+    result["burst_in_order"] = in_order
+    return result
+
+
+def time_backend(backend, paths):
+    """Mean recognition latency in ms over WAV files, or None if unavailable"""
+    timings = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        start = time.perf_counter()
+        try:
+            backend.recognize(audio)
+        except sr.UnknownValueError:
+            pass
+        except sr.RequestError as e:
+            print(f"  {backend.name} unavailable: {e}")
+            return None
+        timings.append(time.perf_counter() - start)
+    return sum(timings) / len(timings) * 1000 if timings else None
+
+
+class CountingStream:
+    """Wrap an audio stream and count how much of it has been read"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def bench_recognizers(command="set alarm for 7:30 am"):
+    """When a command is available: streaming early commit versus end-of-pause
+
+    Times are seconds of audio consumed after speech onset. Set
+    BENCH_AUDIO_DIR to a directory of recorded command WAVs to also time the
+    Google and offline Vosk backends on real speech.
+    """
+    onset = 0.5
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "command.wav")
+        # 2.5 s of "speech"; the fake stream reveals three words per second
+        write_test_wav(path, [(onset, 0), (2.5, 3000), (1.5, 0)])
+        for streaming in (False, True):
+            committed = []
+            with sr.AudioFile(path) as source:
+                counter = CountingStream(source.stream)
+                source.stream = counter
+                bytes_per_second = source.SAMPLE_RATE * source.SAMPLE_WIDTH
+                listener = None
+                if streaming:
+                    listener = StreamingRecognition(
+                        FakeBackend(text_for=lambda audio: command),
+                        lambda r: committed.append(counter.bytes_read / bytes_per_second),
+                        lambda text: text.endswith(("am", "pm"))
+                    )
+                capture = ContinuousCapture(source, listener=listener)
+                for _ in capture.utterances():
+                    if not streaming:
+                        committed.append(counter.bytes_read / bytes_per_second)
+                    break
+            key = "streaming_commit_s" if streaming else "pause_commit_s"
+            result[key] = committed[0] - onset if committed else None
+
+    paths = sorted(glob.glob(os.path.join(os.environ.get("BENCH_AUDIO_DIR", ""), "*.wav")))
+    if paths:
+        result["fixtures"] = len(paths)
+        result["google_ms"] = time_backend(GoogleBackend(), paths)
+        result["vosk_ms"] = time_backend(VoskBackend(os.environ.get("VOSK_MODEL", "model")), paths)
+    return result
+
+
+class BusyBackend(FakeBackend):
+    """A fake recognizer that burns CPU in proportion to the audio length"""
+
+    def __init__(self, cpu_ratio=0.2):
+        super().__init__()
+        self.cpu_ratio = cpu_ratio
+
+    def recognize(self, audio):
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        deadline = time.process_time() + seconds * self.cpu_ratio
+        while time.process_time() < deadline:
+            pass
+        return super().recognize(audio)
+
+
+def bench_wake_word(minutes=2, wake_every=10):
+    """Recognizer call rate and CPU on ambient noise, with and without wake-word gating
+
+    The recording is background noise with a speech-like burst every few
+    seconds (TV, conversation); every wake_every-th burst is louder and
+    stands in for the wake phrase.
+    """
+    rng = random.Random(7)
+    segments = [(1.0, 0)]
+    bursts = 0
+    while sum(seconds for seconds, _ in segments) < minutes * 60:
+        bursts += 1
+        loud = bursts % wake_every == 0
+        segments += [(rng.uniform(0.5, 2.0), 9000 if loud else 2000), (rng.uniform(1.5, 4.0), 0)]
+
+    result = {"minutes": minutes, "bursts": bursts}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ambient.wav")
+        write_test_wav(path, segments, noise=150)
+        for gated in (False, True):
+            backend = BusyBackend()
+            gate = None
+            if gated:
+                spotter = FakeSpotter(lambda frame: audioop.rms(frame, 2) > 4000)
+                gate = WakeWordGate(spotter, "hey clock", window_seconds=0)
+            cpu_start = time.process_time()
+            with sr.AudioFile(path) as source:
+                capture = ContinuousCapture(source, listener=gate)
+                for audio in capture.utterances():
+                    if gate is None or gate.passed:
+                        try:
+                            backend.recognize(audio)
+                        except sr.UnknownValueError:
+                            pass
+            cpu = time.process_time() - cpu_start
+            key = "gated" if gated else "ungated"
+            result[f"{key}_recognizer_calls_per_min"] = backend.calls / minutes
+            result[f"{key}_cpu_percent"] = cpu / (minutes * 60) * 100
+    return result
+
+
+class StubEngine:
+    """Stands in for pyttsx3: synthesis startup delay, then speech time per word"""
+
+    def __init__(self, synth_delay=0.15, word_seconds=0.05):
+        self.synth_delay = synth_delay
+        self.word_seconds = word_seconds
+        self.started = []
+        self._text = None
+        self._stopped = threading.Event()
+
+    def getProperty(self, name):
+        return "stub"
+
+    def say(self, text):
+        self._text = text
+
+    def runAndWait(self):
+        if self._text is None:
+            return
+        self._stopped.clear()
+        if self._stopped.wait(self.synth_delay):
+            return
+        self.started.append((self._text, time.perf_counter()))
+        self._stopped.wait(self.word_seconds * len(self._text.split()))
+        self._text = None
+
+    def save_to_file(self, text, path):
+        with open(path, 'wb') as f:
+            f.write(b"RIFF")
+
+    def stop(self):
+        self._stopped.set()
+
+
+class StubSound:
+    def __init__(self, engine, path):
+        self.engine = engine
+        self.path = path
+
+    def get_length(self):
+        return 0.05
+
+    def play(self):
+        self.engine.started.append((self.path, time.perf_counter()))
+        return None
+
+
+def bench_speech_queue(messages=1000):
+    """speak() latency, alarm pre-emption and phrase-cache start time with a stub engine"""
+    engine = StubEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SpeechQueue(engine, ["All alarms deleted"], tmp, lambda path: StubSound(engine, path))
+        queue.start()
+        while not queue.sounds:
+            time.sleep(0.01)
+
+        # Cached phrase versus synthesized phrase: time until audio starts
+        start = time.perf_counter()
+        queue.speak("All alarms deleted")
+        while not engine.started:
+            time.sleep(0.001)
+        cached_ms = (engine.started[-1][1] - start) * 1000
+        time.sleep(0.2)
+        count = len(engine.started)
+        start = time.perf_counter()
+        queue.speak("Sorry, I didn't understand that command")
+        while len(engine.started) == count:
+            time.sleep(0.001)
+        synth_ms = (engine.started[-1][1] - start) * 1000
+        time.sleep(0.5)
+
+        # Enqueue cost with a backlog of chatter, half of it repeated
+        enqueue_start = time.perf_counter()
+        for i in range(messages):
+            queue.speak(f"Message {i % (messages // 2)}")
+        enqueue_us = (time.perf_counter() - enqueue_start) / messages * 1e6
+
+        # An alarm arriving behind the backlog still starts next
+        count = len(engine.started)
+        start = time.perf_counter()
+        queue.speak("Alarm! Wake up", PRIORITY_ALARM)
+        while not any(text == "Alarm! Wake up" for text, _ in engine.started[count:]):
+            time.sleep(0.001)
+        alarm_ms = (next(t for text, t in engine.started[count:] if text == "Alarm! Wake up") - start) * 1000
+        coalesced = queue.coalesced
+        queue.stop()
+
+    return {
+        "enqueue_us": enqueue_us,
+        "coalesced": coalesced,
+        "cached_start_ms": cached_ms,
+        "synth_start_ms": synth_ms,
+        "alarm_preempt_start_ms": alarm_ms,
+    }
+
+
+def bench_alarm_sound(alarms=8, rounds=20):
+    """Scheduler-fire to playback-start latency on pygame's dummy audio driver"""
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    pygame.mixer.init()
+    init_start = time.perf_counter()
+    player = AlarmSoundPlayer(ramp_seconds=1.0)
+    predecode_ms = (time.perf_counter() - init_start) * 1000
+
+    latencies = []
+    fired = threading.Semaphore(0)
+
+    def on_fire(key, fire_at):
+        player.start(key)
+        # The channel is busy once the first buffer of the tone is queued
+        if player.ringing[key][0].get_busy():
+            latencies.append(time.time() - fire_at)
+        fired.release()
+
+    scheduler = AlarmScheduler(on_fire)
+    scheduler.start()
+    for round_number in range(rounds):
+        base = time.time() + 0.05
+        for i in range(alarms):
+            scheduler.schedule((round_number, i), base)
+        for _ in range(alarms):
+            fired.acquire()
+        player.stop_all()
+    scheduler.stop()
+    pygame.mixer.quit()
+
+    return {
+        "alarms_per_round": alarms,
+        "predecode_ms": predecode_ms,
+        "trigger_to_play_p50_ms": percentile(latencies, 50) * 1000,
+        "trigger_to_play_p99_ms": percentile(latencies, 99) * 1000,
+        "trigger_to_play_max_ms": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def bench_parser(count=5000, repeats=5):
+    """Command parsing throughput: the old regex chain against parse_command"""
+    corpus = make_corpus(count)
+
+    def rate(parse):
+        def run():
+            for command in corpus:
+                parse(command, 9)
+        return count / best_time(run, repeats)
+
+    legacy = rate(legacy_parse)
+    parser = rate(parse_command)
+
+    # The whole command path: parse, process_alarm_command and the journal write
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine(
+            lambda callback, *args: callback(*args), os.path.join(tmp, "alarms.journal"),
+            clock=SimulatedClock(time.time()), components={"speech": RecordingSpeech(), "alarm_sound": SilentSound()},
+        )
+        def run():
+            for command in corpus:
+                engine.process_command(command)
+                if len(engine.alarms) >= 100:
+                    engine.clear_alarms()
+        commands = count / best_time(run, repeats)
+        engine.stop()
+    return {
+        "transcripts": count,
+        "legacy_per_sec": legacy,
+        "parser_per_sec": parser,
+        "speedup": parser / legacy,
+        "engine_commands_per_sec": commands,
+    }
+
+
+def bench_recurrence(count=100000, fires=100000):
+    """Next-fire computation for recurring rules, in bulk and one firing at a time"""
+    rng = random.Random(1)
+    day_choices = ["*", "1-5", "0,6", "mon,wed,fri", "tue,thu", "sat"]
+    rules = [make_rule(rng.randint(0, 23), rng.randint(0, 59), rng.choice(day_choices)) for _ in range(count)]
+    rules[::100] = ["*/15 9-17 * * 1-5"] * len(rules[::100])
+    now = time.time()
+
+    start = time.perf_counter()
+    heap = [(next_fire(rule, now), index) for index, rule in enumerate(rules)]
+    bulk = time.perf_counter() - start
+    heapq.heapify(heap)
+
+    # Firing only re-evaluates the rule that fired
+    start = time.perf_counter()
+    for _ in range(fires):
+        fire_at, index = heap[0]
+        heapq.heapreplace(heap, (next_fire(rules[index], fire_at), index))
+    incremental = time.perf_counter() - start
+    simulated_days = (heap[0][0] - now) / 86400
+
+    return {
+        "rules": count,
+        "distinct_rules": len(set(rules)),
+        "bulk_next_fire_ms": bulk * 1000,
+        "next_fire_us": bulk / count * 1e6,
+        "fire_and_advance_us": incremental / fires * 1e6,
+        "simulated_days": simulated_days,
+    }
+
+
+def bench_metrics(observations=200000):
+    """Per-observation cost of the latency histograms, with and without the JSON log"""
+    metrics = Metrics()
+    rng = random.Random(2)
+    samples = [rng.expovariate(20) for _ in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(observations):
+        pass
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(observations):
+        metrics.observe("recognition", samples[i % 1000])
+    plain = time.perf_counter() - start - loop
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics.open_log(os.path.join(tmp, "metrics.jsonl"))
+        start = time.perf_counter()
+        for i in range(observations // 10):
+            metrics.observe("parse", samples[i % 1000], seq=i)
+        logged = time.perf_counter() - start - loop / 10
+        metrics.close()
+
+        for stage in ("capture", "dispatch", "tts_start", "alarm_fire_lag"):
+            metrics.observe(stage, 0.01)
+        start = time.perf_counter()
+        metrics.write_prometheus(os.path.join(tmp, "metrics.prom"))
+        export = time.perf_counter() - start
+
+    return {
+        "observe_us": plain / observations * 1e6,
+        "observe_logged_us": logged / (observations // 10) * 1e6,
+        "export_ms": export * 1000,
+        "recognition_p50_ms": metrics.histograms["recognition"].quantile(0.5) * 1000,
+    }
+
+
+def bench_simulation(days=28):
+    """Fast-forwarded alarm clock: simulated days per wall second and fire accuracy"""
+    report = simulate_week(days, power_cuts=0)
+    return {
+        "simulated_days": days,
+        "wall_s": report.wall_seconds,
+        "days_per_s": days / report.wall_seconds,
+        "fires": len(report.fires),
+        "late": len(report.late),
+        "missed": len(report.missed),
+        "unexpected": len(report.unexpected),
+    }
+
+
+async def api_client(port, requests, latencies):
+    """One keep-alive client sending (method, path, payload) requests in turn"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for method, path, payload in requests:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+        start = time.perf_counter()
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+def run_api_clients(port, clients, requests):
+    """Spread requests over concurrent clients; returns (seconds, latencies)"""
+    latencies = []
+
+    async def run():
+        await asyncio.gather(*(api_client(port, requests[i::clients], latencies) for i in range(clients)))
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start, latencies
+
+
+def bench_control_api(requests=2000, batches=10, batch_size=1000):
+    """Control API throughput: single adds from many local clients, batches, and listing"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        loop = EventLoop()
+        engine = AlarmEngine(loop.call_soon, os.path.join(tmp, "alarms.journal"))
+        threading.Thread(target=loop.run, daemon=True).start()
+        server = ControlServer(engine)
+        port = server.start()
+        base = time.time() + 86400
+        for clients in (1, 16, 64):
+            adds = [("POST", "/alarms", {"fire_at": base + i, "label": f"Api {i}"}) for i in range(requests)]
+            elapsed, latencies = run_api_clients(port, clients, adds)
+            results[f"clients_{clients}_req_per_s"] = requests / elapsed
+            results[f"clients_{clients}_p99_ms"] = percentile(latencies, 99) * 1000
+        changes = [{"op": "add", "fire_at": base + i, "label": f"Batch {i}"} for i in range(batch_size)]
+        elapsed, latencies = run_api_clients(port, 4, [("POST", "/alarms/batch", {"changes": changes})] * batches)
+        results["batch_alarms_per_s"] = batches * batch_size / elapsed
+        results["batch_p50_ms"] = percentile(latencies, 50) * 1000
+        results["alarms"] = len(engine.alarms)
+        elapsed, latencies = run_api_clients(port, 1, [("GET", "/alarms", None)] * 5)
+        results["list_ms"] = percentile(latencies, 50) * 1000
+        server.stop()
+        loop.stop()
+        engine.stop()
+    return results
+
+
+def write_schedule_csv(path, rows, seed=3):
+    """A CSV schedule of one-shot, dated and recurring alarms"""
+    rng = random.Random(seed)
+    day = datetime.date.today() + datetime.timedelta(days=1)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("date,time,label,repeat\n")
+        for i in range(rows):
+            time_str = f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d} {rng.choice(['am', 'pm'])}"
+            kind = i % 3
+            date = (day + datetime.timedelta(days=i % 365)).isoformat() if kind == 1 else ""
+            repeat = rng.choice(["weekdays", "weekends", "mon,wed", "daily"]) if kind == 2 else ""
+            f.write(f"{date},{time_str},Imported {i},{repeat}\n")
+
+
+def parse_peak_kb(path):
+    """Peak memory of streaming a CSV through the parser without keeping anything"""
+    errors = []
+    tracemalloc.start()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for _ in read_csv(f, errors):
+            pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_alarm_io(rows=100000, naive_rows=2000):
+    """Streaming CSV import/export: rows per second, parser memory and the per-alarm add loop"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        small = os.path.join(tmp, "small.csv")
+        large = os.path.join(tmp, "large.csv")
+        write_schedule_csv(small, rows // 10)
+        write_schedule_csv(large, rows)
+        results["parse_peak_kb_10k"] = parse_peak_kb(small)
+        results["parse_peak_kb_100k"] = parse_peak_kb(large)
+
+        engine = AlarmEngine(EventLoop().call_soon, os.path.join(tmp, "import.journal"))
+        resets = []
+        engine.on("alarms_reset", resets.append)
+        start = time.perf_counter()
+        imported, errors = import_file(engine, large)
+        elapsed = time.perf_counter() - start
+        results["imported"] = imported
+        results["errors"] = len(errors)
+        results["import_s"] = elapsed
+        results["import_rows_per_s"] = imported / elapsed
+        results["ui_refreshes"] = len(resets)
+        start = time.perf_counter()
+        with open(os.path.join(tmp, "export.csv"), 'w', encoding='utf-8', newline='') as f:
+            write_csv(engine.alarms, f)
+        results["export_rows_per_s"] = imported / (time.perf_counter() - start)
+        engine.stop()
+
+        # The old way: add_alarm per row, each journalled and redrawn on its own
+        engine = AlarmEngine(EventLoop().call_soon, os.path.join(tmp, "naive.journal"))
+        view = []
+        engine.on("alarm_added", lambda alarm: view.append(len(engine.alarms)))
+        with open(small, 'r', encoding='utf-8', newline='') as f:
+            changes = [change for _, change in zip(range(naive_rows), read_csv(f, []))]
+        start = time.perf_counter()
+        for change in changes:
+            engine.apply_change(change)
+        results["per_alarm_rows_per_s"] = naive_rows / (time.perf_counter() - start)
+        engine.stop()
+    return results
+
+
+def bench_alarm_view(counts=(100, 1000, 10000, 100000), changes=100):
+    """Alarms list redraw time against list size; needs a display"""
+    import tkinter as tk
+    from alarm_list_view import AlarmListView
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"error": f"no display: {e}"}
+    root.withdraw()
+    results = {}
+    for count in counts:
+        listbox = tk.Listbox(root, height=20)
+        view = AlarmListView(listbox, tk.Scrollbar(root))
+        store = AlarmStore()
+        base = time.time() + 3600
+        for i in range(count):
+            store.add(base + i * 60, f"Alarm {i}")
+        start = time.perf_counter()
+        view.reset(store)
+        view.render()
+        root.update_idletasks()
+        results[f"reset_ms_{count}"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for i in range(changes):
+            view.set(store.add(base - i, f"New {i}"))
+            root.update_idletasks()
+        results[f"add_ms_{count}"] = (time.perf_counter() - start) / changes * 1000
+        listbox.destroy()
+    root.destroy()
+    return results
+
+
+def bench_end_to_end(commands=6, delay=0.05):
+    """Recorded audio to alarm set: end of speech until the alarm is in the list
+
+    A WAV fixture is played in real time through continuous capture, the
+    recognizer pool (a fake backend taking delay per utterance) and the
+    engine; the end-of-utterance pause is most of the total.
+    """
+    segments, ends = room_segments(0, commands)
+    added = []
+    loop = EventLoop()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commands.wav")
+        write_test_wav(path, segments)
+        pipeline = RecognitionPipeline(
+            FakeBackend(lambda audio: "set alarm for 7:30 am gym", delay),
+            lambda result: engine.on_recognition_result(result),
+        )
+        engine = AlarmEngine(
+            loop.call_soon, os.path.join(tmp, "alarms.journal"), rooms={"bench": None},
+            components={"recognition": pipeline, "speech": RecordingSpeech(), "alarm_sound": SilentSound()},
+        )
+        engine.on("alarm_added", lambda alarm: added.append(time.perf_counter()))
+        threading.Thread(target=loop.run, daemon=True).start()
+        pipeline.start()
+        with sr.AudioFile(path) as source:
+            start = time.perf_counter()
+            source.stream = PacedStream(source.stream, source.SAMPLE_RATE, start)
+            engine.capture_room("bench", source)
+        pipeline.stop()
+        done = threading.Event()
+        loop.call_soon(done.set)
+        done.wait(5)
+        loop.stop()
+        engine.stop()
+    latencies = [at - start - end for at, end in zip(added, ends)]
+    return {
+        "commands": commands,
+        "alarms_set": len(added),
+        "speech_end_to_alarm_p50_ms": percentile(latencies, 50) * 1000,
+        "speech_end_to_alarm_max_ms": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+STARTUP_PRELUDE = """
+import json, os, sys, time
+started = time.perf_counter()
+"""
+STARTUP_REPORT = """
+first_frame_ms = (time.perf_counter() - started) * 1000
+warm_up.join()
+rss_kb = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS:'))
+report = {"first_frame_ms": first_frame_ms, "ready_ms": (time.perf_counter() - started) * 1000, "rss_kb": rss_kb}
+report.update({name + "_ms": ms for name, ms in engine.timings.items()})
+print(json.dumps(report))
+os._exit(0)
+"""
+# Each leaves 'engine' and its 'warm_up' thread behind once the app is usable
+STARTUP_MODES = {
+    "headless": """
+from alarm_daemon import EventLoop
+from alarm_engine import AlarmEngine
+loop = EventLoop()
+engine = AlarmEngine(loop.call_soon, alarms_file=sys.argv[1])
+engine.start()
+warm_up = engine.warm_up()
+""",
+    "tk": """
+import tkinter as tk
+from alarm_engine import AlarmEngine
+from app import VoiceAlarmClock
+root = tk.Tk()
+app = VoiceAlarmClock(root, AlarmEngine(lambda callback, *args: root.after(0, callback, *args), alarms_file=sys.argv[1]))
+engine = app.engine
+while app.warm_up_thread is None:
+    root.update()
+warm_up = app.warm_up_thread
+""",
+}
+
+
+def run_startup(code, alarms_file):
+    """Start the app in a fresh interpreter; returns its ready time and resident memory"""
+    import json
+    import subprocess
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", STARTUP_PRELUDE + code + STARTUP_REPORT, alarms_file],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ, SDL_AUDIODRIVER=os.environ.get("SDL_AUDIODRIVER", "dummy")),
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            result = json.loads(line)
+            result["process_ms"] = wall_ms
+            return result
+    error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+    return {"error": error}
+
+
+def bench_startup():
+    """Time to first frame, to fully warmed up, per-subsystem init time and RSS, per front end"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, code in STARTUP_MODES.items():
+            result = run_startup(code, os.path.join(tmp, f"{mode}.journal"))
+            for key, value in result.items():
+                results[f"{mode}_{key}"] = value
+    return results
+
+
+BENCHMARKS = {
+    "scheduler": bench_scheduler,
+    "scheduler_scaling": bench_scheduler_scaling,
+    "alarm_store": bench_alarm_store,
+    "journal": bench_journal,
+    "pipeline": bench_pipeline,
+    "recognizers": bench_recognizers,
+    "wake_word": bench_wake_word,
+    "speech_queue": bench_speech_queue,
+    "alarm_sound": bench_alarm_sound,
+    "parser": bench_parser,
+    "recurrence": bench_recurrence,
+    "metrics": bench_metrics,
+    "simulation": bench_simulation,
+    "control_api": bench_control_api,
+    "alarm_io": bench_alarm_io,
+    "alarm_view": bench_alarm_view,
+    "end_to_end": bench_end_to_end,
+    "startup": bench_startup,
+}
+
+
+# Name parts saying a smaller number is better; rates ("_per_s", "_per_sec") are the other way
+LOWER_IS_BETTER = {"ms", "s", "us", "kb", "bytes", "percent", "calls"}
+# Outcome counts compared exactly: what worked must not drop, what failed must not rise
+SUCCESS_COUNTS = {"fired", "fires", "imported", "alarms_set"}
+FAILURE_COUNTS = {"late", "missed", "unexpected", "errors"}
+
+
+def direction(key):
+    """+1 when a bigger value is better, -1 when smaller is, 0 for counts and settings"""
+    parts = key.split("_")
+    if "legacy" in parts:
+        # The replaced implementation, kept for comparison only
+        return 0
+    if "cpu" not in parts and key.endswith(("_per_s", "_per_sec")):
+        return 1
+    if LOWER_IS_BETTER.intersection(parts):
+        return -1
+    return 0
+
+
+def find_regressions(results, baseline, tolerance, names=None):
+    """Lines describing each measurement worse than the baseline by more than tolerance (a fraction)
+
+    Every baseline benchmark in names (default: all of them) must have run,
+    reported each key it reported before and not turned into an error.
+    """
+    regressions = []
+    for name in names or baseline:
+        if name not in baseline:
+            continue
+        if name not in results:
+            regressions.append(f"{name}: not run")
+            continue
+        result, expected = results[name], baseline[name]
+        if "error" in result and "error" not in expected:
+            regressions.append(f"{name}: failed: {result['error']}")
+            continue
+        for key, old in expected.items():
+            if key not in result:
+                regressions.append(f"{name}.{key}: missing")
+                continue
+            value = result[key]
+            if key in SUCCESS_COUNTS or key in FAILURE_COUNTS:
+                if value != old and (value < old) == (key in SUCCESS_COUNTS):
+                    regressions.append(f"{name}.{key}: {old} -> {value}")
+                continue
+            if isinstance(value, bool) or isinstance(old, bool):
+                # Correctness flags such as in_order must not flip
+                if old is True and value is not True:
+                    regressions.append(f"{name}.{key}: {old} -> {value}")
+                continue
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / abs(old) * direction(key)
+            if change < -tolerance:
+                regressions.append(f"{name}.{key}: {old:.3f} -> {value:.3f} ({change:+.0%})")
+    return regressions
+
+
+def main(args):
+    import argparse
+    import platform
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the alarm clock")
+    parser.add_argument("names", nargs="*", metavar="NAME", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--json", help="write the results to this file; it can be used as a baseline later")
+    parser.add_argument("--baseline", help="earlier --json results; exit 1 if anything got worse")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="how much worse than the baseline is allowed, as a fraction (default 0.25)")
+    options = parser.parse_args(args)
+    unknown = [name for name in options.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)}")
+
+    results = {}
+    for name in options.names or BENCHMARKS:
+        print(f"Running {name}...")
+        result = results[name] = BENCHMARKS[name]()
+        for key, value in result.items():
+            if isinstance(value, float):
+                print(f"  {key}: {value:.3f}")
+            else:
+                print(f"  {key}: {value}")
+
+    if options.json:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": results,
+        }
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {options.json}")
+    if options.baseline:
+        with open(options.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, options.tolerance, options.names)
+        for regression in regressions:
+            print(f"  regressed {regression}")
+        print(f"{len(regressions)} regressions against {options.baseline} (tolerance {options.tolerance:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
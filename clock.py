@@ -0,0 +1,106 @@
+import datetime
+import heapq
+import itertools
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class SystemClock:
+    """Wall-clock time, the default everywhere"""
+
+    realtime = True
+
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, cond, timeout=None):
+        """Wait on a held Condition for at most timeout seconds"""
+        return cond.wait(timeout)
+
+
+class SimulatedClock:
+    """Virtual time that only moves when run_until() fast-forwards it
+
+    Callbacks queued with call_at()/call_soon() run on the caller's thread
+    in time order, and time jumps straight from one to the next, so a week
+    of alarms replays in seconds. Schedulers built on this clock do not
+    start a thread; register them with drive() and run_until() fires
+    their alarms as virtual time reaches them.
+    """
+
+    realtime = False
+
+    def __init__(self, start=None):
+        self._now = start if start is not None else time.time()
+        self._heap = []
+        self._counter = itertools.count()
+        self._schedulers = []
+
+    def time(self):
+        return self._now
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self._now)
+
+    def sleep(self, seconds):
+        self.advance_to(self._now + seconds)
+
+    def wait(self, cond, timeout=None):
+        raise RuntimeError("A simulated clock cannot block a thread; use run_until()")
+
+    def advance_to(self, when):
+        if when > self._now:
+            self._now = when
+
+    def call_at(self, when, callback, *args):
+        heapq.heappush(self._heap, (when, next(self._counter), callback, args))
+
+    def call_later(self, seconds, callback, *args):
+        self.call_at(self._now + seconds, callback, *args)
+
+    def call_soon(self, callback, *args):
+        self.call_at(self._now, callback, *args)
+
+    def drive(self, scheduler):
+        """Fire scheduler's alarms from run_until()"""
+        self._schedulers.append(scheduler)
+
+    def release(self, scheduler):
+        if scheduler in self._schedulers:
+            self._schedulers.remove(scheduler)
+
+    def run_until(self, end):
+        """Run everything due up to end in time order, then leave the clock at end; returns the callback count"""
+        ran = 0
+        while True:
+            when = self._heap[0][0] if self._heap else None
+            for scheduler in self._schedulers:
+                due = scheduler.next_fire_time()
+                if due is not None and (when is None or due < when):
+                    when = due
+            if when is None or when > end:
+                break
+            self.advance_to(when)
+            for scheduler in self._schedulers:
+                ran += scheduler.fire_due()
+            while self._heap and self._heap[0][0] <= self._now:
+                _, _, callback, args = heapq.heappop(self._heap)
+                ran += 1
+                try:
+                    callback(*args)
+                except Exception:
+                    log.exception("Simulated callback error")
+        self.advance_to(end)
+        return ran
+
+
+# The clock used when none is given
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,312 @@
+import collections
+import re
+
+SET_ALARM = "set_alarm"
+TELL_TIME = "tell_time"
+LIST_ALARMS = "list_alarms"
+DELETE_ALL = "delete_all"
+UNKNOWN = "unknown"
+
+# error values for a set_alarm command whose time could not be used
+NO_TIME = "no_time"
+INVALID_TIME = "invalid_time"
+
+# repeat is a cron day-of-week field ("*", "1-5", "mon,wed") for a recurring alarm
+ParsedCommand = collections.namedtuple(
+    "ParsedCommand", ["intent", "hour", "minute", "ampm", "label", "delay_minutes", "error", "repeat"],
+    defaults=[None],
+)
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13,
+    'fourteen': 14, 'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18,
+    'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+}
+TENS = {'twenty', 'thirty', 'forty', 'fifty'}
+UNITS = {'minute': 1, 'minutes': 1, 'min': 1, 'mins': 1, 'hour': 60, 'hours': 60}
+DAYS = {
+    'monday': 'mon', 'tuesday': 'tue', 'wednesday': 'wed', 'thursday': 'thu',
+    'friday': 'fri', 'saturday': 'sat', 'sunday': 'sun',
+}
+# Words that make an alarm repeat on their own; day names need "every" or a plural
+REPEAT_WORDS = {'daily': '*', 'weekdays': '1-5', 'weekends': '0,6'}
+REPEAT_WORDS.update({day + 's': short for day, short in DAYS.items()})
+EVERY = {'day': '*', 'weekday': '1-5', 'weekend': '0,6'}
+EVERY.update(DAYS)
+
+AMPM_WORDS = {"am": "AM", "a.m.": "AM", "a.m": "AM", "pm": "PM", "p.m.": "PM", "p.m": "PM"}
+# A word holding a digit time: "7", "7:30", "7am", "7:30p.m."
+DIGIT_TIME = re.compile(r"(\d{1,2})(?::(\d{2}))?([ap]\.?m\.?)?$")
+FILLER = {"set", "alarm", "for"}
+# What each word that needs handling is; any other word is label text
+_SET, _ALARM, _FOR, _IN, _NUMBER, _SHOW, _MY, _WHAT, _TIME, _WHATS, _THE, _DELETE, _REPEAT = range(13)
+WORD_KINDS = dict.fromkeys(NUMBER_WORDS, _NUMBER)
+WORD_KINDS.update(dict.fromkeys(list(REPEAT_WORDS) + ["every"], _REPEAT))
+WORD_KINDS.update({
+    "set": _SET, "alarm": _ALARM, "for": _FOR, "in": _IN, "show": _SHOW, "shows": _SHOW,
+    "showing": _SHOW, "my": _MY, "list": _MY, "what": _WHAT, "time": _TIME, "what's": _WHATS,
+    "the": _THE, "delete": _DELETE,
+})
+DIGITS = set("0123456789")
+# Priority classes of time forms, in the order the original regexes were
+# tried; lower wins and ties go to the earliest
+CLASS_HM_AMPM, CLASS_H_AMPM, CLASS_HM, CLASS_H = range(4)
+
+
+def parse_command(command, current_hour=12):
+    """Parse a transcript into intent, time, AM/PM and label in one pass over its words
+
+    current_hour is used to guess AM/PM for a bare hour ("set alarm for 7"),
+    as the original command handler did.
+    """
+    words = command.lower().split()
+    set_alarm = tell_time = list_alarms = delete_all = False
+    best = None
+    relative = None
+    repeat = None
+    fillers = []
+    skip_to = 0
+    for i, word in enumerate(words):
+        if i < skip_to:
+            continue
+        kind = WORD_KINDS.get(word)
+        if kind is None:
+            if word[0] in DIGITS:
+                found = _digit_time(words, i)
+                if found:
+                    if best is None or found[0] < best[0]:
+                        best = found
+                    skip_to = found[5]
+            continue
+        if kind <= _FOR:
+            fillers.append(i)
+            if kind == _SET:
+                set_alarm = set_alarm or words[i + 1:i + 2] != [] and words[i + 1].startswith("alarm")
+            elif kind == _ALARM:
+                set_alarm = set_alarm or words[i + 1:i + 2] == ["for"]
+        elif kind == _NUMBER:
+            found = _spoken_time(words, i)
+            if found:
+                if best is None or found[0] < best[0]:
+                    best = found
+                skip_to = found[5]
+        elif kind == _REPEAT:
+            found = _repeat(words, i)
+            if found and repeat is None:
+                repeat = found[0]
+                if i and words[i - 1] == "on":
+                    fillers.append(i - 1)
+                fillers.extend(range(i, found[1]))
+                skip_to = found[1]
+        elif kind == _IN:
+            found = _relative(words, i + 1)
+            if found and relative is None:
+                relative = (found[0], i, found[1])
+                skip_to = found[1]
+        elif kind == _SHOW:
+            list_alarms = True
+        elif kind == _MY:
+            list_alarms = list_alarms or words[i + 1:i + 2] != [] and words[i + 1].startswith("alarm")
+        elif kind == _WHAT:
+            tell_time = tell_time or words[i + 1:i + 2] == ["time"]
+        elif kind == _TIME:
+            tell_time = tell_time or words[i + 1:i + 3] == ["is", "it"]
+        elif kind == _WHATS:
+            tell_time = tell_time or words[i + 1:i + 3] == ["the", "time"]
+        elif kind == _THE:
+            tell_time = tell_time or words[i + 1:i + 3] == ["time", "now"]
+        elif kind == _DELETE:
+            delete_all = delete_all or (words[i + 1:i + 2] == ["all"] and words[i + 2:i + 3] != []
+                                        and words[i + 2].startswith("alarm"))
+
+    # Same precedence as the original if/elif chain
+    if not set_alarm:
+        intent = TELL_TIME if tell_time else LIST_ALARMS if list_alarms else DELETE_ALL if delete_all else UNKNOWN
+        return ParsedCommand(intent, None, None, None, None, None, None)
+    if relative is not None:
+        minutes, start, end = relative
+        return ParsedCommand(SET_ALARM, None, None, None, _label(words, start, end, fillers), minutes, None)
+    if best is None:
+        return ParsedCommand(SET_ALARM, None, None, None, None, None, NO_TIME)
+
+    time_class, hour, minute, ampm, start, end = best
+    if ampm is None:
+        if time_class == CLASS_HM:
+            # A 24-hour clock time
+            if hour == 0:
+                hour, ampm = 12, "AM"
+            elif hour < 12:
+                ampm = "AM"
+            elif hour == 12:
+                ampm = "PM"
+            else:
+                hour -= 12
+                ampm = "PM"
+        else:
+            ampm = "AM" if hour <= 12 and current_hour < 12 else "PM"
+    if start and words[start - 1] == "at":
+        # "every day at 7 am": the "at" belongs to the time, not the label
+        start -= 1
+    label = _label(words, start, end, fillers)
+    if hour < 1 or hour > 12 or minute < 0 or minute > 59:
+        return ParsedCommand(SET_ALARM, hour, minute, ampm, label, None, INVALID_TIME, repeat)
+    return ParsedCommand(SET_ALARM, hour, minute, ampm, label, None, None, repeat)
+
+
+def best_alternative(alternatives, current_hour=12):
+    """Pick the first n-best transcript that parses to a usable command
+
+    Returns (transcript, parsed); falls back to the top alternative.
+    """
+    first = None
+    for text in alternatives:
+        parsed = parse_command(text, current_hour)
+        if first is None:
+            first = (text, parsed)
+        if parsed.intent != UNKNOWN and parsed.error is None:
+            return text, parsed
+    return first if first else ("", parse_command("", current_hour))
+
+
+def _ampm_at(words, i):
+    """AM/PM said at words[i] ("am", "p.m.", "a m"); returns (ampm, next_index) or None"""
+    if i >= len(words):
+        return None
+    word = words[i]
+    if word in AMPM_WORDS:
+        return AMPM_WORDS[word], i + 1
+    if word in ("a", "p") and i + 1 < len(words) and words[i + 1] in ("m", "m."):
+        return ("AM" if word == "a" else "PM"), i + 2
+    return None
+
+
+def _digit_time(words, i):
+    """(class, hour, minute, ampm, start, end) for a time written in digits at words[i]"""
+    m = DIGIT_TIME.match(words[i])
+    if not m:
+        return None
+    hour, minute, ampm = m.groups()
+    end = i + 1
+    if ampm:
+        ampm = "AM" if ampm[0] == "a" else "PM"
+    else:
+        found = _ampm_at(words, end)
+        if found:
+            ampm, end = found
+        elif minute is None and end < len(words) and len(words[end]) == 2 and words[end].isdigit():
+            # "7 30 am": hour and minute said as separate numbers
+            found = _ampm_at(words, end + 1)
+            if found:
+                minute = words[end]
+                ampm, end = found
+    if ampm:
+        time_class = CLASS_HM_AMPM if minute is not None else CLASS_H_AMPM
+    else:
+        time_class = CLASS_HM if minute is not None else CLASS_H
+    return (time_class, int(hour), int(minute or 0), ampm, i, end)
+
+
+def _spoken_number(words, i):
+    """Parse "twenty five" / "fifteen" at words[i]; returns (value, next_index) or None"""
+    if i >= len(words) or words[i] not in NUMBER_WORDS:
+        return None
+    value = NUMBER_WORDS[words[i]]
+    if words[i] in TENS and i + 1 < len(words) and NUMBER_WORDS.get(words[i + 1], 10) < 10:
+        return value + NUMBER_WORDS[words[i + 1]], i + 2
+    return value, i + 1
+
+
+def _spoken_time(words, i):
+    """A time said in words: "seven thirty", "twelve oh five p m", "eight o'clock" """
+    hour = NUMBER_WORDS[words[i]]
+    if hour > 12:
+        return None
+    minute = None
+    j = i + 1
+    following = words[j] if j < len(words) else ""
+    if following == "o'clock" or (following == "o" and words[j + 1:j + 2] == ["clock"]):
+        j += 1 if following == "o'clock" else 2
+    elif following in ("oh", "o"):
+        found = _spoken_number(words, j + 1)
+        if found and found[0] < 10:
+            minute, j = found
+    else:
+        found = _spoken_number(words, j)
+        if found and 10 <= found[0] <= 59:
+            minute, j = found
+    found = _ampm_at(words, j)
+    if found:
+        ampm, j = found
+        return (CLASS_HM_AMPM if minute is not None else CLASS_H_AMPM, hour, minute or 0, ampm, i, j)
+    if j == i + 1 and (i == 0 or words[i - 1] not in ("for", "at")):
+        # A lone number word is too ambiguous ("take one pill") unless it follows "for"/"at"
+        return None
+    # Spoken "seven thirty" is a 12-hour time, so AM/PM is guessed as for a bare hour
+    return (CLASS_H, hour, minute or 0, None, i, j)
+
+
+def _relative(words, i):
+    """Parse "20 minutes" / "an hour" / "half an hour" at words[i]; returns (minutes, next_index)"""
+    if i >= len(words):
+        return None
+    word = words[i]
+    j = i + 1
+    if word.isdigit():
+        amount = int(word)
+    elif word in ("a", "an"):
+        amount = 1
+    elif word == "half" and words[j:j + 1] in (["a"], ["an"]):
+        amount, j = 0.5, j + 1
+    else:
+        found = _spoken_number(words, i)
+        if not found:
+            return None
+        amount, j = found
+    if j >= len(words) or words[j] not in UNITS:
+        return None
+    return int(amount * UNITS[words[j]]), j + 1
+
+
+def _repeat(words, i):
+    """Parse "daily" / "every weekday" / "every monday and friday" / "mondays" at words[i]
+
+    Returns (cron day-of-week field, next_index) or None.
+    """
+    word = words[i]
+    if word == "every":
+        following = words[i + 1].rstrip(",") if i + 1 < len(words) else ""
+        first = EVERY.get(following)
+        if first is None:
+            return None
+        if following not in DAYS:
+            return first, i + 2
+        days, j = [first], i + 2
+    elif word[:-1] in DAYS:
+        days, j = [REPEAT_WORDS[word]], i + 1
+    else:
+        return REPEAT_WORDS[word], i + 1
+    # More days: "monday and friday", "mondays, wednesdays and fridays"
+    while j < len(words):
+        following = words[j].rstrip(",")
+        if following == "and" and j + 1 < len(words):
+            following = words[j + 1].rstrip(",")
+            step = 2
+        else:
+            step = 1
+        day = DAYS.get(following) or DAYS.get(following[:-1])
+        if day is None:
+            break
+        days.append(day)
+        j += step
+    return ",".join(days), j
+
+
+def _label(words, start, end, fillers):
+    """The words left after removing the time and set/alarm/for, title-cased"""
+    kept = words[:start] + words[end:]
+    for index in reversed(fillers):
+        # Filler indexes past the time shift down once it is cut out
+        del kept[index - (end - start) if index >= end else index]
+    label = " ".join(kept)
+    return label.title() if label else "Alarm"
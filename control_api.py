@@ -0,0 +1,229 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+# Requests larger than this are refused rather than buffered
+MAX_BODY = 16 * 1024 * 1024
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def alarm_to_json(alarm):
+    return {"id": alarm.id, "fire_at": alarm.fire_at, "time": alarm.time, "label": alarm.label,
+            "active": alarm.active, "repeat": alarm.rule}
+
+
+class ControlServer:
+    """Local HTTP/JSON API for managing alarms from other programs
+
+        GET    /alarms              list every alarm
+        POST   /alarms              add one: {"time": "07:30 AM", "label": ..., "repeat": "1-5"}
+                                    or {"fire_at": <epoch>, "label": ...}
+        DELETE /alarms/<id>         delete one
+        POST   /alarms/<id>/snooze  snooze a ringing alarm: {"seconds": 300} or {"until": <epoch>}
+        POST   /alarms/batch        {"changes": [{"op": "add"|"delete"|"snooze", ...}, ...]}
+
+    A batch is applied all-or-nothing in one journal flush with one UI
+    redraw. The server runs an asyncio loop on its own thread and listens
+    on 127.0.0.1 (and/or a Unix socket); every engine call is handed to
+    the engine's call_soon and awaited, so the engine is still only
+    touched from its own thread.
+    """
+
+    def __init__(self, engine, host="127.0.0.1", port=0, path=None):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.path = path
+        self.requests = 0
+        self._loop = None
+        self._servers = []
+        self._thread = None
+
+    def start(self):
+        """Start listening; returns the TCP port (or None for a socket only)"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self._listen())
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            log.warning("Could not start control API: %s", errors[0])
+            return None
+        log.info("Control API listening on %s", self.address())
+        return self.port or None
+
+    def address(self):
+        places = [f"http://{self.host}:{self.port}"] if self.port else []
+        if self.path:
+            places.append(self.path)
+        return ", ".join(places)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _listen(self):
+        if self.port is not None and (self.port or not self.path):
+            server = await asyncio.start_server(self._client, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._servers.append(await asyncio.start_unix_server(self._client, self.path))
+
+    async def _shutdown(self):
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        # Drop idle keep-alive connections too
+        clients = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._handle(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _handle(self, method, target, body):
+        self.requests += 1
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
+            return await self._route(method, target.split("?", 1)[0].rstrip("/").split("/")[1:], data)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+        except KeyError as e:
+            return 404, {"error": e.args[0]}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            log.exception("Control API error")
+            return 500, {"error": str(e)}
+
+    async def _route(self, method, parts, data):
+        if not parts or parts[0] != "alarms":
+            raise HTTPError(404, "Not found")
+        if len(parts) == 1:
+            if method == "GET":
+                return 200, {"alarms": await self._call(self._list)}
+            if method == "POST":
+                alarm = await self._call(self.engine.apply_change, dict(data, op="add"))
+                return 201, alarm_to_json(alarm)
+        elif parts[1] == "batch":
+            if method == "POST":
+                changes = data.get("changes")
+                if not isinstance(changes, list):
+                    raise ValueError("Expected {\"changes\": [...]}")
+                return 200, {"results": await self._call(self._batch, changes)}
+        else:
+            alarm_id = self._alarm_id(parts[1])
+            if len(parts) == 2 and method == "DELETE":
+                await self._call(self.engine.apply_change, {"op": "delete", "id": alarm_id})
+                return 200, {"deleted": alarm_id}
+            if len(parts) == 3 and parts[2] == "snooze" and method == "POST":
+                alarm = await self._call(self.engine.apply_change, dict(data, op="snooze", id=alarm_id))
+                return 200, alarm_to_json(alarm)
+            if len(parts) > 3 or (len(parts) == 3 and parts[2] != "snooze"):
+                raise HTTPError(404, "Not found")
+        raise HTTPError(405, f"{method} not allowed here")
+
+    @staticmethod
+    def _alarm_id(text):
+        try:
+            return int(text)
+        except ValueError:
+            raise HTTPError(404, f"No alarm {text}")
+
+    def _list(self):
+        return [alarm_to_json(alarm) for alarm in self.engine.alarms]
+
+    def _batch(self, changes):
+        # Built on the engine thread, while the alarms cannot change underneath
+        return [alarm_to_json(alarm) for alarm in self.engine.apply_changes(changes)]
+
+    async def _call(self, func, *args):
+        """Run func on the engine's thread and wait for its result"""
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        self.engine.call_soon(run)
+        return await asyncio.wrap_future(future)
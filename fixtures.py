@@ -0,0 +1,153 @@
+import array
+import math
+import random
+import re
+import time
+import wave
+
+from command_parser import DELETE_ALL, INVALID_TIME, LIST_ALARMS, NO_TIME, SET_ALARM, TELL_TIME, UNKNOWN
+
+SAMPLE_RATE = 16000
+
+
+def write_test_wav(path, segments, noise=60, seed=1):
+    """Write a mono WAV of (seconds, tone_amplitude) segments over background noise"""
+    rng = random.Random(seed)
+    samples = array.array('h')
+    for seconds, amplitude in segments:
+        for i in range(int(seconds * SAMPLE_RATE)):
+            value = rng.gauss(0, noise)
+            if amplitude:
+                value += amplitude * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)
+            samples.append(max(-32768, min(32767, int(value))))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+
+class PacedStream:
+    """Hand out a WAV no faster than a microphone would"""
+
+    def __init__(self, stream, sample_rate, start):
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.start = start
+        self.samples = 0
+
+    def read(self, size):
+        self.samples += size
+        delay = self.start + self.samples / self.sample_rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return self.stream.read(size)
+
+
+def room_segments(index, commands=2):
+    """Silence and tone segments for one room, staggered so rooms overlap; returns (segments, speech end times)"""
+    segments = [(0.4 + 0.1 * index, 0)]
+    ends = []
+    at = segments[0][0]
+    for _ in range(commands):
+        segments += [(0.5, 3000), (1.0, 0)]
+        ends.append(at + 0.5)
+        at += 1.5
+    return segments, ends
+
+
+LEGACY_PATTERNS = [
+    r'(\d{1,2}):(\d{2})\s*([ap]\.?m\.?)',
+    r'(\d{1,2})\s*([ap]\.?m\.?)',
+    r'(\d{1,2}):(\d{2})(?!\s*[ap]\.?m\.?)',
+    r'(\d{1,2})(?!\s*:)(?!\s*[ap]\.?m\.?)'
+]
+
+
+def legacy_parse(command, current_hour):
+    """The substring checks and regex chain process_command used before command_parser
+
+    Returns (intent, hour, minute, ampm, label, error) so results can be
+    compared with parse_command.
+    """
+    if "set alarm" in command or "alarm for" in command:
+        for pattern_used, pattern in enumerate(LEGACY_PATTERNS):
+            time_match = re.search(pattern, command, re.IGNORECASE)
+            if time_match:
+                break
+        else:
+            return (SET_ALARM, None, None, None, None, NO_TIME)
+        groups = time_match.groups()
+        if pattern_used == 0:
+            hour, minute, ampm = int(groups[0]), int(groups[1]), groups[2]
+        elif pattern_used == 1:
+            hour, minute, ampm = int(groups[0]), 0, groups[1]
+        elif pattern_used == 2:
+            hour, minute = int(groups[0]), int(groups[1])
+            if hour == 0:
+                hour, ampm = 12, "AM"
+            elif hour < 12:
+                ampm = "AM"
+            elif hour == 12:
+                ampm = "PM"
+            else:
+                hour -= 12
+                ampm = "PM"
+        else:
+            hour, minute = int(groups[0]), 0
+            ampm = "AM" if hour <= 12 and current_hour < 12 else "PM"
+        if pattern_used < 2:
+            ampm = "AM" if ampm.replace('.', '').upper().startswith('A') else "PM"
+        label_text = command.replace(time_match.group().lower(), "")
+        label_text = re.sub(r'\b(set|alarm|for)\b', '', label_text, flags=re.IGNORECASE).strip()
+        label = label_text.title() if label_text else "Alarm"
+        if hour < 1 or hour > 12 or minute < 0 or minute > 59:
+            return (SET_ALARM, hour, minute, ampm, label, INVALID_TIME)
+        return (SET_ALARM, hour, minute, ampm, label, None)
+    if any(phrase in command for phrase in ["what time", "time is it", "what's the time", "the time now"]):
+        return (TELL_TIME, None, None, None, None, None)
+    if any(phrase in command for phrase in ["show", "my alarm", "list alarm"]):
+        return (LIST_ALARMS, None, None, None, None, None)
+    if "delete all alarm" in command:
+        return (DELETE_ALL, None, None, None, None, None)
+    return (UNKNOWN, None, None, None, None, None)
+
+
+LABELS = ["", "wake up", "gym", "take pills", "call mom", "meeting with bob", "dentist"]
+AMPM = ["am", "pm", "a.m.", "p.m."]
+OTHER = [
+    "what time is it", "what's the time", "tell me the time now", "show my alarms",
+    "list alarms please", "my alarms", "delete all alarms", "hello there", "play some music",
+]
+
+
+def make_corpus(count, seed=1):
+    """Transcripts shaped like Google results for the commands the app supports"""
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < count:
+        if rng.random() < 0.2:
+            corpus.append(rng.choice(OTHER))
+            continue
+        hour = rng.randint(0, 23)
+        minute = rng.randint(0, 59)
+        form = rng.randint(0, 4)
+        if form == 0:
+            spoken = f"{rng.randint(1, 12)}:{minute:02d} {rng.choice(AMPM)}"
+        elif form == 1:
+            spoken = f"{rng.randint(1, 12)}{rng.choice(['', ' '])}{rng.choice(AMPM)}"
+        elif form == 2:
+            spoken = f"{hour}:{minute:02d}"
+        elif form == 3:
+            spoken = str(rng.randint(1, 12))
+        else:
+            spoken = f"{rng.randint(13, 30)}:{rng.randint(0, 99):02d}"
+        label = rng.choice(LABELS)
+        opener = rng.choice(["set alarm for", "set alarm", "alarm for", "please set alarm for"])
+        if label and rng.random() < 0.2:
+            corpus.append(f"{opener} {label} at {spoken}".replace(" at ", " for ", 1))
+        elif label:
+            corpus.append(f"{opener} {spoken} {label}")
+        else:
+            corpus.append(f"{opener} {spoken}")
+    return corpus
@@ -0,0 +1,164 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from 1 ms to 30 s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# What each stage measures, for the export's HELP lines
+STAGES = {
+    "capture": "Speech onset to the utterance being cut",
+    "recognition_wait": "Utterance queued until a recognizer worker takes it",
+    "recognition": "Recognizer time for one utterance",
+    "parse": "Parsing the transcript (all n-best alternatives)",
+    "dispatch": "Parsed command waiting for the engine thread",
+    "command": "Running the command on the engine thread",
+    "tts_start": "speak() until the speech worker starts saying it",
+    "tts_speak": "Saying one message",
+    "alarm_fire_lag": "Alarm due time until the scheduler fired it",
+    "alarm_sound_start": "Alarm due time until its tone was playing",
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is one bisect and two adds"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """Per-stage latency histograms with Prometheus-text export and a JSON-lines log
+
+    observe() is safe from any thread. The structured log is off until
+    open_log() is called; the exports run on their own threads.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._log = None
+        self._server = None
+        self._writer = None
+
+    def observe(self, stage, seconds, **fields):
+        """Record one latency; extra fields only go to the structured log"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            if self._log is not None:
+                fields["ts"] = time.time()
+                fields["stage"] = stage
+                fields["ms"] = round(seconds * 1000, 3)
+                self._log.write(json.dumps(fields, separators=(',', ':')) + "\n")
+
+    def prometheus_text(self):
+        """The histograms in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                name = f"alarm_clock_{stage}_seconds"
+                lines.append(f"# HELP {name} {STAGES.get(stage, stage)}")
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(h.bounds, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum {h.total}")
+                lines.append(f"{name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the export atomically, for node_exporter's textfile collector"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def open_log(self, path):
+        """Append a JSON line per observation to path (line-buffered)"""
+        with self._lock:
+            self._log = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def start_file_export(self, path, interval=15.0):
+        """Rewrite the Prometheus text file every interval seconds"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_prometheus(path)
+                except OSError as e:
+                    log.warning("Could not write metrics to %s: %s", path, e)
+        self._writer = threading.Thread(target=run, daemon=True)
+        self._writer.start()
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the export at http://host:port/metrics; localhost only by default"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+# The process-wide registry the pipeline stages report to
+METRICS = Metrics()
+
+
+def observe(stage, seconds, **fields):
+    METRICS.observe(stage, seconds, **fields)
@@ -0,0 +1,235 @@
+import collections
+import logging
+import threading
+import time
+
+import speech_recognition as sr
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# What submit() does when the queue of untranscribed utterances is full
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+BLOCK = "block"
+
+# alternatives holds the recognizer's n-best transcripts, best first, when it has them;
+# room is where the utterance was captured
+RecognitionResult = collections.namedtuple(
+    "RecognitionResult", ["seq", "text", "error", "dropped", "alternatives", "room"], defaults=[(), None]
+)
+
+
+class RecognitionPipeline:
+    """Transcribe captured utterances on a worker pool and deliver results in order
+
+    The capture stage calls submit() and goes straight back to listening.
+    Workers pull utterances from a bounded queue and run the recognizer
+    backend concurrently; finished transcripts are held in a reorder buffer
+    so on_result sees them in the order they were spoken. Dropped
+    utterances are delivered as results with dropped=True so the sequence
+    never stalls.
+    """
+
+    def __init__(self, backend, on_result, workers=2, max_pending=8, drop_policy=DROP_OLDEST):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.backend = backend
+        self.on_result = on_result
+        self.workers = workers
+        self.max_pending = max_pending
+        self.drop_policy = drop_policy
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._finished = {}
+        self._next_seq = 0
+        self._order_lock = threading.Lock()
+        self._generation = 0
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        """Start the recognizer workers"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        self._threads = [threading.Thread(target=self._worker, args=(generation,), daemon=True)
+                         for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait=False):
+        """Stop the workers; queued utterances are discarded unless wait is True
+
+        With wait, every utterance submitted so far is transcribed and its
+        result delivered before this returns. Otherwise workers busy with a
+        transcription finish it in the background rather than blocking the
+        caller.
+        """
+        with self._cond:
+            if wait:
+                while self._running and self._pending:
+                    self._cond.wait()
+            self._running = False
+            discarded = list(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for seq, _, _, room in discarded:
+            self._finish(RecognitionResult(seq, None, None, True, room=room))
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def submit(self, audio, room=None):
+        """Queue an utterance for transcription; returns its sequence number"""
+        dropped = None
+        with self._cond:
+            seq = self.submitted
+            self.submitted += 1
+            if len(self._pending) >= self.max_pending:
+                if self.drop_policy == BLOCK:
+                    while self._running and len(self._pending) >= self.max_pending:
+                        self._cond.wait()
+                elif self.drop_policy == DROP_OLDEST:
+                    dropped, _, _, dropped_room = self._pending.popleft()
+                else:
+                    dropped, dropped_room = seq, room
+            if dropped != seq:
+                self._pending.append((seq, audio, time.perf_counter(), room))
+                self._cond.notify_all()
+        if dropped is not None:
+            log.warning("Recognition queue full, dropping utterance %s", dropped)
+            self._finish(RecognitionResult(dropped, None, None, True, room=dropped_room))
+        return seq
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _worker(self, generation):
+        while True:
+            with self._cond:
+                while self._running and self._generation == generation and not self._pending:
+                    self._cond.wait()
+                if not self._running or self._generation != generation:
+                    return
+                seq, audio, submitted, room = self._pending.popleft()
+                # Wake a producer blocked on a full queue
+                self._cond.notify_all()
+            started = time.perf_counter()
+            metrics.observe("recognition_wait", started - submitted, seq=seq, room=room)
+            try:
+                alternatives = self.backend.recognize_all(audio)
+                metrics.observe("recognition", time.perf_counter() - started, seq=seq, room=room)
+                result = RecognitionResult(seq, alternatives[0], None, False, alternatives, room)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                result = RecognitionResult(seq, None, e, False, room=room)
+            except Exception as e:
+                log.exception("Recognizer error")
+                result = RecognitionResult(seq, None, e, False, room=room)
+            self._finish(result)
+
+    def _finish(self, result):
+        # Deliver under the order lock so results leave in sequence
+        with self._order_lock:
+            if result.dropped:
+                self.dropped += 1
+            else:
+                self.completed += 1
+            self._finished[result.seq] = result
+            while self._next_seq in self._finished:
+                ready = self._finished.pop(self._next_seq)
+                self._next_seq += 1
+                try:
+                    self.on_result(ready)
+                except Exception:
+                    log.exception("Recognition result handler error")
+
+
+class StreamingRecognition:
+    """Feed speech frames to a streaming backend and commit commands early
+
+    ContinuousCapture calls speech_started() at each onset, speech_frame()
+    for every frame of the utterance and speech_ended() when it closes.
+    Once the partial hypothesis is a complete command (per is_complete) and
+    has stayed the same for stable_seconds, it is delivered straight away
+    and speech_frame() returns True so the capture ends the utterance
+    without waiting for the trailing pause.
+    """
+
+    def __init__(self, backend, on_result, is_complete, stable_seconds=0.3, room=None):
+        self.backend = backend
+        self.on_result = on_result
+        self.is_complete = is_complete
+        self.stable_seconds = stable_seconds
+        self.room = room
+        self.seq = 0
+        self._stream = None
+        self._partial = ""
+        self._stable_for = 0.0
+        self._frame_seconds = 0.0
+        self._committed = False
+        self._decode_seconds = 0.0
+
+    def speech_started(self, sample_rate, frame_seconds):
+        self._stream = self.backend.stream(sample_rate)
+        self._partial = ""
+        self._stable_for = 0.0
+        self._frame_seconds = frame_seconds
+        self._committed = False
+        self._decode_seconds = 0.0
+
+    def speech_frame(self, frame):
+        """Feed one frame; returns True once the command has been committed"""
+        if self._stream is None or self._committed:
+            return self._committed
+        started = time.perf_counter()
+        partial = self._stream.accept(frame)
+        self._decode_seconds += time.perf_counter() - started
+        if partial != self._partial:
+            self._partial = partial
+            self._stable_for = 0.0
+        else:
+            self._stable_for += self._frame_seconds
+        if partial and self._stable_for >= self.stable_seconds and self.is_complete(partial):
+            log.info("Early commit on partial: %s", partial)
+            self._committed = True
+            self._deliver(partial)
+        return self._committed
+
+    def speech_ended(self):
+        if self._stream is None:
+            return
+        stream, self._stream = self._stream, None
+        if self._committed:
+            return
+        started = time.perf_counter()
+        try:
+            text = stream.finish()
+            self._decode_seconds += time.perf_counter() - started
+        except sr.RequestError as e:
+            self._deliver(None, e)
+            return
+        if text:
+            self._deliver(text)
+        else:
+            self._deliver(None, sr.UnknownValueError())
+
+    def _deliver(self, text, error=None):
+        # Decoding time spent on this utterance, spread over its frames
+        metrics.observe("recognition", self._decode_seconds, seq=self.seq, streaming=True, room=self.room)
+        result = RecognitionResult(self.seq, text, error, False, room=self.room)
+        self.seq += 1
+        try:
+            self.on_result(result)
+        except Exception:
+            log.exception("Recognition result handler error")
@@ -0,0 +1,181 @@
+import json
+import re
+import time
+
+import speech_recognition as sr
+
+NUMBER_WORDS = {
+    'oh': 0, 'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11,
+    'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15, 'sixteen': 16,
+    'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+}
+TENS_WORDS = {'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50}
+SPOKEN_NUMBER = re.compile(
+    r"\b(?:(%s)(?:[ -](%s))?|(%s))\b" % (
+        "|".join(TENS_WORDS), "|".join(w for w in NUMBER_WORDS if NUMBER_WORDS[w] < 10), "|".join(NUMBER_WORDS)
+    )
+)
+SPOKEN_CLOCK = re.compile(r"(?<![\d:])\b(\d{1,2})(?: (?:(0) (\d)|(\d{2})|o'?clock))?\s+([ap])\.? ?m\b\.?")
+
+
+def normalize_transcript(text):
+    """Rewrite spoken times ("seven thirty a m") as digits ("7:30 am")
+
+    Offline engines spell numbers out; the command parser expects the
+    digit form that the Google recognizer returns.
+    """
+    def number(match):
+        if match.group(1):
+            return str(TENS_WORDS[match.group(1)] + (NUMBER_WORDS[match.group(2)] if match.group(2) else 0))
+        return str(NUMBER_WORDS[match.group(3)])
+
+    def clock(match):
+        hour, oh, oh_minute, minute, ampm = match.groups()
+        if oh is not None:
+            minute = f"0{oh_minute}"
+        return f"{hour}:{minute or '00'} {ampm}m"
+
+    text = SPOKEN_NUMBER.sub(number, text.lower())
+    text = re.sub(r"\ba\.? m\b\.?", "am", text)
+    text = re.sub(r"\bp\.? m\b\.?", "pm", text)
+    return SPOKEN_CLOCK.sub(clock, text)
+
+
+class RecognizerBackend:
+    """Turn captured audio into lower-case text
+
+    recognize() raises sr.UnknownValueError when nothing intelligible was
+    said and sr.RequestError when the engine itself is unavailable.
+    """
+
+    name = "base"
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def recognize_all(self, audio):
+        """The n-best transcripts, best first; backends without them return just one"""
+        return [self.recognize(audio)]
+
+
+class GoogleBackend(RecognizerBackend):
+    """The Google Web Speech API used by the original listen loop"""
+
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio).lower()
+
+    def recognize_all(self, audio):
+        response = self.recognizer.recognize_google(audio, show_all=True)
+        alternatives = [alt["transcript"].lower() for alt in (response or {}).get("alternative", []) if "transcript" in alt]
+        if not alternatives:
+            raise sr.UnknownValueError()
+        return alternatives
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline, on-device recognition with Vosk, including streaming partials
+
+    The model is loaded on first use from model_path (any Vosk model
+    directory, e.g. vosk-model-small-en-us). Runs on CPU only.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path="model"):
+        self.model_path = model_path
+        self._model = None
+
+    def model(self):
+        if self._model is None:
+            try:
+                import vosk
+            except ImportError:
+                raise sr.RequestError("missing vosk module: ensure that vosk is set up correctly.")
+            vosk.SetLogLevel(-1)
+            try:
+                self._model = vosk.Model(self.model_path)
+            except Exception as e:
+                raise sr.RequestError(f"could not load Vosk model from {self.model_path}: {e}")
+        return self._model
+
+    def stream(self, sample_rate):
+        """Start a streaming recognition session for 16-bit mono audio"""
+        import vosk
+        return VoskStream(vosk.KaldiRecognizer(self.model(), sample_rate))
+
+    def recognize(self, audio):
+        stream = self.stream(audio.sample_rate)
+        stream.accept(audio.get_raw_data(convert_width=2))
+        text = stream.finish()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskStream:
+    """One utterance's worth of streaming Vosk recognition"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.text = ""
+
+    def accept(self, frame):
+        """Feed a frame; returns the current (partial) hypothesis"""
+        if self.recognizer.AcceptWaveform(frame):
+            # Vosk found an endpoint inside the utterance; keep the segment
+            segment = json.loads(self.recognizer.Result()).get("text", "")
+            self.text = f"{self.text} {segment}".strip()
+            return normalize_transcript(self.text)
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return normalize_transcript(f"{self.text} {partial}".strip())
+
+    def finish(self):
+        """Return the final transcript"""
+        segment = json.loads(self.recognizer.FinalResult()).get("text", "")
+        return normalize_transcript(f"{self.text} {segment}".strip())
+
+
+class FakeBackend(RecognizerBackend):
+    """Return scripted transcripts after a fixed delay, for tests and benchmarks"""
+
+    name = "fake"
+
+    def __init__(self, text_for=None, delay=0.0):
+        self.text_for = text_for
+        self.delay = delay
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        text = self.text_for(audio) if self.text_for else "what time is it"
+        if not text:
+            raise sr.UnknownValueError()
+        return text.lower()
+
+    def stream(self, sample_rate):
+        """Stream the scripted transcript a few words per second of audio"""
+        return FakeStream(self.text_for(None) if self.text_for else "what time is it", sample_rate)
+
+
+class FakeStream:
+    """Reveal a fixed transcript word by word as audio arrives"""
+
+    def __init__(self, text, sample_rate, words_per_second=3.0):
+        self.words = text.lower().split()
+        self.bytes_per_word = int(sample_rate * 2 / words_per_second)
+        self.received = 0
+
+    def accept(self, frame):
+        self.received += len(frame)
+        return " ".join(self.words[:self.received // self.bytes_per_word])
+
+    def finish(self):
+        return " ".join(self.words)
@@ -0,0 +1,139 @@
+import bisect
+import datetime
+
+# Cron numbers days of the week from Sunday = 0 (7 is Sunday too)
+DAY_NUMBERS = {
+    'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6,
+}
+DAY_ALIASES = {'daily': '*', 'weekdays': '1-5', 'weekends': '0,6'}
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# A yearly date such as Feb 29 can be up to 8 years away
+MAX_DAYS_AHEAD = 366 * 8
+
+_compiled = {}
+
+
+def make_rule(hour, minute, days='*'):
+    """Build a cron-style rule for a 24-hour clock time on the given days
+
+    days is a cron day-of-week field ("*", "1-5", "mon,wed") or one of
+    "daily", "weekdays", "weekends".
+    """
+    return f"{minute} {hour} * * {DAY_ALIASES.get(days, days)}"
+
+
+def compile_rule(spec):
+    """Return the Recurrence for a rule, compiling each distinct rule once"""
+    rule = _compiled.get(spec)
+    if rule is None:
+        rule = _compiled[spec] = Recurrence(spec)
+    return rule
+
+
+def next_fire(spec, after):
+    """Epoch time of the first occurrence of a rule strictly after 'after'"""
+    return compile_rule(spec).next_fire(after)
+
+
+def describe_rule(spec):
+    """Short text for a rule's days, e.g. 'daily', 'weekdays', 'Mon, Wed'"""
+    rule = compile_rule(spec)
+    if rule.any_date:
+        return "daily"
+    if rule.dates is None:
+        # Python weekday numbers are Monday = 0
+        if rule.weekdays == {0, 1, 2, 3, 4}:
+            return "weekdays"
+        if rule.weekdays == {5, 6}:
+            return "weekends"
+        return ", ".join(DAY_NAMES[day] for day in sorted(rule.weekdays))
+    return spec
+
+
+def _field(text, low, high, names=None):
+    """Expand one cron field ("*", "5", "1-5", "*/15", "mon,wed") into a set"""
+    values = set()
+    for part in text.lower().split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (_value(v, names) for v in part.split('-'))
+        else:
+            start = end = _value(part, names)
+            if step != 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Bad rule field: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _value(text, names):
+    if names and text[:3] in names:
+        return names[text[:3]]
+    return int(text)
+
+
+class Recurrence:
+    """A compiled cron rule: minute hour day-of-month month day-of-week
+
+    Fields take numbers, ranges, lists and steps; day-of-week also takes
+    names. As in cron, when both day fields are restricted a date matches
+    either one.
+    """
+
+    __slots__ = ('spec', 'times', 'months', 'dates', 'weekdays', 'any_date')
+
+    def __init__(self, spec):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"A rule needs 5 fields: {spec!r}")
+        minutes = _field(fields[0], 0, 59)
+        hours = _field(fields[1], 0, 23)
+        dates = _field(fields[2], 1, 31)
+        self.months = _field(fields[3], 1, 12)
+        weekdays = _field(fields[4], 0, 7, DAY_NUMBERS)
+        self.spec = spec
+        # Minutes of the day, sorted, for a bisect per lookup
+        self.times = sorted(hour * 60 + minute for hour in hours for minute in minutes)
+        # Stored as Python weekdays (Monday = 0); None means unrestricted
+        self.weekdays = None if fields[4] == '*' else {(day - 1) % 7 for day in weekdays}
+        self.dates = None if fields[2] == '*' else dates
+        self.any_date = self.weekdays is None and self.dates is None and len(self.months) == 12
+
+    def matches_date(self, day):
+        if self.any_date:
+            return True
+        if day.month not in self.months:
+            return False
+        if self.weekdays is None:
+            return self.dates is None or day.day in self.dates
+        if self.dates is None:
+            return day.weekday() in self.weekdays
+        return day.day in self.dates or day.weekday() in self.weekdays
+
+    def next_fire(self, after):
+        """Epoch time of the first matching minute strictly after 'after', or None"""
+        current = datetime.datetime.fromtimestamp(after)
+        day = current.date()
+        # Later today, from the minute after 'after'
+        index = bisect.bisect_right(self.times, current.hour * 60 + current.minute)
+        if index < len(self.times) and self.matches_date(day):
+            return self._at(day, self.times[index], after)
+        for _ in range(MAX_DAYS_AHEAD):
+            day += datetime.timedelta(days=1)
+            if self.matches_date(day):
+                return self._at(day, self.times[0], after)
+        return None
+
+    def _at(self, day, minute_of_day, after):
+        fire = datetime.datetime(day.year, day.month, day.day, minute_of_day // 60, minute_of_day % 60)
+        fire_at = int(fire.timestamp())
+        if fire_at <= after:
+            # The second pass through a wall-clock hour repeated when clocks go back
+            fire_at = int(fire.replace(fold=1).timestamp())
+        return fire_at
@@ -0,0 +1,178 @@
+import datetime
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from clock import SYSTEM_CLOCK
+
+log = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=2048)
+def parse_clock(time_str):
+    """(hour, minute) of a '%I:%M %p' string; there are only 1440, so each is parsed once"""
+    clock = datetime.datetime.strptime(time_str, "%I:%M %p")
+    return clock.hour, clock.minute
+
+
+def next_fire_time(time_str, now=None):
+    """Return the next absolute epoch time matching a '%I:%M %p' string"""
+    now = now if now is not None else time.time()
+    hour, minute = parse_clock(time_str)
+    current = datetime.datetime.fromtimestamp(now)
+    fire = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    # An alarm set for the current minute still fires, like the old minute compare
+    if fire.timestamp() + 60 <= now:
+        fire += datetime.timedelta(days=1)
+    return fire.timestamp()
+
+
+class AlarmScheduler:
+    """Fire alarms from a min-heap of absolute times, sleeping until the next one is due
+
+    With a simulated clock no thread is started; the clock calls
+    fire_due() as it fast-forwards instead.
+    """
+
+    def __init__(self, on_fire, clock=SYSTEM_CLOCK):
+        self.on_fire = on_fire
+        self.clock = clock
+        self._heap = []
+        self._entries = {}
+        self._cancelled = 0
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        if not self.clock.realtime:
+            self.clock.drive(self)
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if not self.clock.realtime:
+            self.clock.release(self)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def schedule(self, key, fire_at):
+        """Schedule (or reschedule) the alarm identified by key"""
+        with self._cond:
+            if key in self._entries:
+                self._cancel_locked(key)
+            entry = [fire_at, next(self._counter), key, True]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            # Only wake the thread if the head of the heap changed
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+    def cancel(self, key):
+        """Remove a scheduled alarm; returns False if it was not scheduled"""
+        with self._cond:
+            if key not in self._entries:
+                return False
+            was_head = self._heap[0][2] == key
+            self._cancel_locked(key)
+            if was_head:
+                self._cond.notify()
+            return True
+
+    def clear(self):
+        """Remove every scheduled alarm"""
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+            self._cancelled = 0
+            self._cond.notify()
+
+    def next_fire_time(self):
+        """Return the earliest pending fire time, or None"""
+        with self._cond:
+            self._drop_cancelled_head()
+            return self._heap[0][0] if self._heap else None
+
+    def fire_due(self):
+        """Fire every alarm due by the clock's current time; returns how many fired"""
+        with self._cond:
+            due = self._pop_due()
+        self._fire(due)
+        return len(due)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cancel_locked(self, key):
+        entry = self._entries.pop(key)
+        entry[3] = False
+        self._cancelled += 1
+        # Compact once dead entries dominate the heap
+        if self._cancelled > 1024 and self._cancelled * 2 > len(self._heap):
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _drop_cancelled_head(self):
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def _wait_for_due(self):
+        """Block until alarms are due; returns them, or None when stopped"""
+        while self._running:
+            self._drop_cancelled_head()
+            if not self._heap:
+                self._cond.wait()
+                continue
+            delay = self._heap[0][0] - self.clock.time()
+            if delay > 0:
+                self.clock.wait(self._cond, delay)
+                continue
+            return self._pop_due()
+        return None
+
+    def _pop_due(self):
+        now = self.clock.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, key, live = heapq.heappop(self._heap)
+            if live:
+                del self._entries[key]
+                due.append((key, fire_at))
+            else:
+                self._cancelled -= 1
+        return due
+
+    def _fire(self, due):
+        for key, fire_at in due:
+            try:
+                self.on_fire(key, fire_at)
+            except Exception:
+                log.exception("Scheduler callback error")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._wait_for_due()
+            if due is None:
+                return
+            self._fire(due)
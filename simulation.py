@@ -0,0 +1,220 @@
+import collections
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from alarm_engine import SNOOZE_SECONDS, AlarmEngine
+from clock import SimulatedClock
+
+# How long a fired alarm rings before the simulated user reacts
+REACTION_SECONDS = 30
+# Fires later than this count as late
+LATE_TOLERANCE = 1.0
+
+# fires/late/missed hold (alarm_id, due, fired_at) and (alarm_id, due)
+SimulationReport = collections.namedtuple(
+    "SimulationReport",
+    ["simulated_days", "wall_seconds", "commands", "fires", "late", "missed", "unexpected", "spoken"],
+)
+
+VOICE_COMMANDS = [
+    "set alarm for 6:45 am",
+    "set alarm for 7 am gym",
+    "set alarm for 10 pm take pills",
+    "set alarm in 20 minutes check the oven",
+    "set alarm for 12:30 pm lunch",
+    "what time is it",
+    "show my alarms",
+    "play some music",
+]
+RECURRING_COMMANDS = [
+    "set alarm for 6:30 am weekdays",
+    "set alarm for 9 am weekends for brunch",
+    "set alarm for 8 pm every monday and thursday for bins",
+]
+
+
+class SilentSound:
+    """Stands in for AlarmSoundPlayer; remembers what is ringing"""
+
+    def __init__(self):
+        self.ringing = set()
+
+    def start(self, alarm_id):
+        self.ringing.add(alarm_id)
+
+    def stop(self, alarm_id):
+        self.ringing.discard(alarm_id)
+
+    def stop_all(self):
+        self.ringing.clear()
+
+
+class RecordingSpeech:
+    """Stands in for SpeechQueue; keeps every message instead of saying it"""
+
+    def __init__(self):
+        self.messages = []
+
+    def speak(self, text, priority=None, key=None):
+        self.messages.append(text)
+        return True
+
+    def stop(self):
+        pass
+
+
+class Simulation:
+    """Replay alarms, snoozes, voice commands and power cuts on a fast-forwarded clock
+
+    Every alarm the engine schedules is expected to fire exactly once at
+    its due time; the report lists fires later than LATE_TOLERANCE,
+    occurrences that never fired and fires nobody scheduled.
+    """
+
+    def __init__(self, start=None, seed=1, snooze_chance=0.3, max_snoozes=2, alarms_file=None):
+        if start is None:
+            start = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        self.clock = SimulatedClock(start)
+        self.start = start
+        self.rng = random.Random(seed)
+        self.snooze_chance = snooze_chance
+        self.max_snoozes = max_snoozes
+        self.alarms_file = alarms_file
+        self.speech = RecordingSpeech()
+        self.sound = SilentSound()
+        self.scheduled = {}
+        self.fires = []
+        self.missed = []
+        self.unexpected = []
+        self.snoozes = collections.Counter()
+        self.commands = 0
+        self.engine = None
+
+    def boot(self):
+        """Start (or restart) the engine over the same journal"""
+        self.engine = AlarmEngine(
+            self.clock.call_soon, self.alarms_file, clock=self.clock,
+            components={"alarm_sound": self.sound, "speech": self.speech},
+        )
+        # Watch what the scheduler actually fires, before the engine sees it
+        self.engine.scheduler.on_fire = self.on_fire
+        self.engine.on("alarms_loaded", self.on_loaded)
+        self.engine.on("alarm_added", self.expect)
+        self.engine.on("alarm_changed", self.expect)
+        self.engine.on("alarm_removed", lambda alarm_id: self.scheduled.pop(alarm_id, None))
+        self.engine.on("alarms_cleared", self.scheduled.clear)
+        self.engine.on("alarm_fired", self.on_fired)
+        self.engine.start()
+
+    def power_cut(self, seconds):
+        """Stop the engine, let time pass, then start a fresh one"""
+        self.engine.stop()
+        self.clock.advance_to(self.clock.time() + seconds)
+        self.boot()
+
+    # Planned actions look the engine up when they run, so they reach the one booted after a power cut
+    def say(self, command):
+        self.commands += 1
+        self.engine.process_command(command)
+
+    def add(self, time_str, label):
+        self.engine.add_alarm(time_str, label)
+
+    def expect(self, alarm):
+        if alarm.active:
+            self.scheduled[alarm.id] = alarm.fire_at
+
+    def on_loaded(self, alarms):
+        live = set()
+        for alarm in alarms:
+            live.add(alarm.id)
+            due = self.scheduled.get(alarm.id)
+            if due is not None and due != alarm.fire_at:
+                # A recurring alarm moved past occurrences missed while off
+                self.missed.append((alarm.id, due))
+            self.expect(alarm)
+        for alarm_id in [alarm_id for alarm_id in self.scheduled if alarm_id not in live]:
+            # Dropped on restart as too old to still ring
+            self.missed.append((alarm_id, self.scheduled.pop(alarm_id)))
+
+    def on_fire(self, alarm_id, fire_at):
+        now = self.clock.time()
+        if self.scheduled.pop(alarm_id, None) == fire_at:
+            self.fires.append((alarm_id, fire_at, now))
+        else:
+            self.unexpected.append((alarm_id, fire_at, now))
+        self.engine.on_alarm_due(alarm_id, fire_at)
+
+    def on_fired(self, alarm):
+        if self.snoozes[alarm.label] < self.max_snoozes and self.rng.random() < self.snooze_chance:
+            self.clock.call_later(REACTION_SECONDS, self._snooze, alarm)
+        else:
+            self.clock.call_later(REACTION_SECONDS, self._dismiss, alarm)
+
+    def _snooze(self, alarm):
+        if alarm.id in self.engine.ringing:
+            snoozed = self.engine.snooze_alarm(alarm, self.clock.time() + SNOOZE_SECONDS)
+            self.snoozes[snoozed.label] = self.snoozes[alarm.label] + 1
+
+    def _dismiss(self, alarm):
+        if alarm.id in self.engine.ringing:
+            self.engine.dismiss_alarm(alarm)
+
+    def plan_week(self, days=7, commands_per_day=6, power_cuts=1):
+        """Queue a repeatable mix of recurring alarms, daily commands and power cuts"""
+        day = 86400
+        for command in RECURRING_COMMANDS:
+            self.clock.call_at(self.start + self.rng.uniform(0, 3600), self.say, command)
+        for index in range(days):
+            for _ in range(commands_per_day):
+                at = self.start + index * day + self.rng.uniform(6 * 3600, 22 * 3600)
+                self.clock.call_at(at, self.say, self.rng.choice(VOICE_COMMANDS))
+            at = self.start + index * day + self.rng.uniform(0, day)
+            self.clock.call_at(at, self.add, "11:59 PM", f"Manual {index}")
+        for _ in range(power_cuts):
+            # Short enough that most missed alarms still ring on restart, late
+            at = self.start + self.rng.uniform(day, days * day)
+            self.clock.call_at(at, self.power_cut, self.rng.uniform(60, 400))
+
+    def run(self, days=7):
+        """Fast-forward days of simulated time; returns a SimulationReport"""
+        started = time.perf_counter()
+        end = self.start + days * 86400
+        self.clock.run_until(end)
+        wall = time.perf_counter() - started
+        self.engine.stop()
+        missed = self.missed + sorted((alarm_id, due) for alarm_id, due in self.scheduled.items() if due <= end)
+        late = [fire for fire in self.fires if fire[2] - fire[1] > LATE_TOLERANCE]
+        return SimulationReport(
+            days, wall, self.commands, self.fires, late, missed, self.unexpected, len(self.speech.messages)
+        )
+
+
+def simulate_week(days=7, seed=1, power_cuts=1):
+    """Run the standard scenario against a throwaway journal"""
+    with tempfile.TemporaryDirectory() as tmp:
+        simulation = Simulation(seed=seed, alarms_file=os.path.join(tmp, "alarms.journal"))
+        simulation.boot()
+        simulation.plan_week(days, power_cuts=power_cuts)
+        return simulation.run(days)
+
+
+def print_report(report):
+    print(f"Simulated {report.simulated_days} days in {report.wall_seconds:.2f} s: "
+          f"{report.commands} commands, {len(report.fires)} fires, {report.spoken} messages spoken")
+    print(f"Late: {len(report.late)}, missed: {len(report.missed)}, unexpected: {len(report.unexpected)}")
+    for alarm_id, due, fired_at in report.late:
+        print(f"  late  #{alarm_id} due {datetime.datetime.fromtimestamp(due):%a %H:%M:%S} "
+              f"by {fired_at - due:.0f} s")
+    for alarm_id, due in report.missed:
+        print(f"  missed #{alarm_id} due {datetime.datetime.fromtimestamp(due):%a %H:%M:%S}")
+    for alarm_id, due, fired_at in report.unexpected:
+        print(f"  unexpected #{alarm_id} due {datetime.datetime.fromtimestamp(due):%a %H:%M:%S}")
+
+
+if __name__ == "__main__":
+    print_report(simulate_week(int(sys.argv[1]) if len(sys.argv) > 1 else 7))
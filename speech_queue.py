@@ -0,0 +1,170 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# Lower numbers speak first; an alarm cuts off any chatter already playing
+PRIORITY_ALARM = 0
+PRIORITY_NORMAL = 1
+
+
+class SpeechQueue:
+    """Single owner of the TTS engine, speaking queued messages by priority
+
+    Every utterance goes through one worker thread, so the pyttsx3 engine
+    is never driven from two threads at once. Alarm announcements jump the
+    queue and interrupt lower-priority speech; a message whose text is
+    already queued is dropped, and a message with a key replaces the queued
+    one with the same key. Fixed phrases are rendered to WAV once and
+    played straight from memory; a message that starts with a cached phrase
+    plays it while only the remainder is synthesized.
+    """
+
+    def __init__(self, engine, phrases=(), cache_dir=None, load_sound=None):
+        self.engine = engine
+        self.phrases = sorted(phrases, key=len, reverse=True)
+        self.cache_dir = cache_dir
+        self.load_sound = load_sound
+        self.sounds = {}
+        self.spoken = 0
+        self.coalesced = 0
+        self._heap = []
+        self._by_text = {}
+        self._by_key = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._current_priority = None
+        self._interrupt = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the speech worker; cached phrases are rendered first"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._interrupt.set()
+
+    def speak(self, text, priority=PRIORITY_NORMAL, key=None):
+        """Queue a message; returns False if it was coalesced into a queued one"""
+        with self._cond:
+            queued = self._by_text.get(text)
+            if queued is not None and queued[0] <= priority:
+                self.coalesced += 1
+                return False
+            if queued is not None:
+                self._drop(queued)
+            if key is not None and key in self._by_key:
+                self.coalesced += 1
+                self._drop(self._by_key[key])
+            entry = [priority, next(self._counter), text, key, True, time.perf_counter()]
+            heapq.heappush(self._heap, entry)
+            self._by_text[text] = entry
+            if key is not None:
+                self._by_key[key] = entry
+            if self._current_priority is not None and priority < self._current_priority:
+                self._interrupt.set()
+                self._stop_engine()
+            self._cond.notify()
+        return True
+
+    def pending(self):
+        with self._cond:
+            return len(self._by_text)
+
+    def _drop(self, entry):
+        entry[4] = False
+        self._by_text.pop(entry[2], None)
+        if entry[3] is not None:
+            self._by_key.pop(entry[3], None)
+
+    def _next(self):
+        with self._cond:
+            while self._running:
+                while self._heap and not self._heap[0][4]:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    entry = heapq.heappop(self._heap)
+                    self._drop(entry)
+                    self._current_priority = entry[0]
+                    self._interrupt.clear()
+                    metrics.observe("tts_start", time.perf_counter() - entry[5], priority=entry[0])
+                    return entry[2]
+                self._cond.wait()
+            return None
+
+    def _run(self):
+        self._render_cache()
+        while True:
+            text = self._next()
+            if text is None:
+                return
+            started = time.perf_counter()
+            try:
+                self._say(text)
+                self.spoken += 1
+                metrics.observe("tts_speak", time.perf_counter() - started, chars=len(text))
+            except Exception:
+                log.exception("TTS Error")
+            with self._cond:
+                self._current_priority = None
+
+    def _say(self, text):
+        log.info("TTS: %s", text)
+        for phrase in self.phrases:
+            sound = self.sounds.get(phrase)
+            if sound is not None and text.startswith(phrase):
+                self._play(sound)
+                text = text[len(phrase):].strip()
+                break
+        if text and not self._interrupt.is_set():
+            self.engine.say(text)
+            self.engine.runAndWait()
+        log.info("TTS completed")
+
+    def _play(self, sound):
+        channel = sound.play()
+        deadline = time.monotonic() + sound.get_length()
+        while time.monotonic() < deadline:
+            if self._interrupt.wait(0.01):
+                if channel is not None:
+                    channel.stop()
+                return
+
+    def _stop_engine(self):
+        try:
+            self.engine.stop()
+        except Exception as e:
+            log.warning("TTS stop error: %s", e)
+
+    def _render_cache(self):
+        """Render each fixed phrase to a WAV (once per voice setting) and load it"""
+        if not self.cache_dir or not self.load_sound or not self.phrases:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        settings = f"{self.engine.getProperty('voice')}|{self.engine.getProperty('rate')}"
+        for phrase in self.phrases:
+            digest = hashlib.sha1(f"{settings}|{phrase}".encode('utf-8')).hexdigest()[:16]
+            path = os.path.join(self.cache_dir, f"{digest}.wav")
+            try:
+                if not os.path.exists(path):
+                    self.engine.save_to_file(phrase, path)
+                    self.engine.runAndWait()
+                self.sounds[phrase] = self.load_sound(path)
+            except Exception as e:
+                log.warning("Could not pre-render %r: %s", phrase, e)
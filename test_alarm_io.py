@@ -0,0 +1,132 @@
+import csv
+import io
+import os
+import tempfile
+import threading
+import time
+
+from alarm_daemon import EventLoop
+from alarm_engine import QUEUED_IMPORT_BATCH_SIZE, AlarmEngine
+from alarm_io import export_file, import_file, import_file_in_background, read_csv, read_ical
+from recurrence import compile_rule
+
+CSV = """Time,Label,Repeat,Date
+7:30 am,Gym,weekdays,
+19:00,Bins,"mon,thu",
+8 pm,Dinner,,2099-01-02
+25:00,Broken,,
+6:15 AM,Bad repeat,someday,
+9:00 am,Long gone,,2001-01-01
+"""
+
+ICS = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+DTSTART:20990105T063000
+RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR
+SUMMARY:Swim\\, then work
+END:VEVENT
+BEGIN:VEVENT
+DTSTART:20990106T120000Z
+SUMMARY:Lunch call with a very long title that an exporter has folded onto
+  a second line
+END:VEVENT
+BEGIN:VEVENT
+DTSTART;VALUE=DATE:20990107
+SUMMARY:All day
+END:VEVENT
+BEGIN:VEVENT
+DTSTART:20990108T090000
+RRULE:FREQ=MONTHLY
+SUMMARY:Monthly
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def schedule(alarms):
+    return [(a.fire_at, a.label, a.rule and compile_rule(a.rule).weekdays) for a in alarms]
+
+
+def test_alarm_io():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine(EventLoop().call_soon, os.path.join(tmp, "alarms.journal"))
+        resets = []
+        engine.on("alarms_reset", resets.append)
+        engine.on("alarm_added", lambda alarm: resets.append("per-alarm event"))
+
+        errors = []
+        imported, rejected = engine.import_changes(read_csv(io.StringIO(CSV), errors), batch_size=2)
+        errors += rejected
+        assert imported == 3, imported
+        assert [error.split(":")[0] for error in errors] == ["line 5", "line 6", "line 7"], errors
+        assert len(resets) == 1
+        labels = {alarm.label: alarm for alarm in engine.alarms}
+        assert labels["Gym"].rule == "30 7 * * 1-5" and labels["Bins"].rule == "0 19 * * mon,thu"
+        assert labels["Dinner"].time == "08:00 PM" and labels["Dinner"].rule is None
+
+        errors = []
+        imported, _ = engine.import_changes(read_ical(io.StringIO(ICS), errors))
+        assert imported == 2 and len(errors) == 2, errors
+        labels = {alarm.label: alarm for alarm in engine.alarms}
+        assert labels["Swim, then work"].rule == "30 6 * * mon,wed,fri"
+        assert "folded onto a second line" in "".join(labels)
+
+        # What is exported reads back the same, in either format
+        for name in ("alarms.csv", "alarms.ics"):
+            path = os.path.join(tmp, name)
+            assert export_file(engine.alarms, path) == 5
+            copy = AlarmEngine(EventLoop().call_soon, os.path.join(tmp, name + ".journal"))
+            imported, errors = import_file(copy, path)
+            assert imported == 5 and not errors, errors
+            assert sorted(schedule(copy.alarms)) == sorted(schedule(engine.alarms))
+            copy.stop()
+        engine.stop()
+
+        # A large import in the background leaves the engine's thread free between batches
+        path = os.path.join(tmp, "big.csv")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("time,label\n25:00,Broken\n")
+            f.writelines(f"{i % 12 + 1}:{i % 60:02d} pm,Alarm {i}\n" for i in range(20000))
+        loop = EventLoop()
+        threading.Thread(target=loop.run, daemon=True).start()
+        engine = AlarmEngine(loop.call_soon, os.path.join(tmp, "big.journal"))
+        resets = []
+        engine.on("alarms_reset", resets.append)
+        done = threading.Event()
+        outcome = []
+        worst = 0.0
+        import_file_in_background(engine, path, lambda *result: (outcome.append(result), done.set()))
+        while not done.is_set():
+            answered = threading.Event()
+            asked = time.perf_counter()
+            loop.call_soon(answered.set)
+            answered.wait(10)
+            worst = max(worst, time.perf_counter() - asked)
+            time.sleep(0.01)
+        imported, errors, failure = outcome[0]
+        assert imported == 20000 and len(errors) == 1 and failure is None
+        assert len(resets) == 1 and len(engine.alarms) == 20000
+        print(f"Background import of 20000 rows: engine thread answered within {worst * 1000:.0f} ms")
+        assert worst < 0.25
+
+        # A file the csv module gives up on part way still ends the import and lists what got in
+        path = os.path.join(tmp, "oversized.csv")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("time,label\n")
+            f.writelines(f"7:{i % 60:02d} am,Before {i}\n" for i in range(QUEUED_IMPORT_BATCH_SIZE))
+            f.write(f"8:00 am,{'x' * (csv.field_size_limit() + 1)}\n9:00 am,After\n")
+        done.clear()
+        outcome.clear()
+        resets.clear()
+        import_file_in_background(engine, path, lambda *result: (outcome.append(result), done.set()))
+        assert done.wait(10)
+        imported, errors, failure = outcome[0]
+        assert imported == QUEUED_IMPORT_BATCH_SIZE and isinstance(failure, csv.Error), (imported, failure)
+        assert len(resets) == 1 and "Before 0" in [alarm.label for alarm in resets[0]]
+        loop.stop()
+        engine.stop()
+    print("✅ Alarm import/export test passed!")
+
+
+if __name__ == "__main__":
+    test_alarm_io()
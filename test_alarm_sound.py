@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+# Headless: pygame's dummy driver mixes into nowhere but keeps real channel timing
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from alarm_sound import AlarmSoundPlayer
+from scheduler import AlarmScheduler
+
+
+def test_alarm_sound(rounds=10, channels=4):
+    pygame.mixer.init()
+    player = AlarmSoundPlayer(channels=channels, ramp_seconds=1.0)
+
+    # Scheduler fire to the tone's first buffer being queued on a channel
+    latencies = []
+    fired = threading.Semaphore(0)
+
+    def on_fire(key, fire_at):
+        player.start(key)
+        if player.ringing[key][0].get_busy():
+            latencies.append(time.time() - fire_at)
+        fired.release()
+
+    scheduler = AlarmScheduler(on_fire)
+    scheduler.start()
+    for round_number in range(rounds):
+        scheduler.schedule(round_number, time.time() + 0.05)
+        fired.acquire()
+        player.stop_all()
+    scheduler.stop()
+    latencies.sort()
+    print(f"Trigger to playback: median {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+    assert len(latencies) == rounds
+    assert latencies[len(latencies) // 2] < 0.02 and latencies[-1] < 0.1
+
+    # Each alarm gets its own channel until they run out, then shares the oldest
+    for alarm_id in range(channels + 2):
+        player.start(alarm_id)
+        time.sleep(0.01)
+    own = [player.ringing[alarm_id][0] for alarm_id in range(channels)]
+    assert len(set(own)) == channels and all(channel.get_busy() for channel in own)
+    assert player.ringing[channels][0] is own[0] and player.ringing[channels + 1][0] is own[0]
+    # A shared channel keeps ringing until every alarm on it is stopped
+    player.stop(0)
+    player.stop(channels)
+    assert own[0].get_busy()
+    player.stop(channels + 1)
+    time.sleep(0.4)
+    assert not own[0].get_busy() and own[1].get_busy()
+    player.stop_all()
+
+    # A tone that ran out on its own frees its channel for the next alarm, which then stops normally
+    player.max_seconds = 1.0
+    player.start("expired")
+    time.sleep(1.2)
+    player.start("next")
+    assert "expired" not in player.ringing
+    player.stop("next")
+    time.sleep(0.4)
+    assert not any(channel.get_busy() for channel in player.channels)
+    pygame.mixer.quit()
+    print("✅ Alarm sound test passed!")
+
+
+if __name__ == "__main__":
+    test_alarm_sound()
@@ -0,0 +1,53 @@
+import random
+import time
+import tracemalloc
+
+from alarm_store import AlarmStore
+
+
+def test_alarm_store(count=100000, lookups=10000):
+    base = int(time.time())
+    labels = [f"label {i}" for i in range(100)]
+    tracemalloc.start()
+    store = AlarmStore()
+    for i in range(count):
+        store.add(base + i * 7, labels[i % len(labels)])
+    store.by_minute(0)
+    store.by_label("")
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bytes_per_alarm = memory / count
+
+    rng = random.Random(42)
+    ids = [rng.randint(1, count) for _ in range(lookups)]
+    start = time.perf_counter()
+    for alarm_id in ids:
+        store.get(alarm_id)
+        store.by_minute((base + alarm_id * 7) // 60)
+    lookup_us = (time.perf_counter() - start) / lookups * 1e6
+    start = time.perf_counter()
+    for alarm_id in ids:
+        store.remove(alarm_id)
+        store.next_alarm()
+    remove_us = (time.perf_counter() - start) / lookups * 1e6
+    print(f"{count} alarms: {bytes_per_alarm:.0f} bytes each, lookup {lookup_us:.1f} us, "
+          f"remove + next alarm {remove_us:.1f} us")
+    assert bytes_per_alarm < 600
+    assert lookup_us < 50 and remove_us < 50
+    assert store.next_alarm() is min(store, key=lambda alarm: alarm.fire_at)
+
+    # Removed and moved-on alarms do not pile up in the next-alarm heap
+    store = AlarmStore()
+    daily = store.add(base, "Daily", rule="0 7 * * *")
+    for i in range(10000):
+        store.advance(daily.id, base + (i + 1) * 86400)
+        store.remove(store.add(base + i, f"Brief {i}").id)
+    assert len(store) == 1 and len(store._heap) < 2 * 1024 + 2
+    assert store.next_alarm() is daily
+    store.deactivate(daily.id)
+    assert store.next_alarm() is None
+    print("✅ Alarm store test passed!")
+
+
+if __name__ == "__main__":
+    test_alarm_store()
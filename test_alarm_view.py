@@ -0,0 +1,82 @@
+import time
+import tkinter as tk
+
+import pytest
+
+from alarm_list_view import AlarmListView, format_alarm_row
+from alarm_store import AlarmStore
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return (time.perf_counter() - start) * 1000
+
+
+def test_alarm_view(count=50000, changes=200):
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        # Reported as skipped, not passed; run under xvfb-run to measure it headless
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    listbox = tk.Listbox(root, height=20)
+    scrollbar = tk.Scrollbar(root)
+    view = AlarmListView(listbox, scrollbar)
+    store = AlarmStore()
+    base = time.time() + 3600
+    for i in range(count):
+        store.add(base + i * 60, f"Alarm {i}")
+
+    # The old update_alarms_display: clear and re-insert every row
+    def rebuild():
+        listbox.delete(0, tk.END)
+        for alarm in store:
+            listbox.insert(tk.END, format_alarm_row(alarm))
+    rebuild_ms = timed(rebuild)
+    listbox.delete(0, tk.END)
+
+    reset_ms = timed(lambda: (view.reset(store), view.render()))
+    assert listbox.size() == 20
+
+    add_ms = []
+    for i in range(changes):
+        alarm = store.add(base - i, f"New {i}")
+        add_ms.append(timed(lambda: (view.set(alarm), root.update_idletasks())))
+    remove_ms = []
+    for alarm_id in list(view.ids[:changes]):
+        store.remove(alarm_id)
+        remove_ms.append(timed(lambda: (view.remove(alarm_id), root.update_idletasks())))
+    scroll_ms = [timed(lambda: view.on_scroll("moveto", fraction / 100)) for fraction in range(100)]
+
+    # The selection follows the alarm, not the row, when rows above it go away
+    view.on_scroll("moveto", 0.5)
+    listbox.selection_set(5)
+    view.on_select()
+    chosen = view.selected_id()
+    view.remove(view.ids[view.top])
+    view.render()
+    assert view.selected_id() == chosen
+    assert listbox.curselection() == (4,)
+    assert view.texts[chosen] == listbox.get(4)
+
+    # A burst of changes renders once
+    before = view.renders
+    for i in range(100):
+        view.set(store.add(base + i, f"Burst {i}"))
+    root.update_idletasks()
+    assert view.renders == before + 1
+
+    root.destroy()
+    print(f"Full rebuild of {count} rows: {rebuild_ms:.1f} ms, reset: {reset_ms:.1f} ms")
+    print(f"Per change: add {max(add_ms):.2f} ms max, remove {max(remove_ms):.2f} ms max, "
+          f"scroll {max(scroll_ms):.2f} ms max")
+    assert max(add_ms) < 20 and max(remove_ms) < 20 and max(scroll_ms) < 20
+    print("✅ Alarm list view test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_alarm_view()
+    except pytest.skip.Exception as e:
+        print(f"Skipping alarm view test, {e}")
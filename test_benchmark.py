@@ -0,0 +1,61 @@
+from benchmark import direction, find_regressions
+
+
+def test_direction():
+    assert direction("parse_per_s") == 1
+    assert direction("startup_ms") == direction("p95_latency_s") == direction("heap_kb") == -1
+    # CPU seconds per second is a cost, not a throughput
+    assert direction("idle_cpu_per_s") == -1
+    # Settings and the legacy reference are not judged
+    assert direction("legacy_parse_ms") == direction("workers") == 0
+
+
+def test_find_regressions():
+    baseline = {"parse": {"parse_per_s": 1000.0, "startup_ms": 8.0, "workers": 4}}
+
+    # Higher is better: a drop past the tolerance regresses, a rise never does
+    assert find_regressions({"parse": {"parse_per_s": 700.0, "startup_ms": 8.0, "workers": 4}}, baseline, 0.25) \
+        == ["parse.parse_per_s: 1000.000 -> 700.000 (-30%)"]
+    assert not find_regressions({"parse": {"parse_per_s": 5000.0, "startup_ms": 8.0, "workers": 4}}, baseline, 0.25)
+
+    # Lower is better: the same the other way round
+    assert find_regressions({"parse": {"parse_per_s": 1000.0, "startup_ms": 11.0, "workers": 4}}, baseline, 0.25) \
+        == ["parse.startup_ms: 8.000 -> 11.000 (-38%)"]
+    assert not find_regressions({"parse": {"parse_per_s": 1000.0, "startup_ms": 1.0, "workers": 4}}, baseline, 0.25)
+
+    # Exactly at the tolerance passes; just past it fails
+    assert not find_regressions({"parse": {"parse_per_s": 750.0, "startup_ms": 10.0, "workers": 4}}, baseline, 0.25)
+    assert len(find_regressions({"parse": {"parse_per_s": 749.9, "startup_ms": 10.001, "workers": 4}},
+                                baseline, 0.25)) == 2
+
+    # Settings may change freely
+    assert not find_regressions({"parse": {"parse_per_s": 1000.0, "startup_ms": 8.0, "workers": 1}}, baseline, 0.25)
+
+    # A key the baseline has must still be reported; new keys are fine
+    assert find_regressions({"parse": {"parse_per_s": 1000.0, "workers": 4, "new_ms": 1.0}}, baseline, 0.25) \
+        == ["parse.startup_ms: missing"]
+
+
+def test_find_regression_outcomes():
+    baseline = {
+        "week": {"fires": 10, "late": 0, "in_order": True},
+        "io": {"imported": 500},
+    }
+    results = {"week": {"fires": 9, "late": 1, "in_order": False}, "io": {"imported": 500}}
+    assert find_regressions(results, baseline, 0.25) == [
+        "week.fires: 10 -> 9", "week.late: 0 -> 1", "week.in_order: True -> False",
+    ]
+    # More successes and fewer failures are improvements
+    assert not find_regressions({"week": {"fires": 11, "late": 0, "in_order": True}, "io": {"imported": 600}},
+                                baseline, 0.25)
+
+    # A benchmark that errors or did not run fails; one left out on purpose does not
+    assert find_regressions({"week": {"error": "boom"}}, baseline, 0.25) == ["week: failed: boom", "io: not run"]
+    assert not find_regressions({"io": {"imported": 500}}, baseline, 0.25, names=["io"])
+
+
+if __name__ == "__main__":
+    test_direction()
+    test_find_regressions()
+    test_find_regression_outcomes()
+    print("✅ Benchmark comparison test passed!")
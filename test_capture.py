@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import time
+
+import speech_recognition as sr
+
+from audio_capture import ContinuousCapture
+from fixtures import write_test_wav
+
+
+def capture_wav(path):
+    """Run continuous capture over a WAV file standing in for the mic"""
+    with sr.AudioFile(path) as source:
+        capture = ContinuousCapture(source)
+        start = time.perf_counter()
+        utterances = list(capture.utterances())
+        elapsed = time.perf_counter() - start
+    return capture, utterances, elapsed
+
+
+def test_capture():
+    # Two commands separated by pauses, the second starting right after the first ends
+    segments = [(1.0, 0), (0.6, 3000), (1.0, 0), (0.8, 3000), (1.2, 0)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commands.wav")
+        write_test_wav(path, segments)
+        capture, utterances, elapsed = capture_wav(path)
+
+    durations = [len(u.frame_data) / (u.sample_rate * u.sample_width) for u in utterances]
+    print(f"Utterances: {len(utterances)}, durations: {[round(d, 2) for d in durations]}")
+    print(f"Noise floor: {capture.noise_floor:.1f}, processed 4.6s of audio in {elapsed * 1000:.1f} ms")
+
+    assert len(utterances) == 2
+    # Each utterance holds the whole tone plus the pre-roll and trailing pause
+    assert durations[0] >= 0.6 and durations[1] >= 0.8
+    assert 30 < capture.noise_floor < 120
+    print("✅ Continuous capture test passed!")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _, found, _ = capture_wav(sys.argv[1])
+        for index, audio in enumerate(found):
+            print(f"  {index}: {len(audio.frame_data) / (audio.sample_rate * audio.sample_width):.2f}s")
+    else:
+        test_capture()
@@ -0,0 +1,64 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+
+from alarm_daemon import EventLoop
+from alarm_engine import AlarmEngine
+from control_api import ControlServer
+
+
+def request(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_control_api(batch_size=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        loop = EventLoop()
+        engine = AlarmEngine(loop.call_soon, os.path.join(tmp, "alarms.journal"))
+        resets = []
+        engine.on("alarms_reset", resets.append)
+        threading.Thread(target=loop.run, daemon=True).start()
+        server = ControlServer(engine)
+        port = server.start()
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+
+        status, alarm = request(connection, "POST", "/alarms", {"time": "07:30 AM", "label": "Gym", "repeat": "1-5"})
+        assert status == 201 and alarm["label"] == "Gym" and alarm["repeat"] == "30 7 * * 1-5"
+        assert request(connection, "POST", "/alarms", {"time": "25:00"})[0] == 400
+        assert request(connection, "DELETE", "/alarms/999")[0] == 404
+        assert request(connection, "POST", f"/alarms/{alarm['id']}/snooze")[0] == 404
+
+        # One bad change and nothing in the batch is applied
+        changes = [{"op": "add", "fire_at": time.time() + 3600 + i, "label": f"Batch {i}"} for i in range(batch_size)]
+        status, error = request(connection, "POST", "/alarms/batch", {"changes": changes + [{"op": "delete", "id": 999}]})
+        assert status == 404 and "change 5000" in error["error"]
+        assert len(request(connection, "GET", "/alarms")[1]["alarms"]) == 1
+
+        start = time.perf_counter()
+        status, result = request(connection, "POST", "/alarms/batch", {"changes": changes})
+        batch_ms = (time.perf_counter() - start) * 1000
+        assert status == 200 and len(result["results"]) == batch_size
+        assert len(resets) == 1 and len(engine.scheduler) == batch_size + 1
+
+        deletes = [{"op": "delete", "id": alarm["id"]} for alarm in result["results"]]
+        assert request(connection, "POST", "/alarms/batch", {"changes": deletes})[0] == 200
+        assert request(connection, "DELETE", f"/alarms/{alarm['id']}") == (200, {"deleted": alarm["id"]})
+        assert request(connection, "GET", "/alarms") == (200, {"alarms": []})
+        assert len(resets) == 2
+
+        connection.close()
+        server.stop()
+        loop.stop()
+        engine.stop()
+    print(f"Batch of {batch_size} alarms applied in {batch_ms:.0f} ms")
+    print("✅ Control API test passed!")
+
+
+if __name__ == "__main__":
+    test_control_api()
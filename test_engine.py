@@ -0,0 +1,188 @@
+import audioop
+import os
+import tempfile
+import time
+
+import speech_recognition as sr
+
+from alarm_engine import AlarmEngine
+from clock import SimulatedClock
+from fixtures import write_test_wav
+from recognition_pipeline import RecognitionPipeline
+from recognizers import FakeBackend
+from simulation import RecordingSpeech, SilentSound
+from wake_word import FakeSpotter
+
+
+class BrokenSound:
+    """An alarm sound player on a box with no audio device"""
+
+    def start(self, alarm_id):
+        raise RuntimeError("dsp: No such audio device")
+
+    def stop(self, alarm_id):
+        raise RuntimeError("dsp: No such audio device")
+
+    def stop_all(self):
+        pass
+
+
+class BrokenSpeech:
+    """A speech queue without eSpeak"""
+
+    def speak(self, text, priority=None, key=None):
+        raise RuntimeError("eSpeak not installed")
+
+    def stop(self):
+        pass
+
+
+class RecordingTTS:
+    """A pyttsx3 engine that records what it was asked to say"""
+
+    def __init__(self):
+        self.said = []
+
+    def getProperty(self, name):
+        return "test"
+
+    def say(self, text):
+        self.said.append(text)
+
+    def runAndWait(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class NoMixerEngine(AlarmEngine):
+    """An engine whose pygame mixer cannot open an audio device"""
+
+    mixer_attempts = 0
+
+    def _init_mixer(self):
+        self.mixer_attempts += 1
+        raise RuntimeError("No available audio device")
+
+
+def test_alarm_without_sound_or_speech():
+    start = 1_800_000_000.0
+    clock = SimulatedClock(start)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine(
+            clock.call_soon, os.path.join(tmp, "alarms.journal"), clock=clock,
+            components={"alarm_sound": BrokenSound(), "speech": BrokenSpeech()},
+        )
+        fired = []
+        engine.on("alarm_fired", fired.append)
+        engine.start()
+        alarm = engine.add_alarm("", "Wake up", fire_at=start + 60)
+        clock.run_until(start + 120)
+
+        # Still announced to the front end, evicted and ringing
+        assert [a.label for a in fired] == ["Wake up"]
+        assert engine.alarms.get(alarm.id) is None and alarm.id in engine.ringing
+
+        # Snoozing still sets the new alarm
+        snoozed = engine.snooze_alarm(fired[0], start + 420)
+        assert alarm.id not in engine.ringing
+        assert engine.alarms.get(snoozed.id).fire_at == start + 420
+
+        # Spoken commands still run
+        engine.process_command("set alarm for 7 am gym")
+        assert any(a.label == "Gym" for a in engine.alarms)
+        engine.stop()
+    print("✅ Degraded alarm engine test passed!")
+
+
+def test_speech_without_mixer():
+    start = 1_800_000_000.0
+    clock = SimulatedClock(start)
+    tts = RecordingTTS()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = NoMixerEngine(clock.call_soon, os.path.join(tmp, "alarms.journal"), clock=clock,
+                               components={"tts": tts})
+        engine.start()
+        engine.speak("Alarm set for 7 AM")
+        engine.add_alarm("", "Wake up", fire_at=start + 60)
+        engine.add_alarm("", "Get up", fire_at=start + 120)
+        clock.run_until(start + 180)
+        deadline = time.monotonic() + 5
+        while engine.speech.spoken < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.stop()
+
+    # Every phrase is synthesized instead of played from the cache, and the mixer is tried once
+    assert tts.said[0] == "Alarm set for 7 AM" and len(tts.said) == 3, tts.said
+    assert engine.mixer_attempts == 1
+    print("✅ Speech without mixer test passed!")
+
+
+def test_removed_while_due():
+    start = 1_800_000_000.0
+    clock = SimulatedClock(start)
+    sound = SilentSound()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine(clock.call_soon, os.path.join(tmp, "alarms.journal"), clock=clock,
+                             components={"alarm_sound": sound, "speech": RecordingSpeech()})
+        fired = []
+        stopped = []
+        engine.on("alarm_fired", fired.append)
+        engine.on("alarm_stopped", stopped.append)
+
+        # The scheduler thread starts the tone, then the alarm is deleted before fire_alarm runs
+        alarm = engine.add_alarm("", "Deleted", fire_at=start + 60)
+        engine.on_alarm_due(alarm.id, alarm.fire_at)
+        assert sound.ringing == {alarm.id}
+        engine.remove_alarm(alarm.id)
+        assert not sound.ringing
+        clock.run_until(start + 120)
+        assert not fired
+
+        # Gone by another route: fire_alarm finds nothing to fire and stops the tone itself
+        alarm = engine.add_alarm("", "Gone", fire_at=start + 180)
+        engine.on_alarm_due(alarm.id, alarm.fire_at)
+        engine.alarms.remove(alarm.id)
+        clock.run_until(start + 240)
+        assert not fired and not sound.ringing
+
+        # Deleting a recurring alarm that is ringing silences it too
+        alarm = engine.add_alarm("07:00 AM", "Daily", repeat="*")
+        engine.on_alarm_due(alarm.id, alarm.fire_at)
+        clock.run_until(clock.time() + 1)
+        assert [a.label for a in fired] == ["Daily"] and sound.ringing == {alarm.id}
+        engine.remove_alarm(alarm.id)
+        assert not sound.ringing and stopped == [alarm.id] and alarm.id not in engine.ringing
+        engine.stop()
+    print("✅ Removed-while-due test passed!")
+
+
+def test_batch_wake_word_gate():
+    # Without the offline model, a supplied spotter gates the batch recognizer
+    backend = FakeBackend()
+    pipeline = RecognitionPipeline(backend, lambda result: None)
+    spotter = FakeSpotter(lambda frame: audioop.rms(frame, 2) > 4000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "room.wav")
+        # Chatter, the wake phrase (loud), a follow-up command, then silence
+        write_test_wav(path, [(0.5, 0), (0.5, 1500), (1.0, 0), (0.5, 8000), (1.0, 0), (0.5, 1500), (1.0, 0)])
+        engine = AlarmEngine(
+            lambda callback, *args: callback(*args), os.path.join(tmp, "alarms.journal"), rooms={"test": None},
+            components={"recognition": pipeline, "wake_spotter": spotter, "speech": BrokenSpeech()},
+        )
+        pipeline.start()
+        with sr.AudioFile(path) as source:
+            engine.capture_room("test", source)
+        pipeline.stop(wait=True)
+        engine.stop()
+    assert engine.wake_gates["test"].utterances == 3
+    assert backend.calls == 2
+    print("✅ Batch wake-word gate test passed!")
+
+
+if __name__ == "__main__":
+    test_alarm_without_sound_or_speech()
+    test_speech_without_mixer()
+    test_removed_while_due()
+    test_batch_wake_word_gate()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from alarm_journal import AlarmJournal
+from alarm_store import AlarmStore
+
+
+def test_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.journal")
+
+        # Every kind of record replays
+        journal = AlarmJournal(path, fsync=False)
+        journal.append(["add", 1, 1000.0, 1, "Gym"])
+        journal.append(["add", 2, 2000.0, 1, "Pills", "0 22 * * *"])
+        journal.append(["add", 3, 3000.0, 1, "Gone"])
+        journal.append(["next", 2, 2500.0])
+        journal.append(["off", 1])
+        journal.append(["del", 3])
+        journal.close()
+        assert AlarmJournal(path).load() == {1: (1000.0, False, "Gym", None), 2: (2500.0, True, "Pills", "0 22 * * *")}
+        journal = AlarmJournal(path, fsync=False)
+        journal.append(["clear"])
+        journal.close()
+        assert AlarmJournal(path).load() == {}
+
+        # A crash mid-write leaves a partial last line: it is dropped, and
+        # what is appended after recovery survives the next restart
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('["add",1,1000.0,1,"a"]\n["add",2,2000.0,1,"tor')
+        journal = AlarmJournal(path, fsync=False)
+        with unittest.TestCase().assertLogs("alarm_journal", "WARNING") as logs:
+            assert journal.load() == {1: (1000.0, True, "a", None)}
+        # The lost record is reported, not silently dropped
+        assert logs.output == ["WARNING:alarm_journal:Dropping torn journal record: '[\"add\",2,2000.0,1,\"tor'"]
+        journal.append(["add", 3, 3000.0, 1, "b"])
+        journal.close()
+        assert AlarmJournal(path).load() == {1: (1000.0, True, "a", None), 3: (3000.0, True, "b", None)}
+
+        # Compaction rewrites the live alarms only, once dead records dominate
+        os.unlink(path)
+        journal = AlarmJournal(path, fsync=False, compact_min=10)
+        store = AlarmStore()
+        for i in range(20):
+            alarm = store.add(1000.0 + i, f"Alarm {i}")
+            journal.append(["add", alarm.id, alarm.fire_at, 1, alarm.label])
+        for alarm in list(store)[:15]:
+            store.remove(alarm.id)
+            journal.append(["del", alarm.id])
+        assert journal.needs_compaction(len(store))
+        journal.compact(store)
+        assert journal.records == 5 and not journal.needs_compaction(len(store))
+        with open(path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 5
+        assert sorted(AlarmJournal(path).load()) == sorted(alarm.id for alarm in store)
+    print("✅ Alarm journal test passed!")
+
+
+if __name__ == "__main__":
+    test_journal()
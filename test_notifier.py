@@ -0,0 +1,74 @@
+import threading
+import time
+import tkinter as tk
+
+import pytest
+
+from alarm_notifier import AlarmNotifier
+from alarm_store import AlarmStore
+from scheduler import AlarmScheduler
+
+
+def test_notifier(count=100, tick_seconds=0.01):
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        # Reported as skipped, not passed; run under xvfb-run to measure it headless
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    snoozed = []
+    dismissed = []
+    notifier = AlarmNotifier(root, lambda alarm, until: snoozed.append((alarm.id, until)), dismissed.append)
+    store = AlarmStore()
+    fire_at = time.time() + 0.5
+    alarms = [store.add(fire_at, f"Alarm {i}") for i in range(count)]
+
+    # The app's path: scheduler thread -> root.after -> notifier on the Tk thread
+    scheduler = AlarmScheduler(lambda key, due: root.after(0, lambda: notifier.notify(store.get(key))))
+    for alarm in alarms:
+        scheduler.schedule(alarm.id, fire_at)
+    scheduler.start()
+
+    # A 10 ms ticker stands in for the clock label; its lateness is the loop's latency
+    lateness = []
+    done = threading.Event()
+
+    def tick(expected):
+        now = time.perf_counter()
+        lateness.append(now - expected)
+        if len(notifier.ringing) == count and notifier.window is not None:
+            done.set()
+        if not done.is_set() or len(lateness) < 100:
+            root.after(int(tick_seconds * 1000), tick, now + tick_seconds)
+        else:
+            root.quit()
+    root.after(0, tick, time.perf_counter())
+    root.after(10000, root.quit)
+    root.mainloop()
+    scheduler.stop()
+
+    assert done.is_set(), "alarms never reached the panel"
+    # All alarms that fired together share one panel
+    assert notifier.listbox.size() == count
+    worst = max(lateness) * 1000
+    print(f"{count} alarms in one panel after {notifier.renders} render(s); worst tick lateness {worst:.1f} ms")
+    assert worst < 250
+
+    before = time.time()
+    notifier.snooze([alarms[0].id, alarms[1].id])
+    assert [alarm_id for alarm_id, _ in snoozed] == [alarms[0].id, alarms[1].id]
+    # An exact absolute time, not a minute-rounded clock string
+    assert all(before + notifier.snooze_seconds <= until <= time.time() + notifier.snooze_seconds
+               for _, until in snoozed)
+    notifier.dismiss_all()
+    root.update()
+    assert len(dismissed) == count - 2 and notifier.window is None
+    root.destroy()
+    print("✅ Notifier test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_notifier()
+    except pytest.skip.Exception as e:
+        print(f"Skipping notifier test, {e}")
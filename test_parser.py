@@ -0,0 +1,58 @@
+import sys
+
+from command_parser import parse_command
+from fixtures import legacy_parse, make_corpus
+
+
+def compare(corpus, current_hour=9):
+    """Commands where parse_command disagrees with the legacy handler"""
+    mismatches = []
+    for command in corpus:
+        expected = legacy_parse(command, current_hour)
+        parsed = parse_command(command, current_hour)
+        label = " ".join(parsed.label.split()) if parsed.label else parsed.label
+        got = (parsed.intent, parsed.hour, parsed.minute, parsed.ampm, label, parsed.error)
+        if expected[4]:
+            # The old label kept the gaps left where words were cut out
+            expected = expected[:4] + (" ".join(expected[4].split()),) + expected[5:]
+        if got != expected:
+            mismatches.append((command, expected, got))
+    return mismatches
+
+
+def test_parser():
+    corpus = make_corpus(5000)
+    mismatches = compare(corpus) + compare(corpus, current_hour=15)
+    for command, expected, got in mismatches[:10]:
+        print(f"  {command!r}: legacy {expected}, parser {got}")
+    print(f"{len(corpus)} transcripts, {len(mismatches)} mismatches")
+    assert not mismatches
+
+    # Forms the old regexes could not understand
+    cases = {
+        "set alarm for seven thirty a m": (7, 30, "AM"),
+        "set alarm for twelve oh five p.m. lunch": (12, 5, "PM"),
+        "set alarm for eight o'clock pm": (8, 0, "PM"),
+        "set alarm for 7 30 am": (7, 30, "AM"),
+    }
+    for command, expected in cases.items():
+        parsed = parse_command(command, 9)
+        assert (parsed.hour, parsed.minute, parsed.ampm) == expected, (command, parsed)
+    parsed = parse_command("set alarm in 20 minutes take pills", 9)
+    assert parsed.delay_minutes == 20 and parsed.label == "Take Pills"
+    assert parse_command("set alarm in half an hour", 9).delay_minutes == 30
+    # The old handler left an upper-case "7 PM" in the label
+    assert parse_command("set alarm for 7 PM gym", 9).label == "Gym"
+    parsed = parse_command("set alarm every weekday at 6:30 am gym", 9)
+    assert (parsed.repeat, parsed.label) == ("1-5", "Gym")
+    assert parse_command("set alarm for mondays and fridays at 7 pm", 9).repeat == "mon,fri"
+    # A number word in the label is not a time
+    assert parse_command("set alarm for 7 am take one pill", 9).label == "Take One Pill"
+    print("✅ Command parser test passed!")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(parse_command(" ".join(sys.argv[1:])))
+    else:
+        test_parser()
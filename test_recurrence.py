@@ -0,0 +1,114 @@
+import datetime
+import os
+import tempfile
+import time
+
+import pytest
+
+from alarm_engine import AlarmEngine
+from clock import SimulatedClock
+from recurrence import Recurrence, _field, describe_rule, make_rule, next_fire
+from simulation import RecordingSpeech, SilentSound
+
+
+@pytest.fixture(autouse=True)
+def london_time(monkeypatch):
+    # Fixed dates below, and a zone whose clocks go back (2026-10-25 02:00 BST -> 01:00 GMT)
+    monkeypatch.setenv("TZ", "Europe/London")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def at(*args, fold=0):
+    return int(datetime.datetime(*args, fold=fold).timestamp())
+
+
+def test_fields():
+    assert _field("*/15", 0, 59) == {0, 15, 30, 45}
+    assert _field("1-5", 0, 7) == {1, 2, 3, 4, 5}
+    assert _field("50/5", 0, 59) == {50, 55}
+    assert _field("1-10/3,20", 1, 31) == {1, 4, 7, 10, 20}
+    assert _field("mon,wed", 0, 7, {"mon": 1, "wed": 3}) == {1, 3}
+    assert _field("Monday-Wed", 0, 7, {"mon": 1, "wed": 3}) == {1, 2, 3}
+    for bad in ("60", "5-1", "*/0", "mon"):
+        try:
+            _field(bad, 0, 59)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} should not parse")
+
+    # Sunday is both 0 and 7; stored as Python's Monday = 0 weekdays
+    assert Recurrence("0 7 * * 0").weekdays == Recurrence("0 7 * * 7").weekdays == Recurrence("0 7 * * sun").weekdays == {6}
+    assert make_rule(6, 30, "weekdays") == "30 6 * * 1-5"
+
+    assert describe_rule("0 7 * * *") == "daily"
+    assert describe_rule("0 7 * * 1-5") == "weekdays"
+    assert describe_rule("0 7 * * 0,6") == "weekends"
+    assert describe_rule("0 7 * * mon,wed") == "Mon, Wed"
+    assert describe_rule("0 7 13 * *") == "0 7 13 * *"
+
+
+def test_next_fire():
+    # Weekdays: Friday evening moves on to Monday morning
+    assert next_fire("30 6 * * 1-5", at(2026, 1, 2, 20, 0)) == at(2026, 1, 5, 6, 30)
+    # Strictly after: an alarm at exactly its own time moves to the next one
+    assert next_fire("0 7,19 * * *", at(2026, 1, 5, 7, 0)) == at(2026, 1, 5, 19, 0)
+
+    # With both day fields restricted a date matches either: Fridays or the 13th
+    fires = []
+    after = at(2026, 1, 1, 12, 0)
+    for _ in range(4):
+        after = next_fire("0 7 13 * fri", after)
+        fires.append(datetime.datetime.fromtimestamp(after).date().day)
+    assert fires == [2, 9, 13, 16]
+
+    # Clocks going back repeat 01:00-02:00; from the second 01:10, 01:30 is the second one too
+    second_pass = at(2026, 10, 25, 1, 10, fold=1)
+    assert next_fire("30 1 * * *", second_pass) == second_pass + 20 * 60
+    # Clocks going forward skip 01:00-02:00 (2026-03-29); the alarm still fires that morning
+    skipped = next_fire("30 1 * * *", at(2026, 3, 29, 0, 0))
+    assert at(2026, 3, 29, 0, 0) < skipped < at(2026, 3, 29, 3, 0)
+
+
+def test_restore_skips_missed():
+    start = at(2026, 1, 5, 6, 0)
+    clock = SimulatedClock(start)
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = os.path.join(tmp, "alarms.journal")
+
+        def boot():
+            engine = AlarmEngine(clock.call_soon, journal, clock=clock,
+                                 components={"alarm_sound": SilentSound(), "speech": RecordingSpeech()})
+            engine.on("alarm_fired", fired.append)
+            engine.start()
+            return engine
+
+        fired = []
+        engine = boot()
+        alarm = engine.add_alarm("07:00 AM", "Daily", repeat="daily")
+        clock.run_until(start + 3600 * 2)
+        assert [a.label for a in fired] == ["Daily"]
+        engine.stop()
+
+        # Off for three days: the missed mornings do not ring on restart
+        clock.advance_to(at(2026, 1, 8, 12, 0))
+        fired.clear()
+        engine = boot()
+        clock.run_until(clock.time() + 60)
+        assert fired == []
+        assert engine.alarms.get(alarm.id).fire_at == at(2026, 1, 9, 7, 0)
+        clock.run_until(at(2026, 1, 9, 8, 0))
+        assert len(fired) == 1
+        engine.stop()
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("TZ", "Europe/London")
+        time.tzset()
+        test_fields()
+        test_next_fire()
+        test_restore_skips_missed()
+    print("✅ Recurrence test passed!")
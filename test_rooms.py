@@ -0,0 +1,120 @@
+import collections
+import os
+import tempfile
+import threading
+import time
+
+import speech_recognition as sr
+
+from alarm_daemon import EventLoop
+from alarm_engine import AlarmEngine
+from fixtures import PacedStream, room_segments, write_test_wav
+from recognition_pipeline import RecognitionPipeline
+from recognizers import FakeBackend
+from simulation import RecordingSpeech, SilentSound
+
+
+class PacedAudioFile(sr.AudioFile):
+    """A WAV that, like a microphone, is read in real time and can only be opened once at a time"""
+
+    def __enter__(self):
+        source = super().__enter__()
+        source.stream = PacedStream(source.stream, source.SAMPLE_RATE, time.perf_counter())
+        return source
+
+
+def run_rooms(count, tmp):
+    """Capture count rooms at once through one engine; returns {room: [latency, ...]}"""
+    rooms = {f"room{index}": None for index in range(count)}
+    loop = EventLoop()
+    pipeline = RecognitionPipeline(FakeBackend(delay=0.05), lambda result: engine.on_recognition_result(result),
+                                   max_pending=4 * count)
+    engine = AlarmEngine(
+        loop.call_soon, os.path.join(tmp, f"rooms{count}.journal"), rooms=rooms,
+        components={"recognition": pipeline, "speech": RecordingSpeech(), "alarm_sound": SilentSound()},
+    )
+    heard = collections.defaultdict(list)
+    engine.on("command", lambda command, room: heard[room].append(time.perf_counter()))
+    threading.Thread(target=loop.run, daemon=True).start()
+    pipeline.start()
+
+    ends = {}
+    sources = []
+    for index, room in enumerate(rooms):
+        segments, ends[room] = room_segments(index)
+        path = os.path.join(tmp, f"{room}.wav")
+        write_test_wav(path, segments, seed=index)
+        sources.append((room, sr.AudioFile(path).__enter__()))
+
+    start = time.perf_counter()
+
+    def capture(room, source):
+        source.stream = PacedStream(source.stream, source.SAMPLE_RATE, start)
+        engine.capture_room(room, source)
+
+    threads = [threading.Thread(target=capture, args=source) for source in sources]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pipeline.stop()
+    done = threading.Event()
+    loop.call_soon(done.set)
+    done.wait(5)
+    loop.stop()
+    engine.stop()
+    for _, source in sources:
+        source.__exit__(None, None, None)
+    latencies = {room: [at - start - end for at, end in zip(heard[room], ends[room])] for room in rooms}
+    return latencies, ends
+
+
+def test_rooms():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1, 2, 4, 8):
+            latencies, ends = run_rooms(count, tmp)
+            # Every room heard each of its commands, tagged with that room
+            assert all(len(latencies[room]) == len(ends[room]) for room in ends), latencies
+            worst = max(max(values) for values in latencies.values())
+            results[count] = worst
+            print(f"{count} rooms: worst end-of-speech to command {worst * 1000:.0f} ms")
+
+    # The pause that ends an utterance dominates; more rooms add little on top
+    assert all(worst < 1.5 for worst in results.values())
+    assert results[8] < results[1] + 0.5
+    print("✅ Multi-room capture test passed!")
+
+
+def test_restart_listening():
+    # Stopping before the capture threads are up must still stop them, so the microphones can reopen
+    rooms = {"kitchen": None, "bedroom": None}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "quiet.wav")
+        write_test_wav(path, [(30.0, 0)])
+        errors = []
+        engine = AlarmEngine(
+            lambda callback, *args: callback(*args), os.path.join(tmp, "alarms.journal"), rooms=rooms,
+            components={"recognition": RecognitionPipeline(FakeBackend(), lambda result: None),
+                        "speech": RecordingSpeech(), "alarm_sound": SilentSound()},
+        )
+        engine.microphones = {room: PacedAudioFile(path) for room in rooms}
+        engine.on("status", lambda text: errors.append(text) if "Error" in text else None)
+        for _ in range(20):
+            engine.start_listening()
+            engine.stop_listening()
+        engine.start_listening()
+        time.sleep(0.3)
+        assert sorted(engine.captures) == sorted(rooms)
+        engine.stop_listening()
+        for thread in engine._listen_threads:
+            thread.join(2.0)
+        assert not any(thread.is_alive() for thread in engine._listen_threads)
+        assert not engine.captures and not errors, errors
+        engine.stop()
+    print("✅ Listening restart test passed!")
+
+
+if __name__ == "__main__":
+    test_rooms()
+    test_restart_listening()
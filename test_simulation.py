@@ -0,0 +1,30 @@
+from alarm_engine import MISSED_ALARM_GRACE
+from clock import SimulatedClock
+from simulation import print_report, simulate_week
+
+
+def test_simulation():
+    # Callbacks run in time order and the clock jumps between them
+    clock = SimulatedClock(1000.0)
+    seen = []
+    clock.call_at(1300.0, lambda: seen.append(clock.time()))
+    clock.call_later(100, lambda: seen.append(clock.time()))
+    clock.run_until(2000.0)
+    assert seen == [1100.0, 1300.0] and clock.time() == 2000.0
+
+    # A week of alarms, snoozes and commands: every alarm fires on time
+    report = simulate_week(7, seed=1, power_cuts=0)
+    print_report(report)
+    assert report.fires and not report.late and not report.missed and not report.unexpected
+    assert report.wall_seconds < 10
+
+    # Alarms due during a power cut ring late on restart, never twice
+    report = simulate_week(7, seed=4, power_cuts=6)
+    print_report(report)
+    assert report.late and not report.unexpected
+    assert all(fired_at - due <= MISSED_ALARM_GRACE for _, due, fired_at in report.late)
+    print("✅ Simulation test passed!")
+
+
+if __name__ == "__main__":
+    test_simulation()
@@ -1,8 +1,12 @@
 import speech_recognition as sr
+import sys
 import time
 
-def test_microphone():
+from recognizers import GoogleBackend, VoskBackend
+
+def test_microphone(backend=None):
     r = sr.Recognizer()
+    backend = backend or GoogleBackend(r)
     
     # List available microphones
     print("Available microphones:")
@@ -21,7 +25,7 @@ def test_microphone():
             print("Processing speech...")
             
             # Try to recognize
-            text = r.recognize_google(audio)
+            text = backend.recognize(audio)
             print(f"You said: '{text}'")
             return True
             
@@ -40,4 +44,5 @@ def test_microphone():
 
 if __name__ == "__main__":
     print("Testing microphone and speech recognition...")
-    test_microphone()
\ No newline at end of file
+    # Pass a Vosk model directory to test the offline engine instead of Google
+    test_microphone(VoskBackend(sys.argv[1]) if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+
+from fixtures import write_test_wav
+from transcribe import main, transcribe_all
+
+COMMANDS = {
+    "gym.wav": "set alarm for 7 am gym",
+    "pills.wav": "hey clock set alarm for 10 pm take pills",
+    "weekdays.wav": "set alarm for 6:30 am weekdays",
+    "oven.wav": "set alarm in 20 minutes check the oven",
+    "time.wav": "what time is it",
+    "nonsense.wav": "play some music",
+    "silence.wav": "",
+}
+
+
+def test_transcribe():
+    start = datetime.datetime(2026, 1, 5, 8, 0).timestamp()
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, text in COMMANDS.items():
+            path = os.path.join(tmp, name)
+            write_test_wav(path, [(0.2, 0)])
+            with open(path[:-4] + ".txt", 'w', encoding='utf-8') as f:
+                f.write(text)
+        paths = sorted(os.path.join(tmp, name) for name in COMMANDS)
+        rows = {os.path.basename(row["file"]): row for row in transcribe_all(paths, 2, start, transcripts=True)}
+
+        assert rows["gym.wav"]["intent"] == "set_alarm" and rows["gym.wav"]["label"] == "Gym"
+        assert rows["gym.wav"]["time"] == "07:00 AM" and rows["gym.wav"]["reply"] == "Alarm set for 07:00 AM with label Gym"
+        # The wake phrase is not part of the command
+        assert rows["pills.wav"]["transcript"] == "set alarm for 10 pm take pills"
+        assert rows["weekdays.wav"]["repeat"] == "30 6 * * 1-5"
+        assert rows["oven.wav"]["time"] == "08:20 AM"
+        assert rows["time.wav"]["reply"] == "The current time is 08:00 AM"
+        assert rows["nonsense.wav"]["intent"] == "unknown"
+        assert rows["silence.wav"]["error"] == "not understood"
+
+        # The CLI writes the table and flags outcomes that changed since an earlier run
+        out = os.path.join(tmp, "results.csv")
+        args = [tmp, "--transcripts", "--at", "2026-01-05T08:00", "--workers", "2", "--out", out]
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert main(args) == 0
+            assert main(args + ["--out", os.path.join(tmp, "again.csv"), "--expect", out]) == 0
+            with open(os.path.join(tmp, "gym.txt"), 'w', encoding='utf-8') as f:
+                f.write("set alarm for 8 am gym")
+            assert main(args + ["--out", os.path.join(tmp, "again.csv"), "--expect", out]) == 1
+    print("✅ Batch transcription test passed!")
+
+
+if __name__ == "__main__":
+    test_transcribe()
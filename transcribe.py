@@ -0,0 +1,209 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+
+import speech_recognition as sr
+
+from alarm_engine import VOSK_MODEL_PATH, WAKE_PHRASE, AlarmEngine
+from clock import SimulatedClock
+from command_parser import best_alternative
+from simulation import RecordingSpeech, SilentSound
+
+RESULT_FIELDS = ["file", "transcript", "intent", "time", "label", "repeat", "reply", "error",
+                 "load_ms", "recognize_ms", "command_ms"]
+# Columns compared against an earlier run; the timings are expected to vary
+COMPARED_FIELDS = ["transcript", "intent", "time", "label", "repeat", "reply"]
+
+# One per worker process, built by _init_worker()
+_worker = None
+
+
+class BatchWorker:
+    """Recognize one recording and run it through a private engine
+
+    The engine has its own throwaway journal, a clock frozen at the run's
+    start time (so AM/PM guesses agree across workers) and records what it
+    would have said instead of saying it.
+    """
+
+    def __init__(self, journal, start, transcripts=False):
+        self.start = start
+        self.transcripts = transcripts
+        self.recognizer = sr.Recognizer()
+        self.backend = None
+        if not transcripts:
+            from recognizers import GoogleBackend, VoskBackend
+            if os.path.isdir(VOSK_MODEL_PATH):
+                self.backend = VoskBackend(VOSK_MODEL_PATH)
+            else:
+                self.backend = GoogleBackend(self.recognizer)
+        self.speech = RecordingSpeech()
+        self.engine = AlarmEngine(
+            lambda callback, *args: callback(*args), journal, clock=SimulatedClock(start),
+            components={"speech": self.speech, "alarm_sound": SilentSound()},
+        )
+        self.added = []
+        self.engine.on("alarm_added", self.added.append)
+        self.wake_phrase = re.compile(rf"\b{re.escape(WAKE_PHRASE)}\b") if WAKE_PHRASE else None
+
+    def run(self, path):
+        """A results row for one WAV file"""
+        row = dict.fromkeys(RESULT_FIELDS, "")
+        row["file"] = path
+        started = time.perf_counter()
+        try:
+            if self.transcripts:
+                # Parse-only runs read what was said from FILE.txt next to FILE.wav
+                with open(os.path.splitext(path)[0] + ".txt", encoding='utf-8') as f:
+                    alternatives = [line.strip().lower() for line in f if line.strip()]
+                row["load_ms"] = _ms(started)
+                row["recognize_ms"] = 0.0
+            else:
+                with sr.AudioFile(path) as source:
+                    audio = self.recognizer.record(source)
+                row["load_ms"] = _ms(started)
+                started = time.perf_counter()
+                alternatives = self.backend.recognize_all(audio)
+                row["recognize_ms"] = _ms(started)
+            if not alternatives:
+                raise sr.UnknownValueError()
+        except sr.UnknownValueError:
+            row["error"] = "not understood"
+            return row
+        except (OSError, ValueError, sr.RequestError) as e:
+            row["error"] = str(e)
+            return row
+        if self.wake_phrase:
+            alternatives = [self.wake_phrase.sub("", text).strip() for text in alternatives]
+
+        started = time.perf_counter()
+        command, parsed = best_alternative(alternatives, self.engine.clock.now().hour)
+        row["transcript"] = command or alternatives[0]
+        row["intent"] = parsed.intent
+        if command:
+            self.engine.process_command(command, parsed)
+        row["command_ms"] = _ms(started)
+        if self.added:
+            alarm = self.added[-1]
+            row["time"], row["label"], row["repeat"] = alarm.time, alarm.label, alarm.rule or ""
+        row["reply"] = " | ".join(self.speech.messages)
+        if parsed.error:
+            row["error"] = parsed.error
+        self.reset()
+        return row
+
+    def reset(self):
+        # Each file starts from no alarms, so "show my alarms" answers the same in any worker
+        self.engine.clear_alarms()
+        self.added.clear()
+        self.speech.messages.clear()
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _init_worker(journal_dir, start, transcripts):
+    global _worker
+    journal = os.path.join(journal_dir, f"worker-{os.getpid()}.journal")
+    _worker = BatchWorker(journal, start, transcripts)
+
+
+def _run(path):
+    return _worker.run(path)
+
+
+def find_recordings(directory):
+    """Every .wav under directory, in a stable order"""
+    return sorted(glob.glob(os.path.join(directory, "**", "*.wav"), recursive=True))
+
+
+def transcribe_all(paths, workers=None, start=None, transcripts=False):
+    """Results rows for paths, in order, from a pool of worker processes"""
+    if start is None:
+        start = time.time()
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as journal_dir:
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=_init_worker, initargs=(journal_dir, start, transcripts)) as pool:
+            return list(pool.map(_run, paths, chunksize=max(1, min(32, len(paths) // (workers * 4)))))
+
+
+def write_results(rows, f):
+    writer = csv.DictWriter(f, RESULT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def compare_results(rows, expected_path):
+    """Lines describing each file whose outcome differs from an earlier results table"""
+    with open(expected_path, encoding='utf-8', newline='') as f:
+        expected = {row["file"]: row for row in csv.DictReader(f)}
+    changes = []
+    for row in rows:
+        old = expected.get(row["file"])
+        if old is None:
+            changes.append(f"{row['file']}: new")
+            continue
+        for field in COMPARED_FIELDS:
+            if str(row[field]) != old.get(field, ""):
+                changes.append(f"{row['file']}: {field} {old.get(field, '')!r} -> {row[field]!r}")
+    return changes
+
+
+def print_summary(rows, elapsed):
+    intents = collections.Counter(row["intent"] or "error" for row in rows)
+    print(f"Transcribed {len(rows)} files in {elapsed:.1f} s ({len(rows) / elapsed if elapsed else 0:.1f} files/s)")
+    print("Intents: " + ", ".join(f"{intent} {count}" for intent, count in intents.most_common()))
+    for field in ("load_ms", "recognize_ms", "command_ms"):
+        timings = [row[field] for row in rows if row[field] != ""]
+        if timings:
+            print(f"  {field}: mean {sum(timings) / len(timings):.2f}, max {max(timings):.2f}")
+
+
+def main(args):
+    """python transcribe.py DIR - recognize and parse every recorded command under DIR"""
+    parser = argparse.ArgumentParser(description="Run recorded command WAVs through recognition and the command logic")
+    parser.add_argument("directory")
+    parser.add_argument("--out", default="transcribe_results.csv", help="results table to write")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--at", help="clock time the commands are heard at, e.g. 2026-01-05T08:00 (default: now)")
+    parser.add_argument("--transcripts", action="store_true",
+                        help="read FILE.txt transcripts instead of recognizing FILE.wav")
+    parser.add_argument("--expect", help="earlier results table; exit 1 if any outcome changed")
+    options = parser.parse_args(args)
+
+    paths = find_recordings(options.directory)
+    if not paths:
+        print(f"No .wav files under {options.directory}")
+        return 2
+    start = datetime.datetime.fromisoformat(options.at).timestamp() if options.at else None
+    started = time.perf_counter()
+    rows = transcribe_all(paths, options.workers, start, options.transcripts)
+    elapsed = time.perf_counter() - started
+    for row in rows:
+        # Relative names, so tables from different checkouts compare
+        row["file"] = os.path.relpath(row["file"], options.directory)
+    with open(options.out, 'w', encoding='utf-8', newline='') as f:
+        write_results(rows, f)
+    print_summary(rows, elapsed)
+    print(f"Results written to {options.out}")
+    if options.expect:
+        changes = compare_results(rows, options.expect)
+        for change in changes:
+            print(f"  changed {change}")
+        print(f"{len(changes)} changes against {options.expect}")
+        return 1 if changes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+import json
+import logging
+import re
+import time
+
+log = logging.getLogger(__name__)
+
+
+class WakeWordGate:
+    """Only pass speech on to recognition after the wake phrase
+
+    The gate is a ContinuousCapture listener. Each utterance's frames go
+    to a lightweight keyword spotter; nothing reaches the recognizer until
+    the spotter hears the wake phrase. The utterance that contained it and
+    any that follow within window_seconds are let through, either to an
+    inner streaming listener frame by frame or, for the batch pipeline, by
+    setting passed once the utterance ends.
+    """
+
+    def __init__(self, spotter, phrase, inner=None, window_seconds=8.0, on_wake=None):
+        self.spotter = spotter
+        self.phrase = phrase.lower()
+        self.inner = inner
+        self.window_seconds = window_seconds
+        self.on_wake = on_wake
+        self.passed = False
+        self.utterances = 0
+        self.utterances_passed = 0
+        self._pattern = re.compile(r"\b" + r"\W*".join(map(re.escape, self.phrase.split())) + r"\b\W*")
+        self._open_until = 0.0
+        self._open = False
+        self._stream = None
+        self._buffer = []
+        self._sample_rate = None
+        self._frame_seconds = None
+
+    def strip(self, text):
+        """Remove the wake phrase from a transcript"""
+        return self._pattern.sub("", text).strip()
+
+    def speech_started(self, sample_rate, frame_seconds):
+        self.utterances += 1
+        self.passed = False
+        self._sample_rate = sample_rate
+        self._frame_seconds = frame_seconds
+        self._buffer = []
+        self._open = time.monotonic() < self._open_until
+        if self._open:
+            self._stream = None
+            if self.inner:
+                self.inner.speech_started(sample_rate, frame_seconds)
+        else:
+            self._stream = self.spotter.stream(sample_rate)
+
+    def speech_frame(self, frame):
+        if self._open:
+            return self.inner.speech_frame(frame) if self.inner else False
+        if self._stream is None:
+            return False
+        self._buffer.append(frame)
+        if self._stream.accept(frame):
+            log.info("Wake phrase detected")
+            self._open = True
+            self._stream = None
+            if self.on_wake:
+                self.on_wake()
+            if self.inner:
+                # Replay the utterance so far so the recognizer hears it from the start
+                self.inner.speech_started(self._sample_rate, self._frame_seconds)
+                buffered, self._buffer = self._buffer, []
+                for earlier in buffered:
+                    if self.inner.speech_frame(earlier):
+                        return True
+            self._buffer = []
+        return False
+
+    def speech_ended(self):
+        self._stream = None
+        self._buffer = []
+        self.passed = self._open
+        if self._open:
+            self.utterances_passed += 1
+            # Follow-up commands within the window need no wake phrase
+            self._open_until = time.monotonic() + self.window_seconds
+            if self.inner:
+                self.inner.speech_ended()
+        self._open = False
+
+
+class VoskSpotter:
+    """Keyword spotting with a Vosk recognizer restricted to the wake phrase
+
+    The grammar holds only the phrase and [unk], which keeps decoding far
+    cheaper than open-vocabulary recognition.
+    """
+
+    def __init__(self, backend, phrase):
+        self.backend = backend
+        self.phrase = phrase.lower()
+
+    def stream(self, sample_rate):
+        import vosk
+        grammar = json.dumps([self.phrase, "[unk]"])
+        return VoskSpotterStream(vosk.KaldiRecognizer(self.backend.model(), sample_rate, grammar), self.phrase)
+
+
+class VoskSpotterStream:
+    def __init__(self, recognizer, phrase):
+        self.recognizer = recognizer
+        self.phrase = phrase
+
+    def accept(self, frame):
+        """Feed a frame; returns True once the phrase has been heard"""
+        if self.recognizer.AcceptWaveform(frame):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+        else:
+            text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return self.phrase in text
+
+
+class FakeSpotter:
+    """Report the wake phrase when a frame matches a predicate, for tests and benchmarks"""
+
+    def __init__(self, is_wake_frame):
+        self.is_wake_frame = is_wake_frame
+
+    def stream(self, sample_rate):
+        return FakeSpotterStream(self.is_wake_frame)
+
+
+class FakeSpotterStream:
+    def __init__(self, is_wake_frame):
+        self.is_wake_frame = is_wake_frame
+
+    def accept(self, frame):
+        return self.is_wake_frame(frame)